@@ -0,0 +1,163 @@
+# scripts/adaptive_control.py
+import logging
+import random
+import time
+from collections import deque
+from metrics import METRICS
+
+OUTCOME_OK = "ok"
+OUTCOME_CHALLENGE = "challenge"
+OUTCOME_THROTTLED = "throttled"
+OUTCOME_ERROR = "error"
+
+
+class _IdentityHealth:
+    __slots__ = ("outcomes", "consecutive_challenges", "quarantined_until", "quarantine_count")
+
+    def __init__(self, window):
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_challenges = 0
+        self.quarantined_until = 0.0
+        self.quarantine_count = 0
+
+
+class AdaptiveRateController:
+    """チャレンジ率・429・レイテンシを見て、リクエスト間隔と同時実行数をAIMDで調整する
+
+    成功ごとにレートを increase_step ずつ上げ、increase_after 回連続で成功したら同時実行数を1増やす。
+    チャレンジ・429/503・latency_target 超過のいずれかで、レートと同時実行数を decrease_factor 倍に下げる
+    （decrease_cooldown 秒以内の連続した減速は1回とみなす）。
+    egress identity（user agent, locale）ごとの直近の結果をティアごとに記録し、チャレンジが続く identity は
+    そのティアで一定時間隔離して choose_identity() の候補から外す。隔離が繰り返されるたびに期間は倍になる。
+    escalation_tiers（既定は HTTP ティア）のチャレンジは次のティアへのエスカレーションの合図として
+    想定内なので、全体の減速にも隔離にも使わない。
+    """
+
+    def __init__(self, min_rate=0.05, max_rate_multiplier=2.0, increase_step=0.01, decrease_factor=0.5,
+                 increase_after=10, latency_target=20.0, decrease_cooldown=10.0, window=20,
+                 quarantine_threshold=0.5, quarantine_min_samples=4, max_consecutive_challenges=3,
+                 quarantine_seconds=600.0, max_quarantine_seconds=6 * 60 * 60.0, escalation_tiers=("http",)):
+        self.min_rate = min_rate
+        self.max_rate_multiplier = max_rate_multiplier
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.increase_after = increase_after
+        self.latency_target = latency_target
+        self.decrease_cooldown = decrease_cooldown
+        self.window = window
+        self.quarantine_threshold = quarantine_threshold
+        self.quarantine_min_samples = quarantine_min_samples
+        self.max_consecutive_challenges = max_consecutive_challenges
+        self.quarantine_seconds = quarantine_seconds
+        self.max_quarantine_seconds = max_quarantine_seconds
+        self.escalation_tiers = frozenset(escalation_tiers)
+        self.rate = None
+        self.max_rate = None
+        self.concurrency = None
+        self.max_concurrency = None
+        self._scheduler = None
+        self._successes_in_row = 0
+        self._last_decrease = 0.0
+        self._identities = {}
+
+    def attach(self, scheduler):
+        """スケジューラの設定値を上限として調整を開始する（2回目以降は前回の状態を引き継ぐ）"""
+        self._scheduler = scheduler
+        self.max_concurrency = scheduler.max_concurrency
+        self.concurrency = min(self.concurrency or self.max_concurrency, self.max_concurrency)
+        configured_rate = scheduler.global_bucket.rate if scheduler.global_bucket else None
+        if configured_rate:
+            self.max_rate = configured_rate * self.max_rate_multiplier
+            self.rate = min(self.rate or configured_rate, self.max_rate)
+        self._apply()
+
+    def _apply(self):
+        if self._scheduler is not None:
+            self._scheduler.set_concurrency(self.concurrency)
+            if self.rate:
+                self._scheduler.set_rate(self.rate)
+        METRICS.set_gauge("scraper_concurrency_limit", self.concurrency or 0)
+        METRICS.set_gauge("scraper_rate_limit_rps", self.rate or 0.0)
+
+    def _increase(self):
+        self._successes_in_row += 1
+        if self.rate:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+        if self.concurrency and self._successes_in_row >= self.increase_after:
+            self._successes_in_row = 0
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+        self._apply()
+
+    def _decrease(self, reason):
+        self._successes_in_row = 0
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        if self.rate:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        if self.concurrency:
+            self.concurrency = max(1, int(self.concurrency * self.decrease_factor))
+        self._apply()
+        logging.warning(f"適応制御: {reason} のため減速します (レート: {self.rate or 0:.3f}/秒, 同時実行数: {self.concurrency})")
+
+    def _health(self, identity, tier):
+        key = (tier, identity)
+        health = self._identities.get(key)
+        if health is None:
+            health = self._identities[key] = _IdentityHealth(self.window)
+        return health
+
+    def record(self, identity, outcome, latency=None, tier=None):
+        """直接アクセスしたティア（HTTP・ブラウザ）の結果を1件記録する"""
+        METRICS.inc("scraper_egress_outcomes_total", outcome=outcome)
+        health = self._health(identity, tier)
+        if outcome == OUTCOME_CHALLENGE and tier in self.escalation_tiers:
+            # 素のHTTPへのチャレンジは通常のエスカレーションなので、レートにも identity の評価にも反映しない
+            return
+        health.outcomes.append(outcome)
+        if outcome == OUTCOME_CHALLENGE:
+            health.consecutive_challenges += 1
+            self._maybe_quarantine(identity, tier, health)
+            self._decrease("チャレンジを検出")
+        elif outcome == OUTCOME_THROTTLED:
+            self._decrease("レート制限 (429/503) を検出")
+        elif outcome == OUTCOME_OK:
+            health.consecutive_challenges = 0
+            if latency is not None and latency > self.latency_target:
+                self._decrease(f"レイテンシ {latency:.1f}秒が目標 {self.latency_target:.0f}秒を超過")
+            else:
+                self._increase()
+
+    def _maybe_quarantine(self, identity, tier, health):
+        challenges = sum(1 for outcome in health.outcomes if outcome == OUTCOME_CHALLENGE)
+        over_threshold = (len(health.outcomes) >= self.quarantine_min_samples
+                          and challenges / len(health.outcomes) >= self.quarantine_threshold)
+        if not over_threshold and health.consecutive_challenges < self.max_consecutive_challenges:
+            return
+        duration = min(self.quarantine_seconds * (2 ** health.quarantine_count), self.max_quarantine_seconds)
+        health.quarantined_until = time.monotonic() + duration
+        health.quarantine_count += 1
+        health.outcomes.clear()
+        health.consecutive_challenges = 0
+        METRICS.inc("scraper_identity_quarantines_total")
+        logging.warning(f"適応制御: {tier} ティアの identity {identity} を {duration:.0f}秒間隔離します (累計 {health.quarantine_count}回)")
+
+    def is_quarantined(self, identity, tier=None):
+        health = self._identities.get((tier, identity))
+        return health is not None and health.quarantined_until > time.monotonic()
+
+    def choose_identity(self, candidates, tier=None):
+        """tier で隔離されていない identity からランダムに選ぶ。全て隔離中なら最も早く解除されるものを返す"""
+        available = [identity for identity in candidates if not self.is_quarantined(identity, tier)]
+        METRICS.set_gauge("scraper_quarantined_identities", len(candidates) - len(available), tier=tier)
+        if available:
+            return random.choice(available)
+        return min(candidates, key=lambda identity: self._identities[(tier, identity)].quarantined_until)
+
+    def snapshot(self):
+        return {
+            "rate": self.rate,
+            "concurrency": self.concurrency,
+            "quarantined": [key for key in self._identities if self.is_quarantined(key[1], key[0])],
+        }
@@ -0,0 +1,192 @@
+# scripts/applist_cache.py
+import aiohttp
+import json
+import logging
+import os
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+STEAM_APPLIST_URL = "https://api.steampowered.com/ISteamApps/GetAppList/v2/"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class AppIdList:
+    """AppIDを array('I') で保持するコンパクトなリスト
+
+    取得順を保ったまま、所属判定用のソート済み配列を必要になった時点で作る。
+    Pythonのint listに比べて1件あたり4バイトで済む。
+    """
+
+    def __init__(self, appids=()):
+        self._appids = array('I', appids)
+        self._sorted = None
+
+    def append(self, appid):
+        self._appids.append(appid)
+        self._sorted = None
+
+    def __len__(self):
+        return len(self._appids)
+
+    def __iter__(self):
+        return iter(self._appids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return AppIdList(self._appids[index])
+        return self._appids[index]
+
+    def __contains__(self, appid):
+        if self._sorted is None:
+            self._sorted = array('I', sorted(self._appids))
+        position = bisect_left(self._sorted, appid)
+        return position < len(self._sorted) and self._sorted[position] == appid
+
+    def __repr__(self):
+        return f"AppIdList(len={len(self._appids)})"
+
+    def tolist(self):
+        return self._appids.tolist()
+
+
+def iter_applist_entries(path, chunk_size=READ_CHUNK_SIZE):
+    """GetAppList のJSONファイルを全体を読み込まずに先頭から1件ずつ返す"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        eof = False
+
+        def read_more():
+            nonlocal buffer, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buffer += chunk
+
+        # "apps": [ の位置まで読み進める
+        while True:
+            key_position = buffer.find('"apps"')
+            if key_position >= 0:
+                bracket_position = buffer.find('[', key_position)
+                if bracket_position >= 0:
+                    buffer = buffer[bracket_position + 1:]
+                    break
+            if eof:
+                return
+            read_more()
+
+        position = 0
+        while True:
+            # 区切りの空白とカンマを読み飛ばす
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(buffer):
+                if eof:
+                    return
+                buffer = buffer[position:]
+                position = 0
+                read_more()
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                entry, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                buffer = buffer[position:]
+                position = 0
+                read_more()
+                continue
+            yield entry
+            position = end
+
+
+def load_valid_appids(path, max_apps=None):
+    """appidが数値でnameが空でないエントリのみを、max_apps件に達した時点で打ち切って返す"""
+    appids = AppIdList()
+    for app_info in iter_applist_entries(path):
+        if isinstance(app_info, dict) and isinstance(app_info.get('appid'), int) and (app_info.get('name') or '').strip():
+            appids.append(app_info['appid'])
+            if max_apps and len(appids) >= max_apps:
+                break
+    return appids
+
+
+class AppListCache:
+    """Steam AppList のディスクキャッシュ（TTL + ETag/If-Modified-Since による再検証）"""
+
+    def __init__(self, cache_dir, ttl_seconds=DEFAULT_TTL_SECONDS, url=STEAM_APPLIST_URL):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.url = url
+        self.data_path = self.cache_dir / "applist.json"
+        self.meta_path = self.cache_dir / "applist.meta.json"
+
+    def _load_meta(self):
+        try:
+            return json.loads(self.meta_path.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _temp_file(self):
+        # 複数のレプリカが同じボリュームで同時に更新しても衝突しないよう、一意な一時ファイルに書く
+        return tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=".applist-", suffix=".tmp", delete=False)
+
+    def _save_meta(self, meta):
+        with self._temp_file() as f:
+            f.write(json.dumps(meta).encode('utf-8'))
+        os.replace(f.name, self.meta_path)
+
+    def is_fresh(self, meta=None):
+        meta = meta if meta is not None else self._load_meta()
+        return self.data_path.exists() and time.time() - meta.get("fetched_at", 0) < self.ttl_seconds
+
+    async def refresh(self, session):
+        """キャッシュを必要に応じて更新し、AppListファイルのパスを返す"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        meta = self._load_meta()
+        if self.is_fresh(meta):
+            logging.info("AppListキャッシュは有効期限内のため再取得しません")
+            return self.data_path
+
+        headers = {}
+        if self.data_path.exists():
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            async with session.get(self.url, headers=headers) as response:
+                if response.status == 304:
+                    logging.info("AppListは更新されていません (304)。キャッシュを使用します")
+                    meta["fetched_at"] = time.time()
+                    self._save_meta(meta)
+                    return self.data_path
+                response.raise_for_status()
+                # 本文はメモリに溜めず、一時ファイルに書いてから置き換える
+                with self._temp_file() as f:
+                    try:
+                        async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                            f.write(chunk)
+                    except BaseException:
+                        f.close()
+                        os.unlink(f.name)
+                        raise
+                os.replace(f.name, self.data_path)
+                self._save_meta({
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": time.time(),
+                })
+                logging.info(f"AppListを取得してキャッシュしました: {self.data_path}")
+                return self.data_path
+        except aiohttp.ClientError as e:
+            if self.data_path.exists():
+                logging.warning(f"AppListの取得に失敗したため、期限切れのキャッシュを使用します: {e}")
+                return self.data_path
+            raise
@@ -0,0 +1,140 @@
+# scripts/bench/bench_parsers.py
+"""HTMLパーサーバックエンドのマイクロベンチマーク
+
+保存済みのフィクスチャページに対して各バックエンドを実行し、ms/page とピークRSSを
+JSONで出力する。ピークRSSを正しく測るため、バックエンドごとに別プロセスで計測する。
+フィクスチャに加えて空文書・不正なマークアップ（MALFORMED_CASES）でも基準バックエンドとの
+出力の一致を確認し、KNOWN_DIVERGENCES 以外の差異があれば終了コード1で終わる。
+
+    python scripts/bench/bench_parsers.py --iterations 50 --output bench_output.txt
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from html_parsers import PARSER_BACKENDS, parse_html_content
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+MALFORMED_CASES = {
+    "empty": "",
+    "whitespace_only": "  \n\t ",
+    "comment_only": "<!-- empty -->",
+    "unclosed_owners_td": "<table><tr><td>Owners<td>7K</tr></table>",
+    "ul_inside_p": "<h3>Store Data</h3><p><ul><li>5</li></ul>",
+    "unclosed_li": "<h3>Store Data</h3><ul><li>5<li>6</ul>",
+    "unclosed_tooltip": ('<div><strong>User reviews</strong><span class="tooltip">1,234<br>56'
+                         '</div><table><tr><td>Owners</td><td>1M ± 20K</td></tr></table>'),
+}
+# HTML5 の木構築規則で閉じタグを補うバックエンドで、bs4（html.parser）と結果が異なる既知のケース
+HTML5_DIVERGENCES = {"unclosed_owners_td", "ul_inside_p", "unclosed_li"}
+KNOWN_DIVERGENCES = {"lxml": HTML5_DIVERGENCES, "selectolax": HTML5_DIVERGENCES}
+
+
+def load_fixtures(fixtures_dir=FIXTURES_DIR):
+    return {path.name: path.read_text(encoding='utf-8') for path in sorted(fixtures_dir.glob("*_charts.html"))}
+
+
+def _comparable(record):
+    return {key: value for key, value in record.to_dict().items() if key != "取得日時"}
+
+
+def _run_backend(backend, fixtures, iterations, queue):
+    # バックエンドのimportコストは計測から除外する
+    first_name = next(iter(fixtures))
+    parse_html_content(fixtures[first_name], 0, backend=backend)
+    baseline_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    per_page_ms = {}
+    outputs = {}
+    for name, html_content in fixtures.items():
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            record = parse_html_content(html_content, 0, backend=backend)
+            timings.append((time.perf_counter() - started) * 1000)
+        per_page_ms[name] = {
+            "median_ms": round(statistics.median(timings), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "min_ms": round(min(timings), 3),
+        }
+        outputs[name] = _comparable(record)
+    malformed_outputs = {}
+    for name, html_content in MALFORMED_CASES.items():
+        try:
+            malformed_outputs[name] = _comparable(parse_html_content(html_content, 0, backend=backend))
+        except Exception as e:
+            malformed_outputs[name] = {"例外": f"{type(e).__name__}: {e}"}
+    queue.put({
+        "backend": backend,
+        "pages": per_page_ms,
+        "mean_ms_per_page": round(statistics.fmean(p["mean_ms"] for p in per_page_ms.values()), 3),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "baseline_rss_kb": baseline_rss_kb,
+        "outputs": outputs,
+        "malformed_outputs": malformed_outputs,
+    })
+
+
+def run_benchmark(backends, iterations, fixtures_dir=FIXTURES_DIR):
+    fixtures = load_fixtures(fixtures_dir)
+    if not fixtures:
+        raise SystemExit(f"フィクスチャが見つかりません: {fixtures_dir}")
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in backends:
+        queue = ctx.Queue()
+        process = ctx.Process(target=_run_backend, args=(backend, fixtures, iterations, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+
+    reference = results[0]["outputs"]
+    malformed_reference = results[0]["malformed_outputs"]
+    for result in results:
+        result["identical_to_reference"] = result.pop("outputs") == reference
+        malformed_outputs = result.pop("malformed_outputs")
+        mismatches = sorted(name for name in MALFORMED_CASES
+                            if malformed_outputs[name] != malformed_reference[name])
+        known = KNOWN_DIVERGENCES.get(result["backend"], set()) if backends[0] == "bs4" else set()
+        result["malformed_known_divergences"] = [name for name in mismatches if name in known]
+        result["malformed_unexpected_mismatches"] = {
+            name: malformed_outputs[name] for name in mismatches if name not in known}
+    return {
+        "fixtures": {name: len(html_content) for name, html_content in fixtures.items()},
+        "iterations": iterations,
+        "reference_backend": backends[0],
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTMLパーサーバックエンドのベンチマーク")
+    parser.add_argument("--backend", action="append", choices=sorted(PARSER_BACKENDS),
+                        help="計測するバックエンド（複数指定可、既定は全て。先頭が比較基準）")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+    parser.add_argument("--output", type=Path, help="結果JSONの出力先（省略時は標準出力）")
+    args = parser.parse_args()
+
+    backends = args.backend or ["bs4"] + [name for name in PARSER_BACKENDS if name != "bs4"]
+    report = run_benchmark(backends, args.iterations, args.fixtures)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text, encoding='utf-8')
+    else:
+        print(text)
+    if not all(result["identical_to_reference"] and not result["malformed_unexpected_mismatches"]
+               for result in report["results"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# scripts/bench/bench_scraper.py
+"""SteamDBScraper の負荷試験ベンチマーク
+
+ローカルのSteamDB代替サーバー（steamdb_standin.py）に対して scrape_multiple_apps を実行し、
+続けて parse_html_content を大量のページに対して実行する。pages/sec、p50/p95/p99 レイテンシ、
+ピークRSS、ブラウザのプロセス数をJSONで出力するので、コミット間で結果を比較できる。
+
+    python scripts/bench/bench_scraper.py --apps 500 --challenge-rate 0.2 --output bench_scraper.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fetch_pipeline import TIERS
+from html_parsers import DEFAULT_PARSER_BACKEND, parse_html_content
+from memory_watchdog import sample_process_tree
+from scraper_core import SteamDBScraper
+from steamdb_standin import SteamDBStandIn
+
+SAMPLE_INTERVAL = 0.2
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    if len(values) == 1:
+        return {"p50": values[0], "p95": values[0], "p99": values[0]}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": round(cuts[49], 3), "p95": round(cuts[94], 3), "p99": round(cuts[98], 3)}
+
+
+class ProcessSampler:
+    """一定間隔でプロセスツリーを計測し、ピーク値を記録する"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = {}
+        self._task = None
+
+    async def _run(self):
+        while True:
+            sample = sample_process_tree()
+            for key, value in sample.items():
+                self.peak[key] = max(self.peak.get(key, 0), value)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def run_scrape_benchmark(args):
+    stand_in = SteamDBStandIn(latency=args.latency, challenge_rate=args.challenge_rate,
+                              unlocker_latency=args.unlocker_latency, unlocker_error_rate=args.unlocker_error_rate,
+                              seed=args.seed)
+    base_url = await stand_in.start()
+    scraper = SteamDBScraper(
+        brightdata_api_token="bench-token",
+        base_url=base_url,
+        brightdata_api_url=f"{base_url}/request",
+        browser_pool_size=args.browsers,
+        parse_workers=args.parse_workers,
+        parser_backend=args.backend,
+    )
+    scraper.brightdata_client.backoff_base = 0.05
+    # 計測対象外のティアを外す
+    scraper.fetcher.tier_fetchers = {tier: fetch for tier, fetch in scraper.fetcher.tier_fetchers.items()
+                                     if tier in args.tiers}
+
+    latencies_ms = []
+    scrape_app_data = scraper.scrape_app_data
+
+    async def timed_scrape_app_data(appid, progress_text=""):
+        started = time.perf_counter()
+        try:
+            await scrape_app_data(appid, progress_text)
+        finally:
+            latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    scraper.scrape_app_data = timed_scrape_app_data
+    sampler = ProcessSampler()
+    sampler.start()
+    appids = list(range(1, args.apps + 1))
+    started = time.perf_counter()
+    try:
+        async with scraper:
+            successes, _ = await scraper.scrape_multiple_apps(
+                appids, max_concurrency=args.concurrency, requests_per_second=args.rps,
+                burst=args.concurrency, jitter=None)
+        elapsed = time.perf_counter() - started
+    finally:
+        await sampler.stop()
+        await stand_in.close()
+    return {
+        "apps": len(appids),
+        "successes": successes,
+        "elapsed_seconds": round(elapsed, 3),
+        "pages_per_second": round(len(appids) / elapsed, 3),
+        "latency_ms": percentiles(sorted(latencies_ms)),
+        "tier_stats": scraper.fetcher.stats.snapshot(),
+        "brightdata": scraper.brightdata_client.stats(),
+        "adaptive_control": scraper.rate_controller.snapshot(),
+        "stand_in": stand_in.counts,
+        "peak_tree_rss_kb": sampler.peak["rss_kb"],
+        "peak_processes": sampler.peak["processes"],
+        "peak_browser_processes": sampler.peak["browser_processes"],
+    }
+
+
+def run_parse_benchmark(pages, backend):
+    stand_in = SteamDBStandIn()
+    timings_ms = []
+    started = time.perf_counter()
+    for i in range(pages):
+        html_content = stand_in.pages[i % len(stand_in.pages)]
+        page_started = time.perf_counter()
+        parse_html_content(html_content, i, backend=backend)
+        timings_ms.append((time.perf_counter() - page_started) * 1000)
+    elapsed = time.perf_counter() - started
+    return {
+        "pages": pages,
+        "backend": backend,
+        "elapsed_seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 3),
+        "latency_ms": percentiles(sorted(timings_ms)),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).resolve().parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SteamDBScraper の負荷試験ベンチマーク")
+    parser.add_argument("--apps", type=int, default=200, help="scrape_multiple_apps に渡すAppID数")
+    parser.add_argument("--parse-pages", type=int, default=1000, help="parse_html_content を実行するページ数")
+    parser.add_argument("--tiers", default="http,unlocker",
+                        help=f"使用するティア（カンマ区切り、{','.join(TIERS)} から選択）")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rps", type=float, default=200.0, help="スケジューラのリクエストレート上限")
+    parser.add_argument("--browsers", type=int, default=2, help="browser ティア使用時のブラウザ数")
+    parser.add_argument("--parse-workers", type=int, default=None)
+    parser.add_argument("--backend", default=DEFAULT_PARSER_BACKEND)
+    parser.add_argument("--latency", type=float, default=0.05, help="代替サーバーの応答遅延（秒）")
+    parser.add_argument("--challenge-rate", type=float, default=0.1)
+    parser.add_argument("--unlocker-latency", type=float, default=0.2)
+    parser.add_argument("--unlocker-error-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="結果JSONの出力先（省略時は標準出力）")
+    parser.add_argument("--verbose", action="store_true", help="スクレイパーのログを表示する")
+    args = parser.parse_args()
+    args.tiers = [tier.strip() for tier in args.tiers.split(",") if tier.strip()]
+    unknown = set(args.tiers) - set(TIERS)
+    if unknown:
+        parser.error(f"不明なティア: {', '.join(sorted(unknown))}")
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.ERROR)
+    report = {
+        "commit": _git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "verbose")},
+        "scrape": asyncio.run(run_scrape_benchmark(args)),
+        "parse": run_parse_benchmark(args.parse_pages, args.backend),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "peak_children_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text, encoding='utf-8')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# scripts/bench/bench_startup.py
+"""コールドスタートの所要時間ベンチマーク
+
+新しいPythonプロセスで main / scraper_core 等を import するまでの時間を計測し、
+-X importtime の結果から累積時間の大きいモジュールを出力する。--browser を付けると
+ブラウザプールの起動から最初のページ（ステルス適用済み）を開くまでの時間も計測する。
+
+    python scripts/bench/bench_startup.py --runs 5 --output bench_startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+DEFAULT_MODULES = ("main", "scraper_core", "browser_pool", "html_parsers")
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def _run_import(module):
+    """新しいプロセスで module を import し、(経過秒数, {モジュール: 累積マイクロ秒}) を返す"""
+    env = dict(os.environ, PYTHONPATH=str(SCRIPTS_DIR))
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, env=env, cwd=SCRIPTS_DIR)
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"{module} の import に失敗しました: {completed.stderr.strip().splitlines()[-1]}")
+    cumulative = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # 計測対象のモジュールと、それが直接 import したモジュールだけを数える
+        if match and len(match.group(3)) <= 3:
+            cumulative[match.group(4)] = int(match.group(2))
+    return elapsed, cumulative
+
+
+def run_import_benchmark(module, runs, top):
+    elapsed, cumulative = [], {}
+    for _ in range(runs):
+        seconds, modules = _run_import(module)
+        elapsed.append(seconds)
+        for name, micros in modules.items():
+            cumulative.setdefault(name, []).append(micros)
+    slowest = sorted(((statistics.median(values), name) for name, values in cumulative.items()), reverse=True)
+    return {
+        "runs": runs,
+        "median_seconds": round(statistics.median(elapsed), 4),
+        "min_seconds": round(min(elapsed), 4),
+        "slowest_imports_ms": {name: round(micros / 1000, 2) for micros, name in slowest[:top]},
+    }
+
+
+async def run_browser_benchmark():
+    from browser_pool import BrowserPool, stealth_init_script
+
+    started = time.perf_counter()
+    stealth_init_script()
+    script_built = time.perf_counter()
+    pool = BrowserPool(size=1)
+    try:
+        await pool.start()
+        pool_started = time.perf_counter()
+        async with pool.page() as page:
+            await page.set_content("<html><body>ok</body></html>")
+            webdriver = await page.evaluate("() => navigator.webdriver")
+        first_page = time.perf_counter()
+    finally:
+        await pool.close()
+    return {
+        "stealth_script_build_seconds": round(script_built - started, 4),
+        "pool_start_seconds": round(pool_started - script_built, 4),
+        "first_page_seconds": round(first_page - pool_started, 4),
+        "navigator_webdriver": webdriver,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="コールドスタートの所要時間ベンチマーク")
+    parser.add_argument("--modules", default=",".join(DEFAULT_MODULES), help="計測するモジュール（カンマ区切り）")
+    parser.add_argument("--runs", type=int, default=5, help="モジュールごとの計測回数")
+    parser.add_argument("--top", type=int, default=10, help="出力する累積時間の大きいモジュール数")
+    parser.add_argument("--browser", action="store_true", help="ブラウザプールの起動時間も計測する")
+    parser.add_argument("--output", type=Path, help="結果JSONの出力先（省略時は標準出力）")
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "imports": {}}
+    for module in [name.strip() for name in args.modules.split(",") if name.strip()]:
+        report["imports"][module] = run_import_benchmark(module, args.runs, args.top)
+    if args.browser:
+        report["browser"] = asyncio.run(run_browser_benchmark())
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text, encoding='utf-8')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
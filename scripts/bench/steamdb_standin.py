@@ -0,0 +1,113 @@
+# scripts/bench/steamdb_standin.py
+"""ベンチマーク用のローカルSteamDB代替サーバー
+
+保存済みのチャートページ（fixtures）を /app/{appid}/charts/ で返し、challenge_rate の確率で
+CloudFlareのチャレンジページ（403）を返す。POST /request は BrightData Web Unlocker API を模し、
+unlocker_error_rate の確率で 429/503 を返す。各応答の前に latency 秒（±jitter）待機する。
+
+    python scripts/bench/steamdb_standin.py --port 8080 --challenge-rate 0.3
+"""
+import argparse
+import asyncio
+import random
+import re
+from pathlib import Path
+
+from aiohttp import web
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+CHALLENGE_PAGE = """<!DOCTYPE html>
+<html><head><title>Just a moment...</title></head>
+<body>
+<div id="cf-challenge-running" class="cf-browser-verification">
+  <h1>Checking your browser before accessing steamdb.info.</h1>
+  <p>This process is automatic. Performance &amp; security by Cloudflare</p>
+</div>
+<form id="challenge-form" action="/" method="POST"></form>
+</body></html>
+"""
+
+
+class SteamDBStandIn:
+    def __init__(self, fixtures_dir=FIXTURES_DIR, latency=0.05, latency_jitter=0.02, challenge_rate=0.0,
+                 unlocker_latency=0.2, unlocker_error_rate=0.0, seed=None):
+        self.pages = [path.read_text(encoding='utf-8') for path in sorted(Path(fixtures_dir).glob("*_charts.html"))]
+        if not self.pages:
+            raise ValueError(f"フィクスチャが見つかりません: {fixtures_dir}")
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.challenge_rate = challenge_rate
+        self.unlocker_latency = unlocker_latency
+        self.unlocker_error_rate = unlocker_error_rate
+        self.random = random.Random(seed)
+        self.counts = {"pages": 0, "challenges": 0, "unlocker_requests": 0, "unlocker_errors": 0}
+        self._runner = None
+        self.base_url = None
+
+    def _page_for(self, appid):
+        return self.pages[appid % len(self.pages)]
+
+    async def _sleep(self, latency):
+        await asyncio.sleep(max(0.0, latency + self.random.uniform(-self.latency_jitter, self.latency_jitter)))
+
+    async def handle_charts(self, request):
+        await self._sleep(self.latency)
+        if self.random.random() < self.challenge_rate:
+            self.counts["challenges"] += 1
+            return web.Response(status=403, text=CHALLENGE_PAGE, content_type="text/html")
+        self.counts["pages"] += 1
+        return web.Response(text=self._page_for(int(request.match_info["appid"])), content_type="text/html")
+
+    async def handle_unlocker(self, request):
+        payload = await request.json()
+        self.counts["unlocker_requests"] += 1
+        await self._sleep(self.unlocker_latency)
+        if self.random.random() < self.unlocker_error_rate:
+            self.counts["unlocker_errors"] += 1
+            return web.Response(status=self.random.choice((429, 503)), text="temporarily unavailable")
+        match = re.search(r'/app/(\d+)/', payload.get("url", ""))
+        if not match:
+            return web.Response(status=400, text="invalid url")
+        return web.Response(text=self._page_for(int(match.group(1))), content_type="text/html")
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_get("/app/{appid:\\d+}/charts/", self.handle_charts)
+        app.router.add_post("/request", self.handle_unlocker)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        bound_port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{bound_port}"
+        return self.base_url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(args):
+    stand_in = SteamDBStandIn(latency=args.latency, challenge_rate=args.challenge_rate,
+                              unlocker_latency=args.unlocker_latency, unlocker_error_rate=args.unlocker_error_rate)
+    base_url = await stand_in.start(args.host, args.port)
+    print(f"SteamDB stand-in: {base_url}  (BrightData: {base_url}/request)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stand_in.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--challenge-rate", type=float, default=0.0)
+    parser.add_argument("--unlocker-latency", type=float, default=0.2)
+    parser.add_argument("--unlocker-error-rate", type=float, default=0.0)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
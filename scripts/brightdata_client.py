@@ -0,0 +1,118 @@
+# scripts/brightdata_client.py
+import aiohttp
+import asyncio
+import logging
+import random
+import time
+from metrics import METRICS
+
+BRIGHTDATA_API_URL = "https://api.brightdata.com/request"
+BRIGHTDATA_ZONE = "claude_flare_captcha1"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class BrightDataClient:
+    """BrightData Web Unlocker API の非同期クライアント
+
+    keep-alive の接続プールを使い回し、同時呼び出し数を max_concurrency に制限する。
+    429/5xx と通信エラーは指数バックオフ（ジッター付き）で max_retries 回まで再試行する。
+    """
+
+    def __init__(self, api_token, zone=BRIGHTDATA_ZONE, api_url=BRIGHTDATA_API_URL, max_concurrency=4,
+                 pool_size=8, max_retries=3, backoff_base=1.0, backoff_max=30.0, timeout=60,
+                 cost_per_request=0.0):
+        if not api_token:
+            raise ValueError("BrightData API token is required")
+        self.api_token = api_token
+        self.zone = zone
+        self.api_url = api_url
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.cost_per_request = cost_per_request
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.total_latency = 0.0
+        self.total_cost = 0.0
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60, ssl=False)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.api_token}"
+                },
+            )
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+        return random.uniform(delay / 2, delay)
+
+    async def fetch(self, url):
+        """URLをUnlocker経由で取得し、HTML文字列（失敗時は None）を返す
+
+        同時実行数の枠は1回の呼び出しの間だけ確保し、バックオフ中は他のリクエストに譲る。
+        """
+        payload = {"zone": self.zone, "url": url, "format": "raw"}
+        self.calls += 1
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.max_retries + 1):
+                retry_after = None
+                try:
+                    async with self._semaphore:
+                        logging.info(f"BrightData Web Unlocker APIでページを取得: {url}")
+                        with METRICS.span("brightdata_call"):
+                            async with self._get_session().post(self.api_url, json=payload) as response:
+                                body = await response.text()
+                    # 応答が返った呼び出しはステータスにかかわらず課金対象として数える
+                    self.total_cost += self.cost_per_request
+                    if response.status == 200:
+                        logging.info("BrightData APIからコンテンツ取得成功")
+                        self.successes += 1
+                        return body
+                    METRICS.inc("scraper_errors_total", stage="brightdata_call", type=f"http_{response.status}")
+                    if response.status not in RETRY_STATUSES:
+                        logging.warning(f"BrightData API エラー: {response.status} - {body[:500]}")
+                        break
+                    retry_after = response.headers.get("Retry-After")
+                    logging.warning(f"BrightData API 一時エラー: {response.status} (試行 {attempt + 1}/{self.max_retries + 1})")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logging.warning(f"BrightData API呼び出し中に通信エラー (試行 {attempt + 1}/{self.max_retries + 1}): {e}")
+                if attempt < self.max_retries:
+                    self.retries += 1
+                    await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+            self.failures += 1
+            return None
+        finally:
+            self.total_latency += time.perf_counter() - started
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "avg_latency_seconds": self.total_latency / self.calls if self.calls else 0.0,
+            "total_cost": self.total_cost,
+        }
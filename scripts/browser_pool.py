@@ -0,0 +1,271 @@
+# scripts/browser_pool.py
+import asyncio
+import importlib.util
+import json
+import logging
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+from metrics import METRICS
+
+LAUNCH_ARGS = [
+    '--no-sandbox', '--disable-setuid-sandbox', '--disable-gpu',
+    '--disable-dev-shm-usage', '--disable-web-security',
+    '--disable-features=IsolateOrigins,site-per-process',
+    '--disable-blink-features=AutomationControlled',
+    '--window-size=1920,1080', '--start-maximized',
+]
+
+# playwright_stealth の既定設定（StealthConfig()）で有効になるスクリプトを、同じ順序で並べたもの
+STEALTH_SCRIPT_FILES = (
+    "utils.js", "generate.magic.arrays.js", "chrome.app.js", "chrome.csi.js", "chrome.hairline.js",
+    "chrome.load.times.js", "chrome.runtime.js", "iframe.contentWindow.js", "media.codecs.js",
+    "navigator.languages.js", "navigator.permissions.js", "navigator.platform.js", "navigator.plugins.js",
+    "navigator.userAgent.js", "navigator.vendor.js", None, "window.outerdimensions.js", "webgl.vendor.js",
+)
+STEALTH_OPTIONS = {
+    'webgl_vendor': 'Intel Inc.',
+    'webgl_renderer': 'Intel Iris OpenGL Engine',
+    'navigator_vendor': 'Google Inc.',
+    'navigator_platform': None,
+    'navigator_user_agent': None,
+    'languages': ['en-US', 'en'],
+    'runOnInsecureOrigins': None,
+}
+
+
+@lru_cache(maxsize=1)
+def stealth_init_script():
+    """playwright_stealth の回避スクリプトを1つの init script にまとめる（プロセスごとに1回だけ組み立てる）
+
+    playwright_stealth を import すると pkg_resources の読み込みが走るため、パッケージは
+    import せずに同梱のJSファイルだけを読む。
+    """
+    spec = importlib.util.find_spec("playwright_stealth")
+    js_dir = Path(next(iter(spec.submodule_search_locations))) / "js"
+    parts = [f"const opts = {json.dumps(STEALTH_OPTIONS)}"]
+    for name in STEALTH_SCRIPT_FILES:
+        if name is None:
+            parts.append("delete Object.getPrototypeOf(navigator).webdriver")
+        else:
+            parts.append((js_dir / name).read_text(encoding="utf-8"))
+    return ";\n".join(parts)
+
+
+class _PooledBrowser:
+    """プール内の1つのChromiumプロセス"""
+
+    def __init__(self, index):
+        self.index = index
+        self.browser = None
+        self.generation = 0
+        self.pages_served = 0
+        self.in_use = 0
+        self.crashed = False
+        self.needs_restart = False
+        self.condition = asyncio.Condition()
+
+    def is_healthy(self):
+        return self.browser is not None and not self.crashed and self.browser.is_connected()
+
+
+class _ContextSlot:
+    """ブラウザ上で再利用されるコンテキスト（1度に1ページのみ貸し出す）"""
+
+    def __init__(self, pooled_browser):
+        self.pooled_browser = pooled_browser
+        self.context = None
+        self.generation = 0
+        self.pages_served = 0
+
+
+class BrowserPool:
+    """起動済みChromiumを使い回すブラウザプール
+
+    size個のブラウザプロセスを常駐させ、各ブラウザ上のコンテキストを
+    max_pages_per_context ページごとに新しいフィンガープリントで作り直す。
+    ブラウザは max_pages_per_browser ページ処理後、またはクラッシュ検出時に再起動する。
+    context_setup を渡した場合、コンテキスト作成直後に ``await context_setup(context, options)`` を呼ぶ。
+    """
+
+    def __init__(self, size=2, contexts_per_browser=1, max_pages_per_browser=200,
+                 max_pages_per_context=25, context_options_factory=None, launch_options=None,
+                 context_setup=None):
+        if size < 1 or contexts_per_browser < 1:
+            raise ValueError("size and contexts_per_browser must be >= 1")
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_pages_per_context = max_pages_per_context
+        self.context_options_factory = context_options_factory or dict
+        self.launch_options = launch_options or {'headless': True, 'args': LAUNCH_ARGS}
+        self.context_setup = context_setup
+        self._playwright = None
+        self._browsers = []
+        self._slots = []
+        self._idle = asyncio.Queue()
+        # _teardown のたびに進め、停止前に貸し出したスロットを新しいキューに戻さないようにする
+        self._generation = 0
+        self._start_lock = asyncio.Lock()
+        self.started = False
+
+    async def start(self):
+        async with self._start_lock:
+            if self.started:
+                return
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+            try:
+                for index in range(self.size):
+                    pooled_browser = _PooledBrowser(index)
+                    self._browsers.append(pooled_browser)
+                    await self._launch(pooled_browser)
+                    for _ in range(self.contexts_per_browser):
+                        slot = _ContextSlot(pooled_browser)
+                        self._slots.append(slot)
+                        self._idle.put_nowait(slot)
+            except BaseException:
+                # 起動途中で失敗した場合は、起動済みのブラウザとドライバを止めて未起動の状態に戻す
+                await self._teardown()
+                raise
+            self.started = True
+            logging.info(f"ブラウザプールを起動しました (ブラウザ数: {self.size}, コンテキスト/ブラウザ: {self.contexts_per_browser})")
+
+    async def close(self):
+        async with self._start_lock:
+            if not self.started:
+                return
+            await self._teardown()
+            logging.info("ブラウザプールを停止しました")
+
+    async def _teardown(self):
+        for slot in self._slots:
+            await self._close_context(slot)
+        for pooled_browser in self._browsers:
+            await self._close_browser(pooled_browser)
+        if self._playwright:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logging.warning(f"Playwrightの停止中にエラー: {e}")
+        self._playwright = None
+        self._browsers = []
+        self._slots = []
+        self._idle = asyncio.Queue()
+        self._generation += 1
+        self.started = False
+
+    async def _launch(self, pooled_browser):
+        with METRICS.span("browser_launch"):
+            browser = await self._playwright.chromium.launch(**self.launch_options)
+
+        def on_disconnected(_browser, pooled_browser=pooled_browser):
+            pooled_browser.crashed = True
+
+        browser.on("disconnected", on_disconnected)
+        pooled_browser.browser = browser
+        pooled_browser.generation += 1
+        pooled_browser.pages_served = 0
+        pooled_browser.crashed = False
+        pooled_browser.needs_restart = False
+
+    async def _close_browser(self, pooled_browser):
+        browser = pooled_browser.browser
+        pooled_browser.browser = None
+        if browser is None:
+            return
+        try:
+            if browser.is_connected():
+                await browser.close()
+        except Exception as e:
+            logging.warning(f"ブラウザ[{pooled_browser.index}]の終了中にエラー: {e}")
+
+    async def _restart(self, pooled_browser, reason):
+        logging.info(f"ブラウザ[{pooled_browser.index}]を再起動します (理由: {reason}, 処理ページ数: {pooled_browser.pages_served})")
+        await self._close_browser(pooled_browser)
+        await self._launch(pooled_browser)
+
+    async def _close_context(self, slot):
+        context = slot.context
+        slot.context = None
+        if context is None:
+            return
+        try:
+            await context.close()
+        except Exception as e:
+            logging.debug(f"コンテキスト終了中にエラー: {e}")
+
+    async def _rotate_context(self, slot):
+        await self._close_context(slot)
+        pooled_browser = slot.pooled_browser
+        with METRICS.span("context_create"):
+            options = self.context_options_factory()
+            slot.context = await pooled_browser.browser.new_context(**options)
+            with METRICS.span("stealth_inject"):
+                # ページごとではなくコンテキストに1回だけ登録し、以降の全ページに適用させる
+                await slot.context.add_init_script(script=stealth_init_script())
+            if self.context_setup is not None:
+                await self.context_setup(slot.context, options)
+        slot.generation = pooled_browser.generation
+        slot.pages_served = 0
+
+    def retire_context(self, context):
+        """指定したコンテキストを次回の利用時に新しいフィンガープリントで作り直させる"""
+        for slot in self._slots:
+            if slot.context is context:
+                slot.pages_served = self.max_pages_per_context
+
+    def retire_all_contexts(self):
+        """全コンテキストを次回の利用時に作り直させる（レンダラーのメモリを解放する）"""
+        for slot in self._slots:
+            slot.pages_served = self.max_pages_per_context
+
+    def request_restart(self, reason="memory"):
+        """全ブラウザを、使用中のページが終わり次第再起動させる"""
+        for pooled_browser in self._browsers:
+            pooled_browser.needs_restart = reason
+
+    @asynccontextmanager
+    async def page(self):
+        """スロットを1つ借りて、新しいページを返す（ステルスはコンテキストの init script で適用済み）"""
+        if not self.started:
+            await self.start()
+        slot = await self._idle.get()
+        generation = self._generation
+        pooled_browser = slot.pooled_browser
+        acquired = False
+        page = None
+        try:
+            async with pooled_browser.condition:
+                if not pooled_browser.is_healthy():
+                    await self._restart(pooled_browser, "crash")
+                elif pooled_browser.needs_restart:
+                    # 他のコンテキストが使用中の間は待ってから再起動する
+                    await pooled_browser.condition.wait_for(lambda: pooled_browser.in_use == 0)
+                    if pooled_browser.needs_restart:
+                        await self._restart(pooled_browser, pooled_browser.needs_restart)
+                pooled_browser.in_use += 1
+                acquired = True
+            if (slot.context is None or slot.generation != pooled_browser.generation
+                    or slot.pages_served >= self.max_pages_per_context):
+                await self._rotate_context(slot)
+            page = await slot.context.new_page()
+            yield page
+        finally:
+            if page is not None:
+                try:
+                    if not page.is_closed():
+                        await page.close()
+                except Exception as e:
+                    logging.debug(f"ページ終了中にエラー: {e}")
+            if acquired:
+                slot.pages_served += 1
+                async with pooled_browser.condition:
+                    pooled_browser.in_use -= 1
+                    pooled_browser.pages_served += 1
+                    if pooled_browser.pages_served >= self.max_pages_per_browser:
+                        pooled_browser.needs_restart = "page limit"
+                    pooled_browser.condition.notify_all()
+            if generation == self._generation:
+                self._idle.put_nowait(slot)
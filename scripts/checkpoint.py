@@ -0,0 +1,99 @@
+# scripts/checkpoint.py
+import json
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from records import AppRecord
+
+
+def utc_today():
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+class RunCheckpoint:
+    """UTC日ごとに完了済みAppIDと結果を記録するローカルのチェックポイント
+
+    コンテナが再起動しても、同じ日の実行は記録済みのAppIDをスキップして再開できる。
+    flushed はそのレコードが書き込み先（BigQuery等）に保存済みかどうかを表し、
+    未保存のレコードは再開時にシンクへ再投入する。
+    """
+
+    def __init__(self, db_path, scrape_date=None):
+        self.db_path = str(db_path)
+        self.scrape_date = scrape_date or utc_today()
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS completed_apps (
+                scrape_date TEXT NOT NULL,
+                app_id INTEGER NOT NULL,
+                record TEXT,
+                flushed INTEGER NOT NULL DEFAULT 0,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (scrape_date, app_id)
+            )
+        """)
+        self._conn.commit()
+
+    def completed_appids(self):
+        rows = self._conn.execute(
+            "SELECT app_id FROM completed_apps WHERE scrape_date = ?", (self.scrape_date,))
+        return {app_id for (app_id,) in rows}
+
+    def filter_pending(self, appid_list):
+        completed = self.completed_appids()
+        pending = [appid for appid in appid_list if appid not in completed]
+        if completed:
+            logging.info(f"チェックポイント: {self.scrape_date} の完了済み {len(appid_list) - len(pending)} 件をスキップします")
+        return pending
+
+    def record_completed(self, record):
+        with self._conn:
+            self._conn.execute("""
+                INSERT INTO completed_apps (scrape_date, app_id, record, flushed, completed_at)
+                VALUES (?, ?, ?, 0, ?)
+                ON CONFLICT (scrape_date, app_id) DO UPDATE SET
+                    record = excluded.record, flushed = 0, completed_at = excluded.completed_at
+            """, (self.scrape_date, record.app_id, json.dumps(record.as_tuple()[:-1], ensure_ascii=False), time.time()))
+
+    def mark_flushed(self, records):
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE completed_apps SET flushed = 1 WHERE scrape_date = ? AND app_id = ?",
+                [(self.scrape_date, appid) for appid in records.app_id])
+
+    def mark_completed_externally(self, appids):
+        """他の経路（BigQuery上の既存データ等）で保存済みのAppIDを完了として記録"""
+        now = time.time()
+        with self._conn:
+            self._conn.executemany("""
+                INSERT OR IGNORE INTO completed_apps (scrape_date, app_id, record, flushed, completed_at)
+                VALUES (?, ?, NULL, 1, ?)
+            """, [(self.scrape_date, appid, now) for appid in appids])
+
+    def unflushed_records(self):
+        rows = self._conn.execute(
+            "SELECT record FROM completed_apps WHERE scrape_date = ? AND flushed = 0 AND record IS NOT NULL",
+            (self.scrape_date,))
+        records = []
+        for (record,) in rows:
+            values = json.loads(record)
+            # 旧形式（日本語キーの dict）で保存されたレコードも読み込む
+            records.append(AppRecord.from_dict(values) if isinstance(values, dict) else AppRecord(*values))
+        return records
+
+    def prune(self, keep_days=7):
+        cutoff = (datetime.fromisoformat(self.scrape_date) - timedelta(days=keep_days)).date().isoformat()
+        with self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM completed_apps WHERE scrape_date < ?", (cutoff,)).rowcount
+        if deleted:
+            logging.info(f"チェックポイントから {cutoff} より前の {deleted} 件を削除しました")
+
+    def close(self):
+        self._conn.close()
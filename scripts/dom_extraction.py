@@ -0,0 +1,80 @@
+# scripts/dom_extraction.py
+from fetch_pipeline import ExtractedPage
+
+# CloudFlareのチャレンジページに現れる要素
+CHALLENGE_SELECTOR = "#challenge-form, #cf-challenge-running, .cf-browser-verification, #challenge-stage"
+
+# ブラウザ内で title / followers / レビューのツールチップ / Owners を抽出し、小さなJSONだけを返す。
+# html_parsers の bs4 バックエンドと同じ規則（.string の扱い、get_text(strip=True) の連結）に合わせている。
+EXTRACT_FIELDS_SCRIPT = """
+(challengeSelector) => {
+  if (document.querySelector(challengeSelector)) {
+    return {challenge: true, fields: {}};
+  }
+  const SKIP = new Set(['SCRIPT', 'STYLE', 'TEMPLATE']);
+  const strings = (el) => {
+    const result = [];
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+      if (!SKIP.has(node.parentNode.nodeName)) result.push(node.data);
+    }
+    return result;
+  };
+  const getText = (el, separator = '') =>
+    strings(el).map((s) => s.trim()).filter((s) => s).join(separator);
+  // BeautifulSoup の Tag.string 相当（子が1つだけの場合のみ文字列を返す）
+  const soupString = (el) => {
+    while (el.childNodes.length === 1) {
+      const child = el.childNodes[0];
+      if (child.nodeType === Node.TEXT_NODE || child.nodeType === Node.COMMENT_NODE) return child.data;
+      el = child;
+    }
+    return null;
+  };
+  const nextSibling = (el, tagName) => {
+    for (let sibling = el.nextElementSibling; sibling; sibling = sibling.nextElementSibling) {
+      if (sibling.tagName === tagName) return sibling;
+    }
+    return null;
+  };
+  const fields = {};
+
+  const title = document.querySelector('h1[itemprop="name"]');
+  if (title) fields.title = getText(title);
+
+  // .string が一致する見出しがあればそれだけを使い、無ければテキストが一致する見出しを
+  // 順に見て、後ろに ul > li があるものを使う（bs4 の find / find_all ループと同じ）
+  const headers = Array.from(document.querySelectorAll('h3'));
+  const storeData = headers.find((h3) => (soupString(h3) || '').toLowerCase().includes('store data'));
+  const candidates = storeData ? [storeData]
+    : headers.filter((h3) => strings(h3).join('').toLowerCase().includes('store data'));
+  for (const h3 of candidates) {
+    const followersList = nextSibling(h3, 'UL');
+    const followers = followersList && followersList.querySelector('li');
+    if (followers) {
+      fields.followers = getText(followers);
+      break;
+    }
+  }
+
+  const reviews = Array.from(document.querySelectorAll('strong'))
+    .find((strong) => (soupString(strong) || '').toLowerCase().includes('user reviews'));
+  const tooltip = reviews && reviews.parentElement && reviews.parentElement.querySelector('span.tooltip');
+  if (tooltip) {
+    const parts = getText(tooltip, '|').split('|');
+    [fields.positive_reviews, fields.negative_reviews] = parts.length >= 2 ? parts : ['N/A', 'N/A'];
+  }
+
+  const ownersLabel = Array.from(document.querySelectorAll('td')).find((td) => soupString(td) === 'Owners');
+  const owners = ownersLabel && nextSibling(ownersLabel, 'TD');
+  if (owners) fields.owners = getText(owners).split(' ± ')[0];
+
+  return {challenge: false, fields};
+}
+"""
+
+
+async def extract_fields_in_page(page):
+    """ページ内で抽出を実行し、HTML全体を転送せずに ExtractedPage を返す"""
+    result = await page.evaluate(EXTRACT_FIELDS_SCRIPT, CHALLENGE_SELECTOR)
+    return ExtractedPage(result.get("fields") or {}, challenge=bool(result.get("challenge")))
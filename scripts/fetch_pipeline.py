@@ -0,0 +1,161 @@
+# scripts/fetch_pipeline.py
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+from pathlib import Path
+from metrics import METRICS
+
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+TIER_UNLOCKER = "unlocker"
+TIERS = (TIER_HTTP, TIER_BROWSER, TIER_UNLOCKER)
+
+# チャレンジページ固有の要素（dom_extraction.CHALLENGE_SELECTOR と同じもの）とタイトル・文言。
+# "cloudflare" を含むだけの通常ページ（フッターや cdn-cgi のスクリプト等）は対象にしない
+CHALLENGE_PATTERN = re.compile(
+    r"""<title>\s*just a moment|checking your browser|cf-browser-verification"""
+    r"""|id=["']?(?:challenge-form|challenge-stage|cf-challenge-running)\b""",
+    re.IGNORECASE)
+
+
+def is_challenge_page(html_content):
+    """CloudFlareのチャレンジページかどうかを判定"""
+    return CHALLENGE_PATTERN.search(html_content) is not None
+
+
+def url_pattern(url):
+    """URL中の数値を置き換えて、ティア統計の集計キーにする"""
+    return re.sub(r'\d+', '{id}', url)
+
+
+class ExtractedPage:
+    """ブラウザ内で抽出済みのフィールド（HTML文字列の代わりにティアが返す）"""
+    __slots__ = ("fields", "challenge", "html")
+
+    def __init__(self, fields, challenge=False, html=None):
+        self.fields = fields
+        self.challenge = challenge
+        # ページストアへの保存用に取得したHTML（任意）
+        self.html = html
+
+
+class FetchResult:
+    __slots__ = ("url", "tier", "html", "fields")
+
+    def __init__(self, url, tier, html, fields=None):
+        self.url = url
+        self.tier = tier
+        self.html = html
+        self.fields = fields
+
+
+class TierStats:
+    """URLパターンごとのティア別成功率を記録し、最初に試すティアを決める
+
+    あるティアの試行数が min_samples 以上で成功率が min_success_rate を下回ると、
+    そのパターンでは次のティアから開始する。explore_rate の確率でスキップ中の
+    ティアも再度試し、状況の変化を検出できるようにする。
+    """
+
+    def __init__(self, min_samples=20, min_success_rate=0.2, explore_rate=0.05, state_path=None):
+        self.min_samples = min_samples
+        self.min_success_rate = min_success_rate
+        self.explore_rate = explore_rate
+        self.state_path = Path(state_path) if state_path else None
+        self._stats = {}
+        if self.state_path and self.state_path.exists():
+            try:
+                self._stats = json.loads(self.state_path.read_text(encoding='utf-8'))
+            except (OSError, json.JSONDecodeError) as e:
+                logging.warning(f"ティア統計の読み込みに失敗しました: {e}")
+
+    def record(self, pattern, tier, success):
+        tier_stats = self._stats.setdefault(pattern, {}).setdefault(tier, {"attempts": 0, "successes": 0})
+        tier_stats["attempts"] += 1
+        if success:
+            tier_stats["successes"] += 1
+
+    def success_rate(self, pattern, tier):
+        tier_stats = self._stats.get(pattern, {}).get(tier)
+        if not tier_stats or tier_stats["attempts"] == 0:
+            return None
+        return tier_stats["successes"] / tier_stats["attempts"]
+
+    def start_tier(self, pattern):
+        if random.random() < self.explore_rate:
+            return TIERS[0]
+        for tier in TIERS[:-1]:
+            tier_stats = self._stats.get(pattern, {}).get(tier)
+            if not tier_stats or tier_stats["attempts"] < self.min_samples:
+                return tier
+            if tier_stats["successes"] / tier_stats["attempts"] >= self.min_success_rate:
+                return tier
+        return TIERS[-1]
+
+    def snapshot(self):
+        return json.loads(json.dumps(self._stats))
+
+    def save(self):
+        if not self.state_path:
+            return
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            # 複数のレプリカが同じファイルに保存しても壊れないよう、一時ファイルから置き換える
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.state_path.parent,
+                                             prefix=".tier_stats-", suffix=".tmp", delete=False) as f:
+                json.dump(self._stats, f, ensure_ascii=False)
+            os.replace(f.name, self.state_path)
+        except OSError as e:
+            logging.warning(f"ティア統計の保存に失敗しました: {e}")
+
+
+class TieredFetcher:
+    """HTTP → Playwright → BrightData の順にエスカレーションしてページを取得する
+
+    各ティアは ``await fetch(url)`` でHTML文字列か ExtractedPage（失敗時は None）を返すコルーチン関数。
+    """
+
+    def __init__(self, tier_fetchers, stats=None):
+        self.tier_fetchers = tier_fetchers
+        self.stats = stats or TierStats()
+
+    async def fetch(self, url):
+        pattern = url_pattern(url)
+        start = TIERS.index(self.stats.start_tier(pattern))
+        for tier in TIERS[start:]:
+            fetch_tier = self.tier_fetchers.get(tier)
+            if fetch_tier is None:
+                continue
+            try:
+                with METRICS.span("fetch", tier=tier):
+                    content = await fetch_tier(url)
+            except Exception as e:
+                logging.warning(f"{tier} ティアでの取得中にエラー ({url}): {e}")
+                content = None
+            if isinstance(content, ExtractedPage):
+                challenge = content.challenge
+                if content.fields and not challenge:
+                    self.stats.record(pattern, tier, True)
+                    METRICS.inc("scraper_successes_total", tier=tier)
+                    logging.info(f"{tier} ティアでページ内抽出に成功: {url}")
+                    return FetchResult(url, tier, content.html, fields=content.fields)
+            else:
+                # アンロッカーはチャレンジを解決済みのHTMLを返すので判定しない
+                with METRICS.span("challenge_detect", tier=tier):
+                    challenge = bool(content) and tier != TIER_UNLOCKER and is_challenge_page(content)
+                if content and not challenge:
+                    self.stats.record(pattern, tier, True)
+                    METRICS.inc("scraper_successes_total", tier=tier)
+                    logging.info(f"{tier} ティアで取得成功: {url}")
+                    return FetchResult(url, tier, content)
+            self.stats.record(pattern, tier, False)
+            if challenge:
+                METRICS.inc("scraper_challenges_total", tier=tier)
+            if tier != TIERS[-1]:
+                METRICS.inc("scraper_fallbacks_total", from_tier=tier)
+            reason = "CloudFlare チャレンジを検出" if challenge else "取得失敗"
+            logging.warning(f"{tier} ティア: {reason}。次のティアにエスカレーションします ({url})")
+        return None
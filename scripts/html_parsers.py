@@ -0,0 +1,539 @@
+# scripts/html_parsers.py
+import logging
+import os
+import re
+from html.parser import HTMLParser
+from records import AppRecord
+
+DEFAULT_PARSER_BACKEND = os.environ.get("HTML_PARSER_BACKEND", "bs4")
+
+# html.parser（BeautifulSoup）が子要素を持たないものとして扱うタグ
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound',
+    'command', 'frame', 'image', 'isindex', 'nextid', 'spacer',
+}
+# get_text() の対象にならない文字列を持つタグ（bs4 では Script/Stylesheet 型になる）
+NON_TEXT_CONTAINERS = {'script', 'style', 'template'}
+
+
+NUMBER_WITH_SUFFIX = re.compile(r'~?([\d.,]+)\s*([MKBmkb]?)')
+SUFFIX_MULTIPLIERS = {'': 1, 'k': 1_000, 'm': 1_000_000, 'b': 1_000_000_000}
+
+
+def parse_numbers_with_suffix(texts):
+    """parse_number_with_suffix のバッチ版。桁区切りだけの整数は正規表現を使わずに変換する"""
+    search = NUMBER_WITH_SUFFIX.search
+    results = []
+    for text in texts:
+        if not text:
+            results.append(None)
+            continue
+        text = text.strip()
+        digits = text.replace(',', '')
+        if digits.isascii() and digits.isdigit():
+            results.append(int(digits))
+            continue
+        match = search(text)
+        if not match:
+            results.append(None)
+            continue
+        try:
+            number = float(match.group(1).replace(',', ''))
+        except ValueError:
+            results.append(None)
+            continue
+        results.append(int(number * SUFFIX_MULTIPLIERS[match.group(2).lower()]))
+    return results
+
+
+def parse_number_with_suffix(text):
+    return parse_numbers_with_suffix((text,))[0]
+
+
+def _strip_join(strings, separator=''):
+    """BeautifulSoup の get_text(separator, strip=True) と同じ規則で文字列を連結"""
+    return separator.join(s.strip() for s in strings if s and s.strip())
+
+
+def _split_reviews(tooltip_text):
+    parts = tooltip_text.split('|')
+    if len(parts) >= 2:
+        return parts[0], parts[1]
+    return "N/A", "N/A"
+
+
+def build_record(appid, fields):
+    """バックエンドが抽出した生テキストから出力レコードを組み立てる"""
+    followers, positive, negative, owners = parse_numbers_with_suffix((
+        fields.get("followers", "N/A"), fields.get("positive_reviews", "N/A"),
+        fields.get("negative_reviews", "N/A"), fields.get("owners", "N/A"),
+    ))
+    return AppRecord(appid, title_name=fields.get("title", "N/A"), current_followers=followers,
+                     positive_reviews=positive, negative_reviews=negative, owner_estimation=owners)
+
+
+# --- BeautifulSoup (html.parser) ---
+
+def _extract_bs4(html_content, appid, features='html.parser'):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, features)
+    fields = {}
+
+    title_tag = soup.find('h1', itemprop='name')
+    if title_tag:
+        fields["title"] = title_tag.get_text(strip=True)
+
+    try:
+        store_data_header = soup.find('h3', string=lambda t: t and 'store data' in t.lower())
+        if store_data_header:
+            ul_tag = store_data_header.find_next_sibling('ul')
+            if ul_tag:
+                followers_li = ul_tag.find('li')
+                if followers_li:
+                    fields["followers"] = followers_li.get_text(strip=True)
+        else:
+            store_sections = soup.find_all('h3')
+            for h3_tag in store_sections:
+                if 'store data' in h3_tag.get_text().lower():
+                    next_ul = h3_tag.find_next_sibling('ul')
+                    if next_ul:
+                        first_li = next_ul.find('li')
+                        if first_li:
+                            fields["followers"] = first_li.get_text(strip=True)
+                            break
+    except Exception as e:
+        logging.warning(f"フォロワー数抽出エラー (AppID: {appid}): {e}")
+
+    try:
+        review_summary_strong = soup.find('strong', string=lambda t: t and "user reviews" in t.lower())
+        if review_summary_strong:
+            parent_div = review_summary_strong.parent
+            if parent_div:
+                tooltip_span = parent_div.find('span', class_='tooltip')
+                if tooltip_span:
+                    tooltip_text = tooltip_span.get_text(separator='|', strip=True)
+                    fields["positive_reviews"], fields["negative_reviews"] = _split_reviews(tooltip_text)
+    except Exception as e:
+        logging.warning(f"レビュー数抽出エラー (AppID: {appid}): {e}")
+
+    try:
+        owner_row = soup.find('td', string='Owners')
+        if owner_row:
+            owner_value_td = owner_row.find_next_sibling('td')
+            if owner_value_td:
+                fields["owners"] = owner_value_td.get_text(strip=True).split(' ± ')[0]
+    except Exception as e:
+        logging.warning(f"オーナー推定数抽出エラー (AppID: {appid}): {e}")
+    return fields
+
+
+# --- lxml ---
+
+def _lxml_string(element):
+    """BeautifulSoup の Tag.string 相当（子が1つだけの場合のみ文字列を返す）"""
+    while True:
+        children = len(element)
+        if children == 0:
+            return element.text
+        if children == 1 and not element.text and not element[0].tail:
+            element = element[0]
+            if not isinstance(element.tag, str):
+                # コメントも bs4 では文字列の子として扱われる
+                return element.text
+            continue
+        return None
+
+
+def _lxml_strings(element):
+    """get_text() と同じく script/style/コメント内の文字列を除いてテキストを列挙"""
+    if isinstance(element.tag, str) and element.tag not in NON_TEXT_CONTAINERS and element.text:
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str):
+            yield from _lxml_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _lxml_next_sibling(element, tag):
+    for sibling in element.itersiblings():
+        if sibling.tag == tag:
+            return sibling
+    return None
+
+
+def _extract_lxml(html_content, appid):
+    import lxml.etree
+    import lxml.html
+
+    try:
+        root = lxml.html.document_fromstring(html_content)
+    except lxml.etree.ParserError:
+        # 空・空白のみ・コメントのみの文書。bs4 と同じく全項目 N/A のレコードにする
+        return {}
+    fields = {}
+
+    title_tag = next((h1 for h1 in root.iter('h1') if h1.get('itemprop') == 'name'), None)
+    if title_tag is not None:
+        fields["title"] = _strip_join(_lxml_strings(title_tag))
+
+    h3_tags = list(root.iter('h3'))
+    store_data_header = next(
+        (h3 for h3 in h3_tags if (_lxml_string(h3) or '').lower().find('store data') >= 0), None)
+    candidates = [store_data_header] if store_data_header is not None else [
+        h3 for h3 in h3_tags if 'store data' in ''.join(_lxml_strings(h3)).lower()]
+    for h3_tag in candidates:
+        ul_tag = _lxml_next_sibling(h3_tag, 'ul')
+        first_li = next(ul_tag.iter('li'), None) if ul_tag is not None else None
+        if first_li is not None:
+            fields["followers"] = _strip_join(_lxml_strings(first_li))
+            break
+
+    review_summary_strong = next(
+        (s for s in root.iter('strong') if 'user reviews' in (_lxml_string(s) or '').lower()), None)
+    if review_summary_strong is not None:
+        parent_div = review_summary_strong.getparent()
+        tooltip_span = next(
+            (span for span in parent_div.iter('span') if 'tooltip' in (span.get('class') or '').split()), None)
+        if tooltip_span is not None:
+            tooltip_text = _strip_join(_lxml_strings(tooltip_span), '|')
+            fields["positive_reviews"], fields["negative_reviews"] = _split_reviews(tooltip_text)
+
+    owner_row = next((td for td in root.iter('td') if _lxml_string(td) == 'Owners'), None)
+    if owner_row is not None:
+        owner_value_td = _lxml_next_sibling(owner_row, 'td')
+        if owner_value_td is not None:
+            fields["owners"] = _strip_join(_lxml_strings(owner_value_td)).split(' ± ')[0]
+    return fields
+
+
+# --- selectolax ---
+
+def _selectolax_string(node):
+    while True:
+        children = list(node.iter(include_text=True))
+        if len(children) != 1:
+            return None
+        child = children[0]
+        if child.tag == '-text':
+            return child.text_content
+        if child.tag == '-comment':
+            return child.comment_content
+        node = child
+
+
+def _selectolax_next_sibling(node, tag):
+    sibling = node.next
+    while sibling is not None:
+        if sibling.tag == tag:
+            return sibling
+        sibling = sibling.next
+    return None
+
+
+def _selectolax_text(node, separator=''):
+    return _strip_join((n.text_content for n in node.traverse(include_text=True)
+                        if n.tag == '-text' and n.parent.tag not in NON_TEXT_CONTAINERS), separator)
+
+
+def _extract_selectolax(html_content, appid):
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+
+    tree = SelectolaxParser(html_content)
+    fields = {}
+
+    title_tag = tree.css_first('h1[itemprop="name"]')
+    if title_tag is not None:
+        fields["title"] = _selectolax_text(title_tag)
+
+    h3_tags = tree.css('h3')
+    store_data_header = next(
+        (h3 for h3 in h3_tags if 'store data' in (_selectolax_string(h3) or '').lower()), None)
+    candidates = [store_data_header] if store_data_header is not None else [
+        h3 for h3 in h3_tags if 'store data' in ''.join(
+            n.text_content for n in h3.traverse(include_text=True)
+            if n.tag == '-text' and n.parent.tag not in NON_TEXT_CONTAINERS).lower()]
+    for h3_tag in candidates:
+        ul_tag = _selectolax_next_sibling(h3_tag, 'ul')
+        first_li = ul_tag.css_first('li') if ul_tag is not None else None
+        if first_li is not None:
+            fields["followers"] = _selectolax_text(first_li)
+            break
+
+    review_summary_strong = next(
+        (s for s in tree.css('strong') if 'user reviews' in (_selectolax_string(s) or '').lower()), None)
+    if review_summary_strong is not None:
+        tooltip_span = review_summary_strong.parent.css_first('span.tooltip')
+        if tooltip_span is not None:
+            tooltip_text = _selectolax_text(tooltip_span, '|')
+            fields["positive_reviews"], fields["negative_reviews"] = _split_reviews(tooltip_text)
+
+    owner_row = next((td for td in tree.css('td') if _selectolax_string(td) == 'Owners'), None)
+    if owner_row is not None:
+        owner_value_td = _selectolax_next_sibling(owner_row, 'td')
+        if owner_value_td is not None:
+            fields["owners"] = _selectolax_text(owner_value_td).split(' ± ')[0]
+    return fields
+
+
+# --- ストリーミング抽出 ---
+
+# テキストを収集する必要があるタグ
+TEXT_TRACKED_TAGS = {'h1', 'h3', 'li', 'span', 'td'}
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _Element:
+    __slots__ = ("tag", "attrs", "parent", "index", "children", "last_child", "strings", "string")
+
+    def __init__(self, tag, attrs, parent, index):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.index = index
+        self.children = 0
+        # 直近の子要素: _Element またはテキスト（子が1つの時の Tag.string 判定に使う）
+        self.last_child = None
+        self.strings = [] if tag in TEXT_TRACKED_TAGS else None
+        self.string = None
+
+    def is_descendant_of(self, ancestor):
+        element = self.parent
+        while element is not None:
+            if element is ancestor:
+                return True
+            element = element.parent
+        return False
+
+
+class _SiblingWatch:
+    """h3/td の後に続く同じ親の兄弟要素を待ち受ける"""
+    __slots__ = ("anchor", "target", "item", "text", "done")
+
+    def __init__(self, anchor):
+        self.anchor = anchor
+        self.target = None
+        self.item = None
+        self.text = None
+        self.done = False
+
+
+class _StreamingExtractor(HTMLParser):
+    """必要なブロックだけを追跡し、全て確定した時点で解析を打ち切る抽出器
+
+    BeautifulSoup (html.parser) と同じ要素スタックの規則（void要素・終了タグの対応付け）で
+    親子・兄弟関係を判定するため、出力は bs4 バックエンドと一致する。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields = {}
+        self.stack = [_Element('[document]', {}, None, 0)]
+        self.next_index = 1
+        self.text_run = []
+        self.title_done = False
+        # フォロワー: Tag.string が一致した最初の h3 と、get_text() のみ一致した h3 の候補
+        self.store_watch = None
+        self.fallback_watches = []
+        # レビュー: 'User reviews' の strong の親と、出現した tooltip span
+        self.review_parent = None
+        self.tooltips = []
+        self.reviews_done = False
+        # オーナー: 'Owners' の td の次の td
+        self.owner_watch = None
+
+    @property
+    def followers_done(self):
+        return self.store_watch is not None and self.store_watch.done
+
+    @property
+    def owners_done(self):
+        return self.owner_watch is not None and self.owner_watch.done
+
+    def _flush_text(self):
+        if not self.text_run:
+            return
+        text = ''.join(self.text_run)
+        self.text_run = []
+        current = self.stack[-1]
+        current.children += 1
+        current.last_child = text
+        if any(element.tag in NON_TEXT_CONTAINERS for element in self.stack):
+            return
+        for element in self.stack:
+            if element.strings is not None:
+                element.strings.append(text)
+
+    def handle_data(self, data):
+        self.text_run.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+        current = self.stack[-1]
+        current.children += 1
+        current.last_child = data
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        parent = self.stack[-1]
+        element = _Element(tag, dict(attrs), parent, self.next_index)
+        self.next_index += 1
+        parent.children += 1
+        parent.last_child = element
+        self._on_start(element)
+        if tag in VOID_ELEMENTS:
+            self._close(element)
+        else:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        for position in range(len(self.stack) - 1, 0, -1):
+            if self.stack[position].tag == tag:
+                break
+        else:
+            return
+        while len(self.stack) > position:
+            self._close(self.stack.pop())
+        if (self.title_done and self.followers_done and self.reviews_done and self.owners_done):
+            raise _StopParsing()
+
+    def finish(self):
+        self.close()
+        self._flush_text()
+        while len(self.stack) > 1:
+            self._close(self.stack.pop())
+        if "followers" not in self.fields and self.store_watch is None:
+            for watch in self.fallback_watches:
+                if watch.text is not None:
+                    self.fields["followers"] = watch.text
+                    break
+
+    def _watches(self):
+        if self.store_watch is not None:
+            return [self.store_watch]
+        return self.fallback_watches
+
+    def _on_start(self, element):
+        tag = element.tag
+        if tag == 'ul':
+            for watch in self._watches():
+                if watch.target is None and not watch.done and element.parent is watch.anchor.parent:
+                    watch.target = element
+        elif tag == 'li':
+            for watch in self._watches():
+                if watch.target is not None and watch.item is None and element.is_descendant_of(watch.target):
+                    watch.item = element
+        elif tag == 'td':
+            watch = self.owner_watch
+            if watch is not None and watch.target is None and element.parent is watch.anchor.parent:
+                watch.target = element
+
+    def _close(self, element):
+        if element.children == 1:
+            child = element.last_child
+            element.string = child.string if isinstance(child, _Element) else child
+        tag = element.tag
+        if tag == 'h1':
+            if not self.title_done and element.attrs.get('itemprop') == 'name':
+                self.fields["title"] = _strip_join(element.strings)
+                self.title_done = True
+        elif tag == 'h3':
+            if self.store_watch is None:
+                if element.string and 'store data' in element.string.lower():
+                    self.store_watch = _SiblingWatch(element)
+                elif 'store data' in ''.join(element.strings).lower():
+                    self.fallback_watches.append(_SiblingWatch(element))
+        elif tag == 'ul':
+            for watch in self._watches():
+                if watch.target is element and watch.item is None:
+                    watch.done = True
+        elif tag == 'li':
+            for watch in self._watches():
+                if watch.item is element:
+                    watch.text = _strip_join(element.strings)
+                    watch.done = True
+                    if watch is self.store_watch:
+                        self.fields["followers"] = watch.text
+        elif tag == 'span':
+            if not self.reviews_done and 'tooltip' in (element.attrs.get('class') or '').split():
+                self.tooltips.append(element)
+        elif tag == 'strong':
+            if self.review_parent is None and element.string and 'user reviews' in element.string.lower():
+                self.review_parent = element.parent
+        elif tag == 'td':
+            watch = self.owner_watch
+            if watch is None:
+                if element.string == 'Owners':
+                    self.owner_watch = _SiblingWatch(element)
+            elif element is watch.target:
+                self.fields["owners"] = _strip_join(element.strings).split(' ± ')[0]
+                watch.done = True
+
+        # 親要素が閉じた時点で、その配下の兄弟探索・tooltip探索は確定する
+        if element is self.review_parent and not self.reviews_done:
+            tooltip = min((span for span in self.tooltips if span.is_descendant_of(element)),
+                          key=lambda span: span.index, default=None)
+            if tooltip is not None:
+                tooltip_text = _strip_join(tooltip.strings, '|')
+                self.fields["positive_reviews"], self.fields["negative_reviews"] = _split_reviews(tooltip_text)
+            self.reviews_done = True
+        for watch in self._watches():
+            if element is watch.anchor.parent and watch.target is None:
+                watch.done = True
+        if self.owner_watch is not None and element is self.owner_watch.anchor.parent:
+            self.owner_watch.done = True
+        # tooltip 以外は閉じた時点でテキストが不要になるので解放する
+        if element.strings is not None and not (self.tooltips and self.tooltips[-1] is element):
+            element.strings = None
+
+
+def _extract_streaming(html_content, appid):
+    extractor = _StreamingExtractor()
+    try:
+        extractor.feed(html_content)
+        extractor.finish()
+    except _StopParsing:
+        pass
+    return extractor.fields
+
+
+# lxml と selectolax は HTML5 の木構築規則で閉じタグを補うため、不正なマークアップ
+# （閉じていない <td>/<li>、<p> 内の <ul> 等）では html.parser ベースの bs4・streaming と
+# 結果が異なることがある（bench_parsers.py の MALFORMED_CASES を参照）。既定は bs4 のまま。
+PARSER_BACKENDS = {
+    "bs4": _extract_bs4,
+    "lxml": _extract_lxml,
+    "selectolax": _extract_selectolax,
+    "streaming": _extract_streaming,
+}
+
+
+def parse_html_content(html_content, appid, backend=None):
+    backend = backend or DEFAULT_PARSER_BACKEND
+    try:
+        extract = PARSER_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend: {backend}") from None
+    return build_record(appid, extract(html_content, appid))
+
+
+def extract_data_from_brightdata_html(html_content, appid, backend=None):
+    if not html_content:
+        logging.warning(f"BrightDataからHTMLコンテンツがありません (AppID: {appid})。")
+        return AppRecord.failed(appid, "HTMLコンテンツなし")
+    try:
+        return parse_html_content(html_content, appid, backend=backend)
+    except Exception as e:
+        logging.error(f"BrightData HTMLの解析中にエラー (AppID: {appid}): {e}", exc_info=True)
+        return AppRecord.failed(appid, str(e))
@@ -1,9 +1,14 @@
+import argparse
 import asyncio
+import io
 import json
 import logging
+import os
 import sys
 import time
+import uuid
 import aiohttp
+from datetime import date, timedelta
 from pathlib import Path
 
 logging.basicConfig(
@@ -12,18 +17,77 @@ logging.basicConfig(
     stream=sys.stdout
 )
 
-from datetime import datetime, timezone
-from google.cloud import bigquery
-from google.cloud import secretmanager
+from applist_cache import AppIdList, AppListCache, load_valid_appids
+from checkpoint import RunCheckpoint
+from page_store import PageStore, replay_records
+from metrics import METRICS
+from refresh_planner import RefreshPlanner, SnapshotHistory
 from scraper_core import SteamDBScraper
+from session_store import SessionStore
+from records import ROW_COLUMNS, RecordBatch
+from sinks import SQLiteMetricsStore, StreamingSink
+from work_distribution import LeasedWorkQueue, SQLiteLeaseStore, parse_shard, shard_appids
 
 # BigQuery設定
 PROJECT_ID = "capable-blend-244100"
 DATASET_ID = "steam_data"
 TABLE_ID = "steam_app_metrics"
+# ダッシュボード用の集計済みテーブル（AppIDごとの最新値・前回比）
+LATEST_TABLE_ID = "steam_app_metrics_latest_by_app"
+DELTA_TABLE_ID = "steam_app_metrics_daily_delta"
+MAINTAIN_DERIVED_TABLES = os.environ.get("MAINTAIN_DERIVED_TABLES", "1") == "1"
+# 前回比の計算で前回の取得日を探す日数（再取得間隔の上限30日より長くする）
+DELTA_LOOKBACK_DAYS = int(os.environ.get("DELTA_LOOKBACK_DAYS", "45"))
+
+# ストリーミング書き込み設定
+SINK_BATCH_SIZE = int(os.environ.get("SINK_BATCH_SIZE", "50"))
+SINK_FLUSH_INTERVAL = float(os.environ.get("SINK_FLUSH_INTERVAL", "60"))
+# 指定するとBigQueryの代わりにローカルのSQLiteへ書き込む（開発・テスト用）
+LOCAL_SINK_PATH = os.environ.get("LOCAL_SINK_PATH")
+
+# 再起動時に再開するためのチェックポイント設定
+STATE_DIR = Path(os.environ.get("STATE_DIR", "/app/state"))
+CHECKPOINT_BIGQUERY_LOOKUP = os.environ.get("CHECKPOINT_BIGQUERY_LOOKUP", "0") == "1"
+APPLIST_CACHE_TTL = int(os.environ.get("APPLIST_CACHE_TTL", str(24 * 60 * 60)))
+
+# 変動率に応じた再取得間隔の判定（off / local / bigquery）
+REFRESH_HISTORY_SOURCE = os.environ.get("REFRESH_HISTORY_SOURCE", "local")
+REFRESH_HISTORY_DAYS = int(os.environ.get("REFRESH_HISTORY_DAYS", "60"))
+
+# 取得したHTMLのページストア（空文字で無効化）
+PAGE_STORE_DIR = os.environ.get("PAGE_STORE_DIR", str(STATE_DIR / "pages"))
+PAGE_STORE_MAX_BYTES = int(os.environ.get("PAGE_STORE_MAX_BYTES", str(5 * 1024 ** 3)))
+PAGE_STORE_MAX_AGE_DAYS = int(os.environ.get("PAGE_STORE_MAX_AGE_DAYS", "90"))
+# ページ内抽出したブラウザティアのページもHTMLを取得して保存する
+PAGE_STORE_BROWSER_HTML = os.environ.get("PAGE_STORE_BROWSER_HTML", "0") == "1"
+REPLAY_BATCH_SIZE = 1000
+
+# URLパターンごとのティア別成功率（最初に試すティアの判定）の保存先（空文字で無効）
+TIER_STATS_PATH = os.environ.get("TIER_STATS_PATH", str(STATE_DIR / "tier_stats.json"))
+
+# メトリクス設定（METRICS_PORT=0 でエンドポイントを無効化）
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "8000"))
+METRICS_TRACE_PATH = os.environ.get("METRICS_TRACE_PATH")
+
+# ブラウザセッション（cf_clearance 等）の保存先（空文字で無効）と最大保持秒数
+SESSION_STORE_PATH = os.environ.get("SESSION_STORE_PATH", str(STATE_DIR / "sessions.sqlite3"))
+SESSION_MAX_AGE = int(os.environ.get("SESSION_MAX_AGE", str(6 * 60 * 60)))
+# セッションストア使用時、セッションを持たないブラウザコンテキストでCloudFlareのチャレンジの解決を
+# 待つ最大ミリ秒（0 で待たずにエスカレーション。セッションストアが無効なら使わない）
+CHALLENGE_WAIT_MS = int(os.environ.get("CHALLENGE_WAIT_MS", "8000"))
+
+# メモリ監視設定（プロセスツリーのRSS、MB。MEMORY_SOFT_LIMIT_MB=0 で無効化）
+MEMORY_SOFT_LIMIT_MB = int(os.environ.get("MEMORY_SOFT_LIMIT_MB", "1536"))
+MEMORY_HARD_LIMIT_MB = int(os.environ.get("MEMORY_HARD_LIMIT_MB", "2048"))
+
+# 複数コンテナでの分担設定（コマンドライン引数が優先）
+SCRAPER_SHARD = os.environ.get("SCRAPER_SHARD")
+WORK_QUEUE_PATH = os.environ.get("WORK_QUEUE_PATH")
 
 def get_secret(secret_name):
     """Secret Managerからシークレットを取得"""
+    from google.cloud import secretmanager
+
     try:
         client = secretmanager.SecretManagerServiceClient()
         secret_version_name = f"projects/{PROJECT_ID}/secrets/{secret_name}/versions/latest"
@@ -50,6 +114,8 @@ def load_sql_file(filename):
 
 def delete_today_data():
     """本日のデータを削除（UTC基準）"""
+    from google.cloud import bigquery
+
     try:
         client = bigquery.Client(project=PROJECT_ID)
         delete_sql = load_sql_file("delete_today_data.sql")
@@ -67,59 +133,57 @@ def delete_today_data():
         logging.error(f"データ削除中にエラー: {e}", exc_info=True)
         return False
 
-def save_data_to_csv(data_records):
-    """データを一時CSVファイルに保存"""
+def build_load_buffer(batch):
+    """RecordBatch を改行区切りJSON (NDJSON) のインメモリバッファに変換"""
+    buffer = io.BytesIO()
+    for row in batch.rows():
+        buffer.write(json.dumps(dict(zip(ROW_COLUMNS, row)), ensure_ascii=False).encode('utf-8'))
+        buffer.write(b"\n")
+    buffer.seek(0)
+    return buffer
+
+_derived_tables_ready = False
+
+def merge_derived_tables(client, temp_table_id, batch):
+    """一時テーブルのAppIDについて、最新スナップショットと前回比のテーブルを更新"""
+    global _derived_tables_ready
+
+    params = dict(
+        project_id=PROJECT_ID,
+        dataset_id=DATASET_ID,
+        table_id=TABLE_ID,
+        latest_table_id=LATEST_TABLE_ID,
+        delta_table_id=DELTA_TABLE_ID,
+        temp_table_id=temp_table_id,
+        history_start=date.fromisoformat(min(batch.scrape_dates())) - timedelta(days=DELTA_LOOKBACK_DAYS),
+    )
     try:
-        import csv
-        csv_file_path = "/tmp/steam_data_temp.csv"
-        
-        # CSVファイルに書き込み
-        with open(csv_file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['app_id', 'title_name', 'current_followers', 'positive_reviews', 
-                         'negative_reviews', 'owner_estimation', 'scraped_at', 'scrape_date']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            for record in data_records:
-                # ISO形式の日時文字列をdatetimeオブジェクトに変換
-                scraped_at = datetime.fromisoformat(record["取得日時"].replace('Z', '+00:00'))
-                scrape_date = scraped_at.date()
-                
-                writer.writerow({
-                    'app_id': record["AppID"],
-                    'title_name': record["タイトル名"],
-                    'current_followers': record.get("現在のfollower数"),
-                    'positive_reviews': record.get("ポジティブレビュー数"),
-                    'negative_reviews': record.get("ネガティブレビュー数"),
-                    'owner_estimation': record.get("オーナー推定数"),
-                    'scraped_at': scraped_at.isoformat(),
-                    'scrape_date': scrape_date.isoformat()
-                })
-        
-        logging.info(f"データを一時CSVファイルに保存しました: {csv_file_path} ({len(data_records)}件)")
-        return csv_file_path
-        
+        if not _derived_tables_ready:
+            # 初回のみ作成（既存テーブルがあれば何もしない）
+            client.query(load_sql_file("create_derived_tables.sql").format(**params)).result()
+            _derived_tables_ready = True
+        for filename in ("merge_latest_snapshot.sql", "merge_daily_delta.sql"):
+            job = client.query(load_sql_file(filename).format(**params))
+            job.result()
+            logging.info(f"{filename}: 挿入 {job.dml_stats.inserted_row_count}件, 更新 {job.dml_stats.updated_row_count}件")
+        return True
     except Exception as e:
-        logging.error(f"CSV保存中にエラー: {e}", exc_info=True)
-        return None
+        logging.error(f"集計済みテーブルの更新中にエラー: {e}", exc_info=True)
+        return False
 
-def save_to_bigquery(data_records):
+def save_to_bigquery(batch):
     """BigQueryにデータを保存（一括MERGE処理）"""
+    from google.cloud import bigquery
+
     try:
-        # まずCSVファイルに保存
-        csv_file_path = save_data_to_csv(data_records)
-        if not csv_file_path:
-            return False
-            
         client = bigquery.Client(project=PROJECT_ID)
         
-        # 一時テーブルにCSVデータをロード
-        temp_table_id = f"{PROJECT_ID}.{DATASET_ID}.temp_steam_data_{int(time.time())}"
+        # 一時テーブル名は実行ごとに一意にし、並行実行時の衝突を避ける
+        temp_table_id = f"{PROJECT_ID}.{DATASET_ID}.temp_steam_data_{int(time.time())}_{uuid.uuid4().hex[:8]}"
         
-        # CSVからBigQueryへのロード設定
+        # NDJSONからBigQueryへのロード設定
         job_config = bigquery.LoadJobConfig(
-            source_format=bigquery.SourceFormat.CSV,
-            skip_leading_rows=1,
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
             autodetect=False,
             schema=[
                 bigquery.SchemaField("app_id", "INTEGER"),
@@ -133,11 +197,10 @@ def save_to_bigquery(data_records):
             ]
         )
         
-        # CSVファイルを一時テーブルにロード
-        with open(csv_file_path, "rb") as source_file:
-            load_job = client.load_table_from_file(
-                source_file, temp_table_id, job_config=job_config
-            )
+        # ディスクを経由せず、メモリ上のバッファから一時テーブルにロード
+        load_job = client.load_table_from_file(
+            build_load_buffer(batch), temp_table_id, job_config=job_config
+        )
         
         load_job.result()  # ロード完了を待機
         logging.info(f"一時テーブルにデータをロードしました: {temp_table_id}")
@@ -165,51 +228,95 @@ def save_to_bigquery(data_records):
         rows_affected = merge_job.dml_stats.inserted_row_count + merge_job.dml_stats.updated_row_count
         logging.info(f"MERGE処理完了: 挿入 {merge_job.dml_stats.inserted_row_count}件, 更新 {merge_job.dml_stats.updated_row_count}件, 合計 {rows_affected}件")
         
+        # 同じ一時テーブルから、今回のAppIDの分だけ集計済みテーブルを更新
+        # 失敗した場合はバッチごと再送する（MERGEは冪等なので本テーブルは二重にならない）
+        derived_ok = not MAINTAIN_DERIVED_TABLES or merge_derived_tables(client, temp_table_id, batch)
+        
         # 一時テーブルを削除
         client.delete_table(temp_table_id)
         logging.info(f"一時テーブルを削除しました: {temp_table_id}")
         
-        # CSVファイルを削除
-        import os
-        os.remove(csv_file_path)
-        logging.info("一時CSVファイルを削除しました")
+        if not derived_ok:
+            return False
         
-        logging.info(f"BigQueryに一括MERGE処理で {len(data_records)} 件のレコードを保存しました")
+        logging.info(f"BigQueryに一括MERGE処理で {len(batch)} 件のレコードを保存しました")
         return True
 
     except Exception as e:
         error_message = str(e)
         if "streaming buffer" in error_message.lower():
-            logging.warning("ストリーミングバッファ制限により一括MERGE処理がスキップされました")
-            return True  # ストリーミングバッファスキップは正常動作
+            # 保存できていないので False を返し、レコードを未保存のまま残して後で再送させる
+            logging.warning("ストリーミングバッファ制限により一括MERGE処理ができませんでした。後で再送します")
+            return False
         else:
             logging.error(f"BigQuery一括MERGE処理中にエラー: {e}", exc_info=True)
             return False
 
 
+def get_scraped_appids(scrape_date):
+    """BigQueryから指定日に保存済みのAppIDを取得"""
+    from google.cloud import bigquery
+
+    try:
+        client = bigquery.Client(project=PROJECT_ID)
+        sql_template = load_sql_file("select_scraped_appids.sql")
+        if not sql_template:
+            return set()
+        query = sql_template.format(
+            project_id=PROJECT_ID,
+            dataset_id=DATASET_ID,
+            table_id=TABLE_ID,
+            scrape_date=scrape_date
+        )
+        appids = {row.app_id for row in client.query(query).result()}
+        logging.info(f"BigQueryに {scrape_date} 保存済みのAppIDが {len(appids)} 件あります")
+        return appids
+    except Exception as e:
+        logging.error(f"保存済みAppIDの取得中にエラー: {e}", exc_info=True)
+        return set()
+
+
+def get_recent_history(scrape_date):
+    """BigQueryから直近 REFRESH_HISTORY_DAYS 日分の指標を {app_id: [(scrape_date, ...), ...]} で取得"""
+    from google.cloud import bigquery
+
+    try:
+        client = bigquery.Client(project=PROJECT_ID)
+        sql_template = load_sql_file("select_recent_history.sql")
+        if not sql_template:
+            return {}
+        query = sql_template.format(
+            project_id=PROJECT_ID,
+            dataset_id=DATASET_ID,
+            table_id=TABLE_ID,
+            scrape_date=scrape_date,
+            history_days=REFRESH_HISTORY_DAYS
+        )
+        history = {}
+        for row in client.query(query).result():
+            history.setdefault(row.app_id, []).append((
+                row.scrape_date, row.current_followers, row.positive_reviews,
+                row.negative_reviews, row.owner_estimation))
+        logging.info(f"BigQueryから {len(history)} 件のAppIDの取得履歴を読み込みました")
+        return history
+    except Exception as e:
+        logging.error(f"取得履歴の読み込み中にエラー: {e}", exc_info=True)
+        return {}
+
+
 async def get_steam_appids(max_apps=None):
-    """Steam APIからAppIDのリストを取得する"""
-    api_url = "https://api.steampowered.com/ISteamApps/GetAppList/v2/"
-    appids = []
+    """Steam APIからAppIDのリストを取得する（ディスクキャッシュを再検証して使用）"""
+    appids = AppIdList()
     try:
+        cache = AppListCache(STATE_DIR / "applist", ttl_seconds=APPLIST_CACHE_TTL)
         async with aiohttp.ClientSession() as session:
-            async with session.get(api_url) as response:
-                response.raise_for_status()  # エラーがあれば例外を発生
-                data = await response.json()
-                if data and 'applist' in data and 'apps' in data['applist']:
-                    # appidが数値で、nameが空でないもののみを対象とする (より堅牢なフィルタリング)
-                    valid_apps = [
-                        app_info['appid'] 
-                        for app_info in data['applist']['apps'] 
-                        if isinstance(app_info.get('appid'), int) and app_info.get('name', '').strip()
-                    ]
-                    if max_apps:
-                        appids = valid_apps[:max_apps]
-                    else:
-                        appids = valid_apps
-                    logging.info(f"Steam APIから {len(appids)} 件の有効なAppIDを取得しました。")
-                else:
-                    logging.error("Steam APIからのレスポンス形式が不正か、appリストが空です。")
+            applist_path = await cache.refresh(session)
+        # appidが数値で、nameが空でないもののみを対象とする (より堅牢なフィルタリング)
+        appids = load_valid_appids(applist_path, max_apps=max_apps)
+        if appids:
+            logging.info(f"Steam APIから {len(appids)} 件の有効なAppIDを取得しました。")
+        else:
+            logging.error("Steam APIからのレスポンス形式が不正か、appリストが空です。")
     except aiohttp.ClientError as e:
         logging.error(f"Steam APIへの接続中にエラーが発生しました: {e}", exc_info=True)
     except json.JSONDecodeError as e:
@@ -219,7 +326,63 @@ async def get_steam_appids(max_apps=None):
     return appids
 
 
-async def main():
+def replay_pages(scrape_date=None):
+    """ページストアのHTMLをネットワークを使わずに再解析し、書き込み先へ保存する"""
+    start_time = time.perf_counter()
+    store = PageStore(PAGE_STORE_DIR)
+    local_store = (SQLiteMetricsStore(LOCAL_SINK_PATH, delta_lookback_days=DELTA_LOOKBACK_DAYS)
+                   if LOCAL_SINK_PATH else None)
+    write_batch = local_store.write_batch if local_store else save_to_bigquery
+    batch = RecordBatch()
+    written = failed = errors = 0
+
+    def write(records):
+        nonlocal written, failed
+        if write_batch(records):
+            written += len(records)
+        else:
+            failed += len(records)
+
+    for record in replay_records(store, scrape_date):
+        if not record.ok:
+            errors += 1
+            continue
+        batch.append(record)
+        if len(batch) >= REPLAY_BATCH_SIZE:
+            write(batch)
+            batch = RecordBatch()
+    if batch:
+        write(batch)
+    store.close()
+    if local_store:
+        local_store.close()
+    logging.info(f"再解析完了: 保存 {written}件, 保存失敗 {failed}件, 解析エラー {errors}件 ({time.perf_counter() - start_time:.2f}秒)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="SteamDB スクレイパー")
+    distribution = parser.add_mutually_exclusive_group()
+    distribution.add_argument("--shard", default=SCRAPER_SHARD,
+                              help="i/N 形式。AppIDのハッシュで N 分割したうち i 番目のみを処理する")
+    distribution.add_argument("--work-queue", nargs="?", const=str(STATE_DIR / "work_queue.sqlite3"),
+                              default=WORK_QUEUE_PATH,
+                              help="リース方式のワークキュー（SQLite）を使ってレプリカ間でAppIDを分担する")
+    parser.add_argument("--worker-id", help="ワークキューでのワーカー名（既定: ホスト名-PID）")
+    parser.add_argument("--replay", nargs="?", const="all", metavar="YYYY-MM-DD",
+                        help="スクレイピングせず、ページストアに保存済みのHTML（日付指定時はその日のみ）を再解析して保存する")
+    args = parser.parse_args(argv)
+    # 環境変数の既定値は排他グループの検査を通らないため、解決後の値で改めて確認する
+    if args.shard and args.work_queue:
+        parser.error("--shard (SCRAPER_SHARD) と --work-queue (WORK_QUEUE_PATH) は同時に指定できません")
+    if args.shard:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+
+async def scrape_and_store(args):
     main_processing_start_time = time.perf_counter()
 
     appids_to_scrape = await get_steam_appids(max_apps=1000)
@@ -236,29 +399,124 @@ async def main():
         logging.error("BrightData API tokenの取得に失敗しました。処理を中止します。")
         return
     
-    scraper = SteamDBScraper(brightdata_api_token=brightdata_token)
-    successful_extractions, collected_data = await scraper.scrape_multiple_apps(selected_appids)
-
-    if collected_data:
-        logging.info(f"BigQueryに {len(collected_data)} 件のデータを保存します...")
-        bigquery_success = save_to_bigquery(collected_data)
-        if bigquery_success:
-            logging.info("BigQueryへのデータ保存が正常に完了しました")
+    checkpoint = RunCheckpoint(STATE_DIR / "checkpoint.sqlite3")
+    checkpoint.prune()
+    if CHECKPOINT_BIGQUERY_LOOKUP:
+        checkpoint.mark_completed_externally(get_scraped_appids(checkpoint.scrape_date))
+    pending_appids = checkpoint.filter_pending(selected_appids)
+    skipped_count = len(selected_appids) - len(pending_appids)
+
+    # 直近の変動が小さいAppIDは再取得日が来るまでスキップする
+    history_store = None
+    if REFRESH_HISTORY_SOURCE != "off":
+        if REFRESH_HISTORY_SOURCE == "bigquery":
+            history = get_recent_history(checkpoint.scrape_date)
         else:
-            logging.error("BigQueryへのデータ保存に失敗しました")
+            history_store = SnapshotHistory(STATE_DIR / "snapshot_history.sqlite3")
+            history = history_store.load()
+        pending_appids = RefreshPlanner().plan(pending_appids, history, checkpoint.scrape_date)
+    if args.shard:
+        shard_index, shard_count = args.shard
+        pending_appids = shard_appids(pending_appids, shard_index, shard_count)
+        logging.info(f"シャード {shard_index}/{shard_count}: {len(pending_appids)} 件のAppIDを担当します")
+
+    local_store = None
+    if LOCAL_SINK_PATH:
+        local_store = SQLiteMetricsStore(LOCAL_SINK_PATH, delta_lookback_days=DELTA_LOOKBACK_DAYS)
+        write_batch = local_store.write_batch
+        logging.info(f"ローカルストアに書き込みます: {LOCAL_SINK_PATH}")
+    else:
+        write_batch = save_to_bigquery
+
+    page_store = None
+    if PAGE_STORE_DIR:
+        page_store = PageStore(PAGE_STORE_DIR)
+        page_store.evict(max_bytes=PAGE_STORE_MAX_BYTES, max_age_days=PAGE_STORE_MAX_AGE_DAYS)
+
+    session_store = None
+    if SESSION_STORE_PATH:
+        session_store = SessionStore(SESSION_STORE_PATH, max_age=SESSION_MAX_AGE)
+        session_store.purge_expired()
+
+    def on_flush(records):
+        checkpoint.mark_flushed(records)
+        if history_store:
+            history_store.add_records(records)
+
+    # スクレイピング中にマイクロバッチ単位でBigQueryへMERGEする
+    async with StreamingSink(write_batch, batch_size=SINK_BATCH_SIZE, flush_interval=SINK_FLUSH_INTERVAL,
+                             on_flush=on_flush) as sink:
+        # 前回の実行で取得済みだが保存前に停止したレコードを再投入する
+        for record in checkpoint.unflushed_records():
+            await sink.add(record)
+        async with SteamDBScraper(brightdata_api_token=brightdata_token, sink=sink, checkpoint=checkpoint,
+                                  page_store=page_store, archive_browser_pages=PAGE_STORE_BROWSER_HTML,
+                                  tier_stats_path=TIER_STATS_PATH or None,
+                                  memory_soft_limit_mb=MEMORY_SOFT_LIMIT_MB,
+                                  memory_hard_limit_mb=MEMORY_HARD_LIMIT_MB,
+                                  session_store=session_store,
+                                  challenge_wait_ms=CHALLENGE_WAIT_MS) as scraper:
+            if args.work_queue:
+                lease_store = SQLiteLeaseStore(args.work_queue)
+                work_queue = LeasedWorkQueue(lease_store, checkpoint.scrape_date, owner=args.worker_id)
+                work_queue.enqueue(pending_appids)
+                async with work_queue:
+                    successful_extractions = 0
+                    while batch := await work_queue.next_batch():
+                        successful_extractions, _ = await scraper.scrape_multiple_apps(batch)
+                        # 結果が得られたAppIDだけを完了にし、失敗分は他のワーカーや後の再試行に回す
+                        completed = checkpoint.completed_appids()
+                        work_queue.complete([appid for appid in batch if appid in completed],
+                                            failed=[appid for appid in batch if appid not in completed])
+                lease_store.close()
+                processed_count = work_queue.completed
+            else:
+                successful_extractions, _ = await scraper.scrape_multiple_apps(pending_appids)
+                processed_count = len(pending_appids)
+    if local_store:
+        local_store.close()
+    if history_store:
+        history_store.close()
+    if page_store:
+        page_store.close()
+    if session_store:
+        session_store.close()
+    checkpoint.close()
+
+    if sink.pending:
+        logging.error(f"BigQueryへのデータ保存に失敗しました (未保存 {sink.pending}件)")
+    elif sink.flushed_records:
+        logging.info(f"BigQueryへのデータ保存が正常に完了しました ({sink.flushed_records}件)")
     else:
         logging.warning("保存するデータがありません")
 
     main_processing_end_time = time.perf_counter()
     total_main_duration = main_processing_end_time - main_processing_start_time
-    logging.info(f"全AppIDの処理完了。成功件数: {successful_extractions}/{len(selected_appids)}")
+    logging.info(f"全AppIDの処理完了。成功件数: {successful_extractions}/{processed_count} (スキップ: {skipped_count}件)")
     logging.info(f"main関数全体の実行時間: {total_main_duration:.2f}秒")
 
 
+async def main(args):
+    if METRICS_PORT:
+        await METRICS.start_server(port=METRICS_PORT)
+    if METRICS_TRACE_PATH:
+        METRICS.open_trace(METRICS_TRACE_PATH)
+    try:
+        if args.replay:
+            if not PAGE_STORE_DIR:
+                logging.error("PAGE_STORE_DIR が無効なため再解析できません")
+            else:
+                await asyncio.to_thread(replay_pages, None if args.replay == "all" else args.replay)
+        else:
+            await scrape_and_store(args)
+    finally:
+        await METRICS.close()
+
+
 if __name__ == "__main__":
     program_start_time = time.perf_counter()
     logging.info("SteamDB Playwrightスクレイパーを開始します。")
     
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
     
     logging.info("SteamDB Playwrightスクレイパーを終了します。")
\ No newline at end of file
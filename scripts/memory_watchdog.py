@@ -0,0 +1,147 @@
+# scripts/memory_watchdog.py
+import asyncio
+import logging
+import os
+import time
+from metrics import METRICS
+
+BROWSER_PROCESS_NAMES = ("chrome", "chromium", "headless_shell")
+
+PRESSURE_NORMAL = 0
+PRESSURE_SOFT = 1
+PRESSURE_HARD = 2
+
+
+def _process_table():
+    """/proc から {pid: (ppid, name, rss_kb)} を読み込む"""
+    table = {}
+    page_kb = os.sysconf("SC_PAGE_SIZE") // 1024
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat", encoding="utf-8") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        name = stat[stat.index("(") + 1:stat.rindex(")")]
+        fields = stat[stat.rindex(")") + 2:].split()
+        table[int(entry.name)] = (int(fields[1]), name, int(fields[21]) * page_kb)
+    return table
+
+
+def sample_process_tree(root_pid=None):
+    """自プロセスと子孫プロセスの数・ブラウザプロセス数・RSS（KB）を返す"""
+    root_pid = root_pid or os.getpid()
+    table = _process_table()
+    children = {}
+    for pid, (ppid, _, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    stack, tree = [root_pid], []
+    while stack:
+        pid = stack.pop()
+        if pid in table:
+            tree.append(pid)
+        stack.extend(children.get(pid, ()))
+    browsers = [pid for pid in tree if any(name in table[pid][1].lower() for name in BROWSER_PROCESS_NAMES)]
+    return {
+        "processes": len(tree),
+        "browser_processes": len(browsers),
+        "rss_kb": sum(table[pid][2] for pid in tree),
+        "python_rss_kb": table[root_pid][2] if root_pid in table else 0,
+        "browser_rss_kb": sum(table[pid][2] for pid in browsers),
+    }
+
+
+class MemoryWatchdog:
+    """Pythonプロセスと子プロセス（Chromium等）のRSS合計を監視し、しきい値を超えたら回収する
+
+    soft_limit_mb を超えるとブラウザコンテキストを作り直させ、スケジューラの同時実行数を半分に抑える。
+    hard_limit_mb を超えるとブラウザ自体を再起動させ、同時実行数を1に絞る。
+    RSSが soft_limit_mb の recovery_ratio 倍を下回ったら制限を解除する。
+    同じ回収処理は recycle_cooldown 秒に1回まで。
+    """
+
+    def __init__(self, soft_limit_mb, hard_limit_mb, browser_pool=None, interval=5.0,
+                 recovery_ratio=0.9, recycle_cooldown=60.0):
+        self.soft_limit_kb = soft_limit_mb * 1024
+        self.hard_limit_kb = hard_limit_mb * 1024
+        self.browser_pool = browser_pool
+        self.interval = interval
+        self.recovery_ratio = recovery_ratio
+        self.recycle_cooldown = recycle_cooldown
+        self.pressure = PRESSURE_NORMAL
+        self.last_sample = None
+        self._scheduler = None
+        self._last_recycle = {}
+        self._task = None
+
+    def attach(self, scheduler):
+        self._scheduler = scheduler
+        self._apply_backpressure()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                self.check(await asyncio.to_thread(sample_process_tree))
+            except Exception as e:
+                logging.warning(f"メモリ監視中にエラー: {e}")
+            await asyncio.sleep(self.interval)
+
+    def check(self, sample):
+        self.last_sample = sample
+        METRICS.set_gauge("scraper_rss_bytes", sample["rss_kb"] * 1024, component="total")
+        METRICS.set_gauge("scraper_rss_bytes", sample["python_rss_kb"] * 1024, component="python")
+        METRICS.set_gauge("scraper_rss_bytes", sample["browser_rss_kb"] * 1024, component="browser")
+        METRICS.set_gauge("scraper_browser_processes", sample["browser_processes"])
+
+        rss_kb = sample["rss_kb"]
+        previous = self.pressure
+        if rss_kb >= self.hard_limit_kb:
+            self.pressure = PRESSURE_HARD
+            self._recycle("browsers", rss_kb)
+        elif rss_kb >= self.soft_limit_kb:
+            self.pressure = PRESSURE_SOFT
+            self._recycle("contexts", rss_kb)
+        elif rss_kb < self.soft_limit_kb * self.recovery_ratio:
+            self.pressure = PRESSURE_NORMAL
+        else:
+            self.pressure = min(self.pressure, PRESSURE_SOFT)
+        METRICS.set_gauge("scraper_memory_pressure", self.pressure)
+        if self.pressure != previous:
+            logging.warning(f"メモリ監視: 負荷レベルが {previous} から {self.pressure} に変化しました (RSS合計 {rss_kb / 1024:.0f}MB)")
+            self._apply_backpressure()
+
+    def _recycle(self, action, rss_kb):
+        if self.browser_pool is None or not self.browser_pool.started:
+            return
+        now = time.monotonic()
+        if now - self._last_recycle.get(action, float("-inf")) < self.recycle_cooldown:
+            return
+        self._last_recycle[action] = now
+        logging.warning(f"メモリ監視: RSS合計 {rss_kb / 1024:.0f}MB のため {action} を回収します")
+        if action == "browsers":
+            self.browser_pool.request_restart()
+        else:
+            self.browser_pool.retire_all_contexts()
+        METRICS.inc("scraper_memory_recycles_total", action=action)
+
+    def _apply_backpressure(self):
+        if self._scheduler is None:
+            return
+        if self.pressure == PRESSURE_HARD:
+            self._scheduler.set_pressure_limit(1)
+        elif self.pressure == PRESSURE_SOFT:
+            self._scheduler.set_pressure_limit(max(1, self._scheduler.max_concurrency // 2))
+        else:
+            self._scheduler.set_pressure_limit(None)
@@ -0,0 +1,183 @@
+# scripts/metrics.py
+import contextvars
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# ステージ所要時間のヒストグラムのバケット（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    "scraper_stage_duration_seconds": ("histogram", "処理ステージごとの所要時間"),
+    "scraper_successes_total": ("counter", "ティアごとの取得成功数"),
+    "scraper_challenges_total": ("counter", "ティアごとのチャレンジページ検出数"),
+    "scraper_fallbacks_total": ("counter", "次のティアへのエスカレーション数"),
+    "scraper_errors_total": ("counter", "ステージ・例外型ごとのエラー数"),
+    "scraper_egress_outcomes_total": ("counter", "直接アクセスしたティアの結果ごとの件数"),
+    "scraper_identity_quarantines_total": ("counter", "egress identity の隔離回数"),
+    "scraper_rate_limit_rps": ("gauge", "適応制御によるリクエストレートの上限"),
+    "scraper_concurrency_limit": ("gauge", "適応制御による同時実行数の上限"),
+    "scraper_quarantined_identities": ("gauge", "隔離中の egress identity 数"),
+    "scraper_rss_bytes": ("gauge", "プロセスツリーのRSS（total / python / browser）"),
+    "scraper_browser_processes": ("gauge", "Chromium関連のプロセス数"),
+    "scraper_memory_pressure": ("gauge", "メモリ負荷レベル（0: 通常, 1: soft超過, 2: hard超過）"),
+    "scraper_session_events_total": ("counter", "セッションストアの利用状況（hits / misses / saved / invalidated / solved）"),
+    "scraper_memory_recycles_total": ("counter", "メモリ監視によるコンテキスト・ブラウザの回収回数"),
+}
+
+# 現在処理中のAppID（スケジューラのワーカータスクごとに設定される）
+current_appid = contextvars.ContextVar("current_appid", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    __slots__ = ("bucket_counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.bucket_counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """ステージごとのスパン計測とカウンタを集計し、Prometheusのテキスト形式で公開する
+
+    ``with METRICS.span("navigation", tier="browser"):`` で囲んだ区間の所要時間を
+    ヒストグラムに記録し、例外が送出された場合はエラー数を例外型ごとに数える。
+    trace_path を指定すると、各スパンをJSON Lines形式で追記する。
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, trace_path=None):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._trace_file = None
+        self._runner = None
+        if trace_path:
+            self.open_trace(trace_path)
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name, seconds, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            histogram = self._histograms.setdefault(name, {}).get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = _Histogram(self.buckets)
+            histogram.sum += seconds
+            histogram.count += 1
+            for i, upper in enumerate(self.buckets):
+                if seconds <= upper:
+                    histogram.bucket_counts[i] += 1
+
+    @contextmanager
+    def span(self, stage, appid=None, **labels):
+        appid = current_appid.get() if appid is None else appid
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            self.inc("scraper_errors_total", stage=stage, type=error)
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            self.observe("scraper_stage_duration_seconds", duration, stage=stage, **labels)
+            if self._trace_file is not None:
+                self._write_trace({
+                    "ts": time.time(), "stage": stage, "appid": appid,
+                    "duration_ms": round(duration * 1000, 3), "error": error, **labels,
+                })
+
+    def open_trace(self, trace_path):
+        self._trace_file = open(trace_path, "a", encoding="utf-8", buffering=1)
+        logging.info(f"スパンのトレースを出力します: {trace_path}")
+
+    def _write_trace(self, event):
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.write(line + "\n")
+
+    def render(self):
+        """Prometheus テキスト形式 (version 0.0.4) で全メトリクスを出力"""
+        lines = []
+        with self._lock:
+            for name in sorted(set(self._counters) | set(self._gauges) | set(self._histograms)):
+                metric_type, help_text = METRIC_HELP.get(
+                    name, ("histogram" if name in self._histograms else "counter", name))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                series = {**self._counters.get(name, {}), **self._gauges.get(name, {})}
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+                for key, histogram in sorted(self._histograms.get(name, {}).items()):
+                    for upper, count in zip(self.buckets, histogram.bucket_counts):
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', _format_value(upper))])} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    async def start_server(self, host="0.0.0.0", port=8000):
+        """/metrics エンドポイントを起動する"""
+        from aiohttp import web
+
+        async def handle_metrics(_request):
+            return web.Response(text=self.render(), content_type="text/plain", charset="utf-8",
+                                headers={"X-Content-Type-Options": "nosniff"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logging.info(f"メトリクスエンドポイントを起動しました: http://{host}:{port}/metrics")
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
+
+
+# プロセス全体で共有するレジストリ
+METRICS = MetricsRegistry()
@@ -0,0 +1,178 @@
+# scripts/page_store.py
+import hashlib
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from html_parsers import extract_data_from_brightdata_html
+from records import iso_to_us
+
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+DEFAULT_MAX_AGE_DAYS = 90
+COMPRESSION_LEVEL = 9
+
+
+class PageStore:
+    """取得したHTMLをzstdで圧縮して保存する、内容ハッシュ（SHA-256）をキーにしたページストア
+
+    本文は objects/<先頭2文字>/<digest>.html.zst に1回だけ保存し、どのAppID・日付の
+    ページがどの本文かを index.sqlite3 で管理する。内容が変わっていないページは
+    本文を書き込まずに参照だけを追加する。複数のレプリカから同じディレクトリを使う場合も、
+    put の参照の追加と evict の本文の削除は同じDBのロックで直列化される。
+    """
+
+    def __init__(self, root, compression_level=COMPRESSION_LEVEL):
+        import zstandard
+
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        # ZstdCompressor はスレッドセーフではないため、呼び出しごとに作る
+        self._zstd = zstandard
+        self.compression_level = compression_level
+        # トランザクションは BEGIN IMMEDIATE で明示的に制御する
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                app_id INTEGER NOT NULL,
+                scrape_date TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                tier TEXT,
+                fetched_at TEXT NOT NULL,
+                PRIMARY KEY (app_id, scrape_date)
+            );
+            CREATE INDEX IF NOT EXISTS pages_digest ON pages (digest);
+            CREATE TABLE IF NOT EXISTS objects (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+        """)
+        # put はスクレイパーから複数スレッドで呼ばれる
+        self._lock = threading.Lock()
+        self.deduplicated = 0
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def object_path(self, digest):
+        return self.objects_dir / digest[:2] / f"{digest}.html.zst"
+
+    def put(self, appid, html_content, tier=None, fetched_at=None):
+        """ページを保存して digest を返す（同じ内容の本文が既にあれば書き込まない）"""
+        fetched_at = fetched_at or datetime.now(timezone.utc).isoformat()
+        data = html_content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        # 先に参照を追加してから本文の有無を確認する。参照されている本文は evict で削除されないため、
+        # 確認後に他のレプリカが本文を消してしまうことはない
+        with self._transaction() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO pages (app_id, scrape_date, digest, tier, fetched_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (appid, fetched_at[:10], digest, tier, fetched_at))
+            exists = conn.execute("SELECT 1 FROM objects WHERE digest = ?", (digest,)).fetchone()
+        if exists:
+            self.deduplicated += 1
+            return digest
+        path = self.object_path(digest)
+        path.parent.mkdir(exist_ok=True)
+        compressed = self._zstd.ZstdCompressor(level=self.compression_level).compress(data)
+        # 同じ内容を並行して書き込んでも壊れないよう、一時ファイル名は呼び出しごとに分ける
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(compressed)
+        os.replace(tmp_path, path)
+        with self._transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO objects (digest, size, created_at) VALUES (?, ?, ?)",
+                         (digest, len(compressed), time.time()))
+        return digest
+
+    def read(self, digest):
+        compressed = self.object_path(digest).read_bytes()
+        return self._zstd.ZstdDecompressor().decompress(compressed).decode("utf-8")
+
+    def get(self, appid, scrape_date):
+        row = self._conn.execute(
+            "SELECT digest FROM pages WHERE app_id = ? AND scrape_date = ?", (appid, scrape_date)).fetchone()
+        return self.read(row[0]) if row else None
+
+    def pages(self, scrape_date=None):
+        """(app_id, scrape_date, digest, fetched_at) の一覧を返す（本文の書き込みが完了したページのみ）"""
+        query = "SELECT app_id, scrape_date, digest, fetched_at FROM pages JOIN objects USING (digest)"
+        params = ()
+        if scrape_date:
+            query += " WHERE scrape_date = ?"
+            params = (scrape_date,)
+        return self._conn.execute(query + " ORDER BY scrape_date, app_id", params).fetchall()
+
+    def total_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _delete_orphans(self):
+        # 参照の確認から本文の削除までを1つのトランザクションで行い、その間の put による参照の追加を待たせる
+        with self._transaction() as conn:
+            orphans = conn.execute(
+                "SELECT digest FROM objects WHERE digest NOT IN (SELECT digest FROM pages)").fetchall()
+            for (digest,) in orphans:
+                self.object_path(digest).unlink(missing_ok=True)
+            conn.executemany("DELETE FROM objects WHERE digest = ?", orphans)
+        return len(orphans)
+
+    def evict(self, max_bytes=DEFAULT_MAX_BYTES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        """max_age_days より古いページを削除し、さらに合計サイズが max_bytes 以下になるまで古い日付から削除する"""
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).date().isoformat()
+        with self._transaction() as conn:
+            expired = conn.execute("DELETE FROM pages WHERE scrape_date < ?", (cutoff,)).rowcount
+        removed = self._delete_orphans()
+        while self.total_bytes() > max_bytes:
+            oldest = self._conn.execute("SELECT MIN(scrape_date) FROM pages").fetchone()[0]
+            if oldest is None:
+                break
+            with self._transaction() as conn:
+                expired += conn.execute("DELETE FROM pages WHERE scrape_date = ?", (oldest,)).rowcount
+            removed += self._delete_orphans()
+        if expired or removed:
+            logging.info(f"ページストア: {expired} 件のページと {removed} 件の本文を削除しました (合計 {self.total_bytes() / 1024 ** 2:.1f}MB)")
+
+    def close(self):
+        self._conn.close()
+
+
+def _replay_page(args):
+    """ワーカープロセスで本文を読み込み・展開して解析する"""
+    import zstandard
+
+    path, appid, fetched_at, backend = args
+    html_content = zstandard.ZstdDecompressor().decompress(Path(path).read_bytes()).decode("utf-8")
+    record = extract_data_from_brightdata_html(html_content, appid, backend)
+    # 取得日時は再解析した時刻ではなく、ページを取得した時刻にする
+    if record.error is None:
+        record.scraped_at = iso_to_us(fetched_at)
+    return record
+
+
+def replay_records(store, scrape_date=None, workers=None, backend=None, chunksize=16):
+    """保存済みのページをネットワークを使わずに全コアで再解析し、レコードを順に返す"""
+    tasks = [(str(store.object_path(digest)), appid, fetched_at, backend)
+             for appid, _, digest, fetched_at in store.pages(scrape_date)]
+    logging.info(f"ページストアの {len(tasks)} 件を再解析します")
+    if not tasks:
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        yield from executor.map(_replay_page, tasks, chunksize=chunksize)
@@ -0,0 +1,81 @@
+# scripts/parse_stage.py
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from html_parsers import extract_data_from_brightdata_html
+from metrics import METRICS
+from records import AppRecord
+
+
+class ParseStage:
+    """取得済みHTMLをプロセスプールで解析するパイプラインステージ
+
+    フェッチャーは ``await submit(...)`` でHTMLを上限付きキューに積んで次のAppIDへ進む。
+    キューが満杯の間は submit が待機するため、解析が追いつかない場合はフェッチ側が自然に減速する。
+    解析結果は ``await on_record(record, context)`` でイベントループ上に返される。
+    workers=0 の場合はプロセスプールを使わずイベントループ上で解析する（デバッグ用）。
+    """
+
+    def __init__(self, on_record, workers=None, queue_size=None, backend=None):
+        self.on_record = on_record
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.queue_size = queue_size or max(1, self.workers) * 2
+        self.backend = backend
+        self._queue = None
+        self._executor = None
+        self._consumers = []
+
+    def _start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.workers > 0:
+            # Playwrightのスレッドを抱えたプロセスをforkしないよう spawn で起動する
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(max(1, self.workers))]
+        logging.info(f"解析ステージを起動しました (ワーカー数: {self.workers}, キュー上限: {self.queue_size})")
+
+    async def submit(self, appid, html_content, context=None):
+        if self._queue is None:
+            self._start()
+        await self._queue.put((appid, html_content, context))
+
+    async def _parse(self, appid, html_content):
+        with METRICS.span("parse", appid=appid):
+            if self._executor is None:
+                return extract_data_from_brightdata_html(html_content, appid, self.backend)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, extract_data_from_brightdata_html, html_content, appid, self.backend)
+
+    async def _consume(self):
+        while True:
+            appid, html_content, context = await self._queue.get()
+            try:
+                record = await self._parse(appid, html_content)
+            except Exception as e:
+                logging.error(f"解析ワーカーでエラー (AppID: {appid}): {e}", exc_info=True)
+                record = AppRecord.failed(appid, str(e))
+            try:
+                await self.on_record(record, context)
+            except Exception as e:
+                logging.error(f"解析結果の処理中にエラー (AppID: {appid}): {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def join(self):
+        """投入済みのHTMLが全て解析・処理されるまで待つ"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        await self.join()
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        self._queue = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,183 @@
+# scripts/records.py
+import time
+from array import array
+from datetime import date, datetime, timedelta, timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+US_PER_DAY = 86_400 * 1_000_000
+
+# 旧形式（日本語キーの dict）のキーと AppRecord の属性の対応
+LEGACY_KEYS = {
+    "AppID": "app_id",
+    "取得日時": "scraped_at",
+    "タイトル名": "title_name",
+    "現在のfollower数": "current_followers",
+    "ポジティブレビュー数": "positive_reviews",
+    "ネガティブレビュー数": "negative_reviews",
+    "オーナー推定数": "owner_estimation",
+    "エラー": "error",
+}
+# steam_app_metrics の列順
+ROW_COLUMNS = ("app_id", "title_name", "current_followers", "positive_reviews", "negative_reviews",
+               "owner_estimation", "scraped_at", "scrape_date")
+
+
+def now_us():
+    """現在時刻（UTC、UNIXエポックからのマイクロ秒）"""
+    return time.time_ns() // 1000
+
+
+def us_to_iso(us):
+    return (EPOCH + timedelta(microseconds=us)).isoformat()
+
+
+def us_to_date(us):
+    return date.fromordinal(EPOCH_ORDINAL + us // US_PER_DAY).isoformat()
+
+
+def iso_to_us(text):
+    """ISO形式の日時をマイクロ秒に変換する（タイムゾーンなしはUTCとみなす）"""
+    parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return (parsed - EPOCH) // timedelta(microseconds=1)
+
+
+class AppRecord:
+    """1つのAppIDの取得結果
+
+    取得日時 scraped_at はUTCのエポックマイクロ秒（整数）。解析に失敗した場合は error にメッセージが入る。
+    既存の呼び出し元向けに ``record["AppID"]`` / ``record.get("エラー")`` の形でも参照できる
+    （"取得日時" はISO形式の文字列を返す）。
+    """
+
+    __slots__ = ("app_id", "scraped_at", "title_name", "current_followers", "positive_reviews",
+                 "negative_reviews", "owner_estimation", "error")
+
+    def __init__(self, app_id, scraped_at=None, title_name="N/A", current_followers=None, positive_reviews=None,
+                 negative_reviews=None, owner_estimation=None, error=None):
+        self.app_id = app_id
+        self.scraped_at = now_us() if scraped_at is None else scraped_at
+        self.title_name = title_name
+        self.current_followers = current_followers
+        self.positive_reviews = positive_reviews
+        self.negative_reviews = negative_reviews
+        self.owner_estimation = owner_estimation
+        self.error = error
+
+    @classmethod
+    def failed(cls, app_id, error):
+        return cls(app_id, title_name=None, error=error)
+
+    @property
+    def ok(self):
+        return self.error is None and self.app_id is not None
+
+    def as_tuple(self):
+        return (self.app_id, self.scraped_at, self.title_name, self.current_followers, self.positive_reviews,
+                self.negative_reviews, self.owner_estimation, self.error)
+
+    def __reduce__(self):
+        # 解析ワーカーから返すときに属性名を送らずに済むよう、タプルで pickle する
+        return (AppRecord, self.as_tuple())
+
+    def __eq__(self, other):
+        return isinstance(other, AppRecord) and self.as_tuple() == other.as_tuple()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__
+                           if name != "error" or self.error is not None)
+        return f"AppRecord({fields})"
+
+    def get(self, key, default=None):
+        attribute = LEGACY_KEYS.get(key)
+        if attribute is None:
+            return default
+        if attribute == "scraped_at":
+            return us_to_iso(self.scraped_at)
+        return getattr(self, attribute)
+
+    def __getitem__(self, key):
+        if key not in LEGACY_KEYS:
+            raise KeyError(key)
+        return self.get(key)
+
+    def to_dict(self):
+        """旧形式の日本語キーの dict に変換する（ログ出力・互換用）"""
+        if self.error is not None:
+            return {"AppID": self.app_id, "エラー": self.error}
+        return {key: self.get(key) for key in LEGACY_KEYS if key != "エラー"}
+
+    @classmethod
+    def from_dict(cls, data):
+        scraped_at = data.get("取得日時")
+        return cls(
+            data.get("AppID"),
+            scraped_at=iso_to_us(scraped_at) if scraped_at else None,
+            title_name=data.get("タイトル名"),
+            current_followers=data.get("現在のfollower数"),
+            positive_reviews=data.get("ポジティブレビュー数"),
+            negative_reviews=data.get("ネガティブレビュー数"),
+            owner_estimation=data.get("オーナー推定数"),
+            error=data.get("エラー"),
+        )
+
+
+class RecordBatch:
+    """成功したレコードを列ごとに保持するバッチ（struct-of-arrays）
+
+    app_id と scraped_at は array('q')、それ以外は NULL を含みうるため list で持つ。
+    シンクは rows() で steam_app_metrics の列順のタプルを受け取り、そのまま書き込める。
+    """
+
+    __slots__ = ("app_id", "scraped_at", "title_name", "current_followers", "positive_reviews",
+                 "negative_reviews", "owner_estimation")
+
+    def __init__(self, records=()):
+        self.app_id = array('q')
+        self.scraped_at = array('q')
+        self.title_name = []
+        self.current_followers = []
+        self.positive_reviews = []
+        self.negative_reviews = []
+        self.owner_estimation = []
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return len(self.app_id)
+
+    def __bool__(self):
+        return len(self.app_id) > 0
+
+    def append(self, record):
+        self.app_id.append(record.app_id)
+        self.scraped_at.append(record.scraped_at)
+        self.title_name.append(record.title_name)
+        self.current_followers.append(record.current_followers)
+        self.positive_reviews.append(record.positive_reviews)
+        self.negative_reviews.append(record.negative_reviews)
+        self.owner_estimation.append(record.owner_estimation)
+
+    def extend(self, other):
+        for name in self.__slots__:
+            getattr(self, name).extend(getattr(other, name))
+
+    def __iter__(self):
+        for values in zip(*(getattr(self, name) for name in self.__slots__)):
+            yield AppRecord(*values)
+
+    def scraped_at_iso(self):
+        return [us_to_iso(us) for us in self.scraped_at]
+
+    def scrape_dates(self):
+        # 同じ日のレコードが大半なので、日付ごとに1回だけ変換する
+        dates = {}
+        return [dates.get(day) or dates.setdefault(day, us_to_date(day * US_PER_DAY))
+                for day in (us // US_PER_DAY for us in self.scraped_at)]
+
+    def rows(self):
+        """(app_id, title_name, followers, positive, negative, owners, scraped_at(ISO), scrape_date) を返す"""
+        return zip(self.app_id, self.title_name, self.current_followers, self.positive_reviews,
+                   self.negative_reviews, self.owner_estimation, self.scraped_at_iso(), self.scrape_dates())
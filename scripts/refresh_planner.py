@@ -0,0 +1,124 @@
+# scripts/refresh_planner.py
+import logging
+import sqlite3
+from collections import Counter
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+# 選択できる再取得間隔（日）。変動の大きいタイトルは毎日、動かないタイトルは週次〜月次
+REFRESH_INTERVALS = (1, 3, 7, 14, 30)
+METRIC_COLUMNS = ("current_followers", "positive_reviews", "negative_reviews", "owner_estimation")
+
+
+class SnapshotHistory:
+    """AppIDごとに直近 keep_snapshots 回分の指標を保持するローカルの履歴キャッシュ"""
+
+    def __init__(self, db_path, keep_snapshots=10):
+        self.db_path = str(db_path)
+        self.keep_snapshots = keep_snapshots
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS app_snapshots (
+                app_id INTEGER NOT NULL,
+                scrape_date TEXT NOT NULL,
+                current_followers INTEGER,
+                positive_reviews INTEGER,
+                negative_reviews INTEGER,
+                owner_estimation INTEGER,
+                PRIMARY KEY (app_id, scrape_date)
+            )
+        """)
+        self._conn.commit()
+
+    def add_records(self, batch):
+        """RecordBatch の指標を追加し、AppIDごとに古いスナップショットを削除する"""
+        with self._conn:
+            self._conn.executemany("""
+                INSERT OR REPLACE INTO app_snapshots (app_id, scrape_date, current_followers, positive_reviews,
+                                                      negative_reviews, owner_estimation)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, zip(batch.app_id, batch.scrape_dates(), batch.current_followers, batch.positive_reviews,
+                     batch.negative_reviews, batch.owner_estimation))
+            self._conn.executemany("""
+                DELETE FROM app_snapshots WHERE app_id = ? AND scrape_date NOT IN (
+                    SELECT scrape_date FROM app_snapshots WHERE app_id = ? ORDER BY scrape_date DESC LIMIT ?
+                )
+            """, [(appid, appid, self.keep_snapshots) for appid in batch.app_id])
+
+    def load(self):
+        """{app_id: [(scrape_date, followers, positive, negative, owners), ...]}（日付昇順）を返す"""
+        history = {}
+        rows = self._conn.execute(f"""
+            SELECT app_id, scrape_date, {', '.join(METRIC_COLUMNS)}
+            FROM app_snapshots ORDER BY app_id, scrape_date
+        """)
+        for app_id, *snapshot in rows:
+            history.setdefault(app_id, []).append(tuple(snapshot))
+        return history
+
+    def close(self):
+        self._conn.close()
+
+
+def daily_volatility(snapshots):
+    """連続するスナップショット間の指標の相対変化率（1日あたり）の最大値"""
+    volatility = 0.0
+    for previous, current in zip(snapshots, snapshots[1:]):
+        days = (date.fromisoformat(str(current[0])) - date.fromisoformat(str(previous[0]))).days
+        if days <= 0:
+            continue
+        for before, after in zip(previous[1:], current[1:]):
+            if before is None or after is None:
+                continue
+            volatility = max(volatility, abs(after - before) / max(abs(before), 1) / days)
+    return volatility
+
+
+class RefreshPlanner:
+    """直近の変動率からAppIDごとの再取得間隔を決め、本日取得すべきAppIDを選ぶ
+
+    間隔は「指標が target_change（相対値）変化するまでの推定日数」以下で最大の REFRESH_INTERVALS。
+    スナップショットが min_snapshots 未満のAppIDは毎日取得する。同じ日に取得したAppIDが
+    次回も同じ日に集中しないよう、AppIDに応じて間隔を最大2割短くする。
+    """
+
+    def __init__(self, target_change=0.01, intervals=REFRESH_INTERVALS, min_snapshots=2):
+        self.target_change = target_change
+        self.intervals = tuple(sorted(intervals))
+        self.min_snapshots = min_snapshots
+
+    def interval_for(self, snapshots):
+        if len(snapshots) < self.min_snapshots:
+            return self.intervals[0]
+        volatility = daily_volatility(snapshots)
+        if volatility == 0:
+            return self.intervals[-1]
+        expected_days = self.target_change / volatility
+        return max((interval for interval in self.intervals if interval <= expected_days), default=self.intervals[0])
+
+    def is_due(self, appid, snapshots, today, interval=None):
+        if not snapshots:
+            return True
+        interval = interval or self.interval_for(snapshots)
+        interval -= appid % (interval // 5 + 1)
+        last_scraped = date.fromisoformat(str(snapshots[-1][0]))
+        return (today - last_scraped).days >= interval
+
+    def plan(self, appid_list, history, today=None):
+        """appid_list のうち本日が再取得日にあたるものを、入力順を保って返す"""
+        today = date.fromisoformat(today) if isinstance(today, str) else (today or datetime.now(timezone.utc).date())
+        due = []
+        intervals = Counter()
+        for appid in appid_list:
+            snapshots = history.get(appid, ())
+            interval = self.interval_for(snapshots) if snapshots else 0
+            intervals[interval] += 1
+            if self.is_due(appid, snapshots, today, interval):
+                due.append(appid)
+        summary = ", ".join(f"{interval}日: {count}件" if interval else f"履歴なし: {count}件"
+                            for interval, count in sorted(intervals.items()))
+        logging.info(f"再取得計画: {len(appid_list)} 件中 {len(due)} 件が本日の取得対象です ({summary})")
+        return due
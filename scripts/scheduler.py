@@ -0,0 +1,172 @@
+# scripts/scheduler.py
+import asyncio
+import itertools
+import logging
+import random
+import time
+
+DEFAULT_DOMAIN = "steamdb.info"
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_SECOND = 0.5
+DEFAULT_BURST = 2
+DEFAULT_JITTER = (0.0, 1.0)
+
+
+class TokenBucket:
+    """トークンバケット方式のレートリミッタ（rate: 毎秒補充されるトークン数）"""
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def set_rate(self, rate):
+        self._refill()
+        self.rate = max(rate, 1e-6)
+
+    async def acquire(self, tokens=1):
+        # ロックを保持したまま待つことで、待機中のタスクが到着順にトークンを得る
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class ScrapeScheduler:
+    """優先度付きキューから同時実行数とレートの上限内でジョブを処理するスケジューラ
+
+    worker は ``await worker(appid, progress_text)`` の形で呼び出される。
+    priorities は AppID -> 優先度（大きいほど先に処理）の dict または関数。
+    """
+
+    def __init__(self, worker, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 requests_per_second=DEFAULT_REQUESTS_PER_SECOND, burst=DEFAULT_BURST,
+                 domain_concurrency=None, domain_rates=None, jitter=DEFAULT_JITTER, domain_of=None):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+        self.worker = worker
+        self.max_concurrency = max_concurrency
+        self.concurrency_limit = max_concurrency
+        self.pressure_limit = None
+        self.burst = burst
+        self.global_bucket = TokenBucket(requests_per_second, burst) if requests_per_second else None
+        self.domain_of = domain_of or (lambda appid: DEFAULT_DOMAIN)
+        self.jitter = jitter
+        self._domain_concurrency = domain_concurrency or {}
+        self._domain_rates = domain_rates or {}
+        self._domain_semaphores = {}
+        self._domain_buckets = {}
+        self._active = 0
+        self._capacity_changed = asyncio.Condition()
+
+    def set_rate(self, requests_per_second):
+        """全体のリクエストレートを実行中に変更する"""
+        if self.global_bucket is None:
+            self.global_bucket = TokenBucket(requests_per_second, self.burst)
+        else:
+            self.global_bucket.set_rate(requests_per_second)
+
+    def set_concurrency(self, limit):
+        """同時実行数を 1〜max_concurrency の範囲で実行中に変更する"""
+        # 上限を上げた場合も、実行中のジョブが終わるたびに待機中のワーカーが再評価する
+        self.concurrency_limit = max(1, min(self.max_concurrency, limit))
+
+    def set_pressure_limit(self, limit):
+        """メモリ逼迫時などに concurrency_limit とは別に同時実行数を抑える（None で解除）"""
+        self.pressure_limit = None if limit is None else max(1, limit)
+
+    def effective_concurrency(self):
+        if self.pressure_limit is None:
+            return self.concurrency_limit
+        return min(self.concurrency_limit, self.pressure_limit)
+
+    async def _enter_active(self):
+        async with self._capacity_changed:
+            await self._capacity_changed.wait_for(lambda: self._active < self.effective_concurrency())
+            self._active += 1
+
+    async def _leave_active(self):
+        async with self._capacity_changed:
+            self._active -= 1
+            self._capacity_changed.notify_all()
+
+    def _semaphore_for(self, domain):
+        if domain not in self._domain_semaphores:
+            limit = self._domain_concurrency.get(domain, self.max_concurrency)
+            self._domain_semaphores[domain] = asyncio.Semaphore(limit)
+        return self._domain_semaphores[domain]
+
+    def _bucket_for(self, domain):
+        if domain not in self._domain_rates:
+            return None
+        if domain not in self._domain_buckets:
+            rate, burst = self._domain_rates[domain]
+            self._domain_buckets[domain] = TokenBucket(rate, burst)
+        return self._domain_buckets[domain]
+
+    async def _sleep_jitter(self):
+        if self.jitter and self.jitter[1] > 0:
+            await asyncio.sleep(random.uniform(*self.jitter))
+
+    async def _wait_for_tokens(self, domain):
+        domain_bucket = self._bucket_for(domain)
+        if domain_bucket:
+            await domain_bucket.acquire()
+        if self.global_bucket:
+            await self.global_bucket.acquire()
+
+    async def run(self, appid_list, priorities=None):
+        if callable(priorities):
+            priority_of = priorities
+        else:
+            priority_map = priorities or {}
+            priority_of = lambda appid: priority_map.get(appid, 0)
+
+        queue = asyncio.PriorityQueue()
+        # 同一優先度では入力順を保つ
+        for seq, appid in enumerate(appid_list):
+            queue.put_nowait((-priority_of(appid), seq, appid))
+        total = queue.qsize()
+        started = itertools.count(1)
+
+        async def run_worker():
+            while True:
+                # 同時実行数の上限内に入ってから取り出し、優先度順を保つ
+                await self._enter_active()
+                try:
+                    try:
+                        _, _, appid = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    domain = self.domain_of(appid)
+                    # ジッターはドメインの枠を確保する前に待ち、待機中に他のジョブの枠を塞がない
+                    await self._sleep_jitter()
+                    async with self._semaphore_for(domain):
+                        await self._wait_for_tokens(domain)
+                        progress_text = f"[{next(started)}/{total}]"
+                        try:
+                            await self.worker(appid, progress_text)
+                        except Exception as e:
+                            logging.error(f"AppID {appid} のジョブ実行中にエラー: {e}", exc_info=True)
+                finally:
+                    await self._leave_active()
+
+        logging.info(f"{total} 件のAppIDを同時実行数 {self.max_concurrency} で処理します")
+        workers = [asyncio.create_task(run_worker()) for _ in range(min(self.max_concurrency, total))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
@@ -1,14 +1,24 @@
 # scripts/scraper_core.py
+import aiohttp
 import asyncio
-import json
 import logging
 import random
-import re
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timezone
-from playwright.async_api import async_playwright
-from playwright_stealth import stealth_async
+import time
+import weakref
+from collections import deque
+from adaptive_control import OUTCOME_CHALLENGE, OUTCOME_ERROR, OUTCOME_OK, OUTCOME_THROTTLED, AdaptiveRateController
+from brightdata_client import BRIGHTDATA_API_URL, BrightDataClient
+from browser_pool import BrowserPool
+from dom_extraction import extract_fields_in_page
+from fetch_pipeline import TIER_BROWSER, TIER_HTTP, TIER_UNLOCKER, ExtractedPage, TierStats, TieredFetcher, is_challenge_page
+from memory_watchdog import MemoryWatchdog
+from metrics import METRICS, current_appid
+from html_parsers import build_record, extract_data_from_brightdata_html, parse_html_content, parse_number_with_suffix  # 既存の呼び出し元向けに再公開
+from parse_stage import ParseStage
+from render_policy import RenderPolicy
+from scheduler import DEFAULT_BURST, DEFAULT_JITTER, DEFAULT_MAX_CONCURRENCY, DEFAULT_REQUESTS_PER_SECOND, ScrapeScheduler
+
+STEAMDB_BASE_URL = "https://steamdb.info"
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
@@ -22,118 +32,129 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/18.1.1 Safari/605.1.15",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36 Edg/131.0.0.0"
 ]
-
-def parse_number_with_suffix(text):
-    if not text:
-        return None
-    match = re.search(r'~?([\d.,]+)\s*([MKBmkb]?)', text.strip())
-    if not match:
-        return None
-    number_str = match.group(1).replace(',', '')
-    suffix = match.group(2).lower()
-    try:
-        number = float(number_str)
-    except ValueError:
-        return None
-    if suffix == 'k':
-        number *= 1_000
-    elif suffix == 'm':
-        number *= 1_000_000
-    elif suffix == 'b':
-        number *= 1_000_000_000
-    return int(number)
-
-def parse_html_content(html_content, appid):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    data = {"AppID": appid, "取得日時": datetime.now(timezone.utc).isoformat()}
-    
-    title_tag = soup.find('h1', itemprop='name')
-    data["タイトル名"] = title_tag.get_text(strip=True) if title_tag else "N/A"
-
-    followers_text = "N/A"
-    try:
-        store_data_header = soup.find('h3', string=lambda t: t and 'store data' in t.lower())
-        if store_data_header:
-            ul_tag = store_data_header.find_next_sibling('ul')
-            if ul_tag:
-                followers_li = ul_tag.find('li')
-                if followers_li:
-                    followers_text = followers_li.get_text(strip=True)
-        else:
-            store_sections = soup.find_all('h3')
-            for h3_tag in store_sections:
-                if 'store data' in h3_tag.get_text().lower():
-                    next_ul = h3_tag.find_next_sibling('ul')
-                    if next_ul:
-                        first_li = next_ul.find('li')
-                        if first_li:
-                            followers_text = first_li.get_text(strip=True)
-                            break
-    except Exception as e:
-        logging.warning(f"フォロワー数抽出エラー (AppID: {appid}): {e}")
-    data["現在のfollower数"] = parse_number_with_suffix(followers_text)
-
-    positive_reviews_text = "N/A"
-    negative_reviews_text = "N/A"
-    try:
-        review_summary_strong = soup.find('strong', string=lambda t: t and "user reviews" in t.lower())
-        if review_summary_strong:
-            parent_div = review_summary_strong.parent
-            if parent_div:
-                tooltip_span = parent_div.find('span', class_='tooltip')
-                if tooltip_span:
-                    tooltip_text = tooltip_span.get_text(separator='|', strip=True)
-                    parts = tooltip_text.split('|')
-                    if len(parts) >= 2:
-                        positive_reviews_text = parts[0]
-                        negative_reviews_text = parts[1]
-    except Exception as e:
-        logging.warning(f"レビュー数抽出エラー (AppID: {appid}): {e}")
-    data["ポジティブレビュー数"] = parse_number_with_suffix(positive_reviews_text)
-    data["ネガティブレビュー数"] = parse_number_with_suffix(negative_reviews_text)
-    
-    owner_estimation_text = "N/A"
-    try:
-        owner_row = soup.find('td', string='Owners')
-        if owner_row:
-            owner_value_td = owner_row.find_next_sibling('td')
-            if owner_value_td:
-                owner_estimation_text = owner_value_td.get_text(strip=True).split(' ± ')[0]
-    except Exception as e:
-        logging.warning(f"オーナー推定数抽出エラー (AppID: {appid}): {e}")
-    data["オーナー推定数"] = parse_number_with_suffix(owner_estimation_text)
-    return data
-
-def extract_data_from_brightdata_html(html_content, appid):
-    if not html_content:
-        logging.warning(f"BrightDataからHTMLコンテンツがありません (AppID: {appid})。")
-        return {"AppID": appid, "エラー": "HTMLコンテンツなし"}
-    try:
-        return parse_html_content(html_content, appid)
-    except Exception as e:
-        logging.error(f"BrightData HTMLの解析中にエラー (AppID: {appid}): {e}", exc_info=True)
-        return {"AppID": appid, "エラー": str(e)}
+ACCEPT_LANGUAGES = {
+    "ja-JP": ["ja-JP,ja;q=0.9,en-US;q=0.8,en;q=0.7", "ja,en-US;q=0.9,en;q=0.8"],
+    "en-US": ["en-US,en;q=0.9,ja;q=0.8"],
+}
+# レート制限とみなすHTTPステータス（403はCloudFlareのチャレンジ応答として扱う）
+THROTTLE_STATUSES = {429, 503}
 
 class SteamDBScraper:
-    def __init__(self, brightdata_api_token=None):
+    def __init__(self, brightdata_api_token=None, browser_pool_size=2, contexts_per_browser=2,
+                 max_pages_per_browser=200, max_pages_per_context=25, http_pool_size=20, tier_stats_path=None,
+                 brightdata_concurrency=4, brightdata_cost_per_request=0.0, parser_backend=None,
+                 parse_workers=None, parse_queue_size=None, sink=None, checkpoint=None, render_policy=None,
+                 dom_extraction=True, rate_controller=None, page_store=None, archive_browser_pages=False,
+                 base_url=STEAMDB_BASE_URL, brightdata_api_url=BRIGHTDATA_API_URL, memory_soft_limit_mb=None,
+                 memory_hard_limit_mb=None, max_collected_records=None, session_store=None,
+                 challenge_wait_ms=8000, session_save_interval=300):
         if not brightdata_api_token:
             raise ValueError("BrightData API token is required")
         self.brightdata_api_token = brightdata_api_token
+        # ベンチマーク等でローカルの代替サーバーに向ける場合に変更する
+        self.base_url = base_url.rstrip("/")
+        self.parser_backend = parser_backend
+        self.parse_stage = ParseStage(
+            self._handle_parsed_record,
+            workers=parse_workers,
+            queue_size=parse_queue_size,
+            backend=parser_backend,
+        )
+        self.brightdata_client = BrightDataClient(
+            brightdata_api_token,
+            api_url=brightdata_api_url,
+            max_concurrency=brightdata_concurrency,
+            cost_per_request=brightdata_cost_per_request,
+        )
         self.user_agents = USER_AGENTS
+        # egress identity（user agent, locale）ごとのチャレンジ率を見て、速度と使う identity を調整する
+        self.rate_controller = rate_controller or AdaptiveRateController()
+        self.identities = [(user_agent, locale) for user_agent in self.user_agents for locale in ACCEPT_LANGUAGES]
+        self._context_identities = weakref.WeakKeyDictionary()
+        # cf_clearance 等を identity ごとに保存し、新しいコンテキストに引き継ぐセッションストア。
+        # セッションを持たない新規コンテキストでチャレンジが出た場合のみ、解決されるまで最大 challenge_wait_ms 待って
+        # cf_clearance を得る（0 で待たない）。保存済みセッションのコンテキストでのチャレンジはすぐにエスカレーションする
+        self.session_store = session_store
+        self.challenge_wait_ms = challenge_wait_ms
+        self.session_save_interval = session_save_interval
+        self._context_sessions = weakref.WeakKeyDictionary()
         self.successful_extractions = 0
-        self.collected_data = []
+        # sink を渡した場合、レコードはメモリに溜めずに逐次書き込む
+        self.sink = sink
+        self.checkpoint = checkpoint
+        # sink なしで長時間実行する場合は max_collected_records で保持件数を制限できる（古いものから破棄）
+        self.collected_data = deque(maxlen=max_collected_records) if max_collected_records else []
+        # 画像・フォント・広告・チャートJSを読み込まない最小描画モード
+        self.render_policy = render_policy or RenderPolicy()
+        # ブラウザティアでは page.content() でHTML全体を転送せず、ページ内で抽出する
+        self.dom_extraction = dom_extraction
+        # 取得したHTMLを保存するページストア。ページ内抽出したブラウザティアのページは
+        # archive_browser_pages=True の場合のみHTMLを追加で取得して保存する
+        self.page_store = page_store
+        self.archive_browser_pages = archive_browser_pages
+        self.browser_pool = BrowserPool(
+            size=browser_pool_size,
+            contexts_per_browser=contexts_per_browser,
+            max_pages_per_browser=max_pages_per_browser,
+            max_pages_per_context=max_pages_per_context,
+            context_options_factory=self.build_context_options,
+            context_setup=self._setup_context,
+        )
+        # プロセスツリーのRSSがしきい値を超えたらブラウザを作り直し、同時実行数を抑える
+        self.memory_watchdog = None
+        if memory_soft_limit_mb:
+            self.memory_watchdog = MemoryWatchdog(
+                memory_soft_limit_mb,
+                memory_hard_limit_mb or memory_soft_limit_mb * 1.5,
+                browser_pool=self.browser_pool,
+            )
+        self._managed = False
+        self.http_pool_size = http_pool_size
+        self._http_session = None
+        self.fetcher = TieredFetcher({
+            TIER_HTTP: self._fetch_via_http,
+            TIER_BROWSER: self._fetch_via_browser,
+            TIER_UNLOCKER: self._fetch_via_unlocker,
+        }, stats=TierStats(state_path=tier_stats_path))
+
+    async def __aenter__(self):
+        # ブラウザプールはブラウザティアが初めて必要になった時点で起動する
+        self._managed = True
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._managed = False
+        await self.close()
+
+    async def close(self):
+        if self.memory_watchdog is not None:
+            await self.memory_watchdog.stop()
+        await self.parse_stage.close()
+        if self._http_session and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
+        self.fetcher.stats.save()
+        if self.render_policy.blocked_requests:
+            logging.info(f"最小描画モード: {self.render_policy.blocked_requests} 件のリクエストをブロックしました "
+                         f"(許可 {self.render_policy.allowed_requests} 件)")
+        if self.rate_controller.rate is not None or self.rate_controller.concurrency is not None:
+            logging.info(f"適応制御の最終状態: {self.rate_controller.snapshot()}")
+        if self.session_store is not None and any(self.session_store.stats.values()):
+            logging.info(f"セッションストア: {self.session_store.stats}")
+        if self.brightdata_client.calls:
+            logging.info(f"BrightData利用状況: {self.brightdata_client.stats()}")
+        await self.brightdata_client.close()
+        await self.browser_pool.close()
     
     def get_random_user_agent(self):
         return random.choice(self.user_agents)
     
-    def get_browser_headers(self, user_agent):
+    def get_browser_headers(self, user_agent, locale=None):
+        accept_languages = ACCEPT_LANGUAGES[locale] if locale else [
+            language for languages in ACCEPT_LANGUAGES.values() for language in languages]
         headers = {
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-            "Accept-Language": random.choice([
-                "ja-JP,ja;q=0.9,en-US;q=0.8,en;q=0.7",
-                "en-US,en;q=0.9,ja;q=0.8",
-                "ja,en-US;q=0.9,en;q=0.8"
-            ]),
+            "Accept-Language": random.choice(accept_languages),
             "Accept-Encoding": "gzip, deflate, br, zstd",
             "DNT": "1",
             "Connection": "keep-alive",
@@ -153,112 +174,246 @@ class SteamDBScraper:
         elif "Safari" in user_agent and "Chrome" not in user_agent:
             headers["Accept"] = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
         return headers
+
+    def build_context_options(self):
+        """新しいブラウザコンテキスト用のフィンガープリントを生成
+
+        セッションストアに有効なセッションがあれば、そのフィンガープリントと storage_state を使う。
+        """
+        candidates = self.identities
+        if self.session_store is not None:
+            candidates = [identity for identity in self.session_store.identities()
+                          if identity in self.identities
+                          and not self.rate_controller.is_quarantined(identity, TIER_BROWSER)
+                          ] or self.identities
+        identity = self.rate_controller.choose_identity(candidates, TIER_BROWSER)
+        if self.session_store is not None:
+            session = self.session_store.get(identity)
+            if session is not None:
+                fingerprint, storage_state = session
+                return {**fingerprint, 'storage_state': storage_state}
+        user_agent, locale = identity
+        headers = self.get_browser_headers(user_agent, locale)
+        return {
+            'user_agent': user_agent, 'viewport': {'width': 1920, 'height': 1080},
+            'locale': locale,
+            'timezone_id': random.choice(['Asia/Tokyo', 'America/New_York', 'Europe/London']),
+            'permissions': ['geolocation'], 'device_scale_factor': random.uniform(1.0, 2.0),
+            'has_touch': False, 'java_script_enabled': True, 'accept_downloads': False,
+            'color_scheme': random.choice(['light', 'dark']), 'extra_http_headers': headers
+        }
     
-    def fetch_with_brightdata_unlocker(self, url):
-        try:
-            api_url = "https://api.brightdata.com/request"
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.brightdata_api_token}"
+    async def _setup_context(self, context, options):
+        self._context_identities[context] = (options['user_agent'], options['locale'])
+        if self.session_store is not None:
+            self._context_sessions[context] = {
+                "fingerprint": {key: value for key, value in options.items() if key != 'storage_state'},
+                "restored": 'storage_state' in options,
+                # セッションから作ったコンテキストは、保存間隔が経つまで保存し直さない
+                "saved_at": time.monotonic() if 'storage_state' in options else float("-inf"),
             }
-            data = {
-                "zone": "claude_flare_captcha1",
-                "url": url,
-                "format": "raw"
-            }
-            logging.info(f"BrightData Web Unlocker APIでページを取得: {url}")
-            response = requests.post(api_url, headers=headers, json=data, verify=False, timeout=60)
-            if response.status_code == 200:
-                logging.info("BrightData APIからコンテンツ取得成功")
-                return response.text
-            else:
-                logging.warning(f"BrightData API エラー: {response.status_code} - {response.text}")
-                return None
+        await self.render_policy.install(context)
+
+    def _report_egress(self, tier, identity, content, started, status=200):
+        """HTTP・ブラウザティアの結果を適応制御に伝える"""
+        if identity is None:
+            return
+        if status in THROTTLE_STATUSES:
+            outcome = OUTCOME_THROTTLED
+        elif isinstance(content, ExtractedPage):
+            outcome = OUTCOME_CHALLENGE if content.challenge else OUTCOME_OK
+        elif status == 403 or (content and is_challenge_page(content)):
+            outcome = OUTCOME_CHALLENGE
+        else:
+            outcome = OUTCOME_OK if content else OUTCOME_ERROR
+        self.rate_controller.record(identity, outcome, time.perf_counter() - started, tier=tier)
+
+    async def fetch_with_brightdata_unlocker(self, url):
+        try:
+            return await self.brightdata_client.fetch(url)
         except Exception as e:
             logging.error(f"BrightData API呼び出し中にエラー: {e}")
             return None
     
     def _extract_data_from_brightdata_html(self, html_content, appid):
-        return extract_data_from_brightdata_html(html_content, appid)
+        return extract_data_from_brightdata_html(html_content, appid, backend=self.parser_backend)
     
-    async def scrape_app_data(self, appid, progress_text=""):
-        logging.info(f"--- {progress_text} AppID {appid} の処理を開始 ---")
-        steamdb_url = f"https://steamdb.info/app/{appid}/charts/"
-        async with async_playwright() as p:
-            browser = None
-            context = None
-            page = None
+    def _get_http_session(self):
+        if self._http_session is None or self._http_session.closed:
+            connector = aiohttp.TCPConnector(limit=self.http_pool_size, ttl_dns_cache=300)
+            timeout = aiohttp.ClientTimeout(total=30)
+            self._http_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._http_session
+
+    async def _fetch_via_http(self, url):
+        identity = self.rate_controller.choose_identity(self.identities, TIER_HTTP)
+        user_agent, locale = identity
+        headers = self.get_browser_headers(user_agent, locale)
+        headers["User-Agent"] = user_agent
+        # aiohttpが標準で展開できる圧縮形式のみを要求する
+        headers["Accept-Encoding"] = "gzip, deflate"
+        started = time.perf_counter()
+        async with self._get_http_session().get(url, headers=headers) as response:
+            if response.status != 200:
+                logging.info(f"HTTPティア: ステータス {response.status} ({url})")
+                self._report_egress(TIER_HTTP, identity, None, started, response.status)
+                return None
+            html_content = await response.text()
+        self._report_egress(TIER_HTTP, identity, html_content, started)
+        return html_content
+
+    async def _fetch_via_browser(self, url):
+        async with self.browser_pool.page() as page:
+            identity = self._context_identities.get(page.context)
+            await page.mouse.move(random.randint(50, 200), random.randint(50, 200))
+            await asyncio.sleep(random.uniform(0.5, 1.5))
+            logging.info(f"URLからデータを読み込んでいます: {url}")
+            # 読み込み完了を待たず、followers/reviews/owners のノードが揃った時点で取得する
+            started = time.perf_counter()
+            with METRICS.span("navigation"):
+                await page.goto(url, wait_until="commit", timeout=30000)
+                logging.info("ページ遷移開始 (commit)。データノードの表示を待ちます...")
+                await self.render_policy.wait_for_data(page)
+            content = await self._read_page(page, url)
+            if self._should_wait_for_challenge(page.context, content):
+                content = await self._solve_challenge(page, url, content)
+            self._report_egress(TIER_BROWSER, identity, content, started)
+            if self.session_store is not None and identity is not None:
+                await self._update_session(page.context, identity, content)
+            if identity is not None and self.rate_controller.is_quarantined(identity, TIER_BROWSER):
+                # 隔離された identity のコンテキストは使い続けない
+                self.browser_pool.retire_context(page.context)
+            return content
+
+    async def _read_page(self, page, url):
+        """ページ内抽出で項目を取得する。抽出できなければHTML全体を返す"""
+        if self.dom_extraction:
             try:
-                user_agent = self.get_random_user_agent()
-                headers = self.get_browser_headers(user_agent)
-                launch_args = [
-                    '--no-sandbox', '--disable-setuid-sandbox', '--disable-gpu',
-                    '--disable-dev-shm-usage', '--disable-web-security',
-                    '--disable-features=IsolateOrigins,site-per-process',
-                    '--disable-blink-features=AutomationControlled',
-                    '--window-size=1920,1080', '--start-maximized',
-                    f'--user-agent={user_agent}'
-                ]
-                browser_options = {'headless': True, 'args': launch_args}
-                browser = await p.chromium.launch(**browser_options)
-                context_options = {
-                    'user_agent': user_agent, 'viewport': {'width': 1920, 'height': 1080},
-                    'locale': random.choice(['ja-JP', 'en-US']),
-                    'timezone_id': random.choice(['Asia/Tokyo', 'America/New_York', 'Europe/London']),
-                    'permissions': ['geolocation'], 'device_scale_factor': random.uniform(1.0, 2.0),
-                    'has_touch': False, 'java_script_enabled': True, 'accept_downloads': False,
-                    'color_scheme': random.choice(['light', 'dark']), 'extra_http_headers': headers
-                }
-                context = await browser.new_context(**context_options)
-                page = await context.new_page()
-                await stealth_async(page)
-                await page.mouse.move(random.randint(50, 200), random.randint(50, 200))
-                await asyncio.sleep(random.uniform(0.5, 1.5))
-                logging.info(f"URLからデータを読み込んでいます: {steamdb_url}")
-                await page.goto(steamdb_url, wait_until="domcontentloaded", timeout=30000)
-                logging.info("ページ遷移完了 (domcontentloaded)。コンテンツの読み込みを待ちます...")
-                try:
-                    await page.wait_for_selector('body', timeout=10000)
-                    page_content = await page.content()
-                    if "cloudflare" in page_content.lower() or "checking your browser" in page_content.lower():
-                        logging.warning("CloudFlare チャレンジを検出しました。BrightData APIで回避を試行...")
-                        brightdata_html = self.fetch_with_brightdata_unlocker(steamdb_url)
-                        if brightdata_html:
-                            extracted_data = self._extract_data_from_brightdata_html(brightdata_html, appid)
-                            logging.info(f"BrightData APIでCloudFlare回避成功: {extracted_data}")
-                            logging.info(f"{progress_text} AppID {appid} のBrightData抽出データ:")
-                            logging.info(json.dumps(extracted_data, indent=2, ensure_ascii=False))
-                            if extracted_data.get("エラー") is None and extracted_data.get("AppID") is not None:
-                                self.successful_extractions += 1
-                                self.collected_data.append(extracted_data)
-                            raise Exception("BrightData_Success")
-                        else:
-                            logging.warning("BrightData APIも失敗、従来の待機方法を試行...")
-                            await asyncio.sleep(random.uniform(10, 20))
-                            await page.reload(wait_until="domcontentloaded", timeout=30000)
-                            await asyncio.sleep(random.uniform(3, 7))
-                except Exception as e:
-                    if str(e) != "BrightData_Success":
-                        logging.warning(f"CloudFlare検出チェック中にエラー (AppID: {appid}): {e}")
+                with METRICS.span("dom_extract"):
+                    extracted = await extract_fields_in_page(page)
             except Exception as e:
-                if str(e) == "BrightData_Success":
-                    logging.info(f"{progress_text} AppID {appid} BrightDataで正常に処理完了")
+                logging.warning(f"ページ内抽出に失敗したため、HTMLを取得して解析します ({url}): {e}")
+            else:
+                if extracted.challenge or extracted.fields:
+                    if extracted.fields and self.page_store is not None and self.archive_browser_pages:
+                        with METRICS.span("serialize_html"):
+                            extracted.html = await page.content()
+                    return extracted
+                logging.warning(f"ページ内抽出で項目が見つからないため、HTMLを取得して解析します ({url})")
+        with METRICS.span("serialize_html"):
+            return await page.content()
+
+    @staticmethod
+    def _is_challenge(content):
+        if isinstance(content, ExtractedPage):
+            return content.challenge
+        return bool(content) and is_challenge_page(content)
+
+    def _should_wait_for_challenge(self, context, content):
+        """セッションストア使用時、まだセッションを持たないコンテキストのチャレンジだけ解決を待つ"""
+        if self.session_store is None or self.challenge_wait_ms <= 0 or not self._is_challenge(content):
+            return False
+        session = self._context_sessions.get(context)
+        return session is not None and not session["restored"]
+
+    async def _solve_challenge(self, page, url, content):
+        """チャレンジがブラウザ上で解決されるのを待ち、解決したらページを読み直す"""
+        logging.info(f"CloudFlareのチャレンジを検出しました。ブラウザ上での解決を最大 {self.challenge_wait_ms / 1000:.0f} 秒待ちます ({url})")
+        with METRICS.span("challenge_solve"):
+            solved = await self.render_policy.wait_for_challenge_clear(page, self.challenge_wait_ms)
+        if not solved:
+            return content
+        METRICS.inc("scraper_session_events_total", event="solved")
+        session = self._context_sessions.get(page.context)
+        if session is not None:
+            # 得られた cf_clearance をすぐに保存させる
+            session["saved_at"] = float("-inf")
+        return await self._read_page(page, url)
+
+    async def _update_session(self, context, identity, content):
+        """成功したコンテキストのセッションを保存し、チャレンジが出たセッションは破棄する"""
+        session = self._context_sessions.get(context)
+        if session is None:
+            return
+        if self._is_challenge(content):
+            self.session_store.invalidate(identity)
+            self.browser_pool.retire_context(context)
+            return
+        if not content or time.monotonic() - session["saved_at"] < self.session_save_interval:
+            return
+        try:
+            storage_state = await context.storage_state()
+            self.session_store.save(identity, session["fingerprint"], storage_state)
+            session["saved_at"] = time.monotonic()
+        except Exception as e:
+            logging.warning(f"セッションの保存中にエラー: {e}")
+
+    async def _fetch_via_unlocker(self, url):
+        return await self.fetch_with_brightdata_unlocker(url)
+
+    async def _handle_parsed_record(self, record, context):
+        progress_text, tier = context
+        logging.info(f"{progress_text} AppID {record.app_id} の抽出データ ({tier} ティア): {record!r}")
+        if record.ok:
+            self.successful_extractions += 1
+            if self.checkpoint is not None:
+                self.checkpoint.record_completed(record)
+            if self.sink is not None:
+                await self.sink.add(record)
+            else:
+                self.collected_data.append(record)
+
+    async def scrape_app_data(self, appid, progress_text=""):
+        logging.info(f"--- {progress_text} AppID {appid} の処理を開始 ---")
+        current_appid.set(appid)
+        steamdb_url = f"{self.base_url}/app/{appid}/charts/"
+        try:
+            result = await self.fetcher.fetch(steamdb_url)
+            if result is None:
+                logging.warning(f"AppID {appid}: 全てのティアでページ取得に失敗しました")
+            else:
+                if result.html and self.page_store is not None:
+                    await self._archive_page(appid, result)
+                if result.fields is not None:
+                    # ページ内で抽出済みのため、解析ステージを経由せずにレコードを組み立てる
+                    await self._handle_parsed_record(build_record(appid, result.fields), (progress_text, result.tier))
                 else:
-                    logging.error(f"AppID {appid} のPlaywright処理中にエラーが発生しました: {e}", exc_info=True)
-            finally:
-                if page and not page.is_closed(): 
-                    await page.close()
-                if context:
-                    await context.close()
-                if browser:
-                    await browser.close()
-        logging.info(f"--- {progress_text} AppID {appid} の処理を終了 ---")
+                    # 解析はプロセスプールに任せ、フェッチャーは次のAppIDへ進む
+                    await self.parse_stage.submit(appid, result.html, (progress_text, result.tier))
+        except Exception as e:
+            logging.error(f"AppID {appid} の処理中にエラーが発生しました: {e}", exc_info=True)
+        logging.info(f"--- {progress_text} AppID {appid} の取得を終了 ---")
+
+    async def _archive_page(self, appid, result):
+        try:
+            with METRICS.span("page_store"):
+                await asyncio.to_thread(self.page_store.put, appid, result.html, result.tier)
+        except Exception as e:
+            logging.warning(f"AppID {appid} のページ保存中にエラー: {e}")
 
-    async def scrape_multiple_apps(self, appid_list, delay_between_apps=10):
-        for appid_index, appid in enumerate(appid_list):
-            progress_text = f"[{appid_index + 1}/{len(appid_list)}]"
-            await self.scrape_app_data(appid, progress_text)
-            if appid_index < len(appid_list) - 1:
-                logging.info(f"次のAppID処理まで{delay_between_apps}秒待機します...")
-                await asyncio.sleep(delay_between_apps)
+    async def scrape_multiple_apps(self, appid_list, delay_between_apps=None, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                                   requests_per_second=DEFAULT_REQUESTS_PER_SECOND, burst=DEFAULT_BURST,
+                                   priorities=None, domain_concurrency=None, jitter=DEFAULT_JITTER):
+        # 旧来の固定待機秒数が指定された場合は、それと同じ平均レートに換算する
+        if delay_between_apps:
+            requests_per_second = 1 / delay_between_apps
+        scheduler = ScrapeScheduler(
+            self.scrape_app_data,
+            max_concurrency=max_concurrency,
+            requests_per_second=requests_per_second,
+            burst=burst,
+            domain_concurrency=domain_concurrency,
+            jitter=jitter,
+        )
+        self.rate_controller.attach(scheduler)
+        if self.memory_watchdog is not None:
+            self.memory_watchdog.attach(scheduler)
+            self.memory_watchdog.start()
+        try:
+            await scheduler.run(appid_list, priorities=priorities)
+            await self.parse_stage.join()
+        finally:
+            # async with で管理されていない場合は、ここで接続とブラウザを解放する
+            if not self._managed:
+                await self.close()
         return self.successful_extractions, self.collected_data
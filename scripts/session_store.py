@@ -0,0 +1,111 @@
+# scripts/session_store.py
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from metrics import METRICS
+
+CLEARANCE_COOKIE = "cf_clearance"
+DEFAULT_MAX_AGE = 6 * 60 * 60
+DEFAULT_TTL = 30 * 60
+
+
+def clearance_expiry(storage_state):
+    """storage_state 内の cf_clearance cookie の有効期限（UNIX時刻）。無ければ None"""
+    expires = [cookie.get("expires", -1) for cookie in storage_state.get("cookies", ())
+               if cookie.get("name") == CLEARANCE_COOKIE]
+    expires = [value for value in expires if value and value > 0]
+    return min(expires) if expires else None
+
+
+class SessionStore:
+    """egress identity（user agent, locale）ごとにブラウザのセッションを保存するストア
+
+    Playwright の storage_state（cookie・localStorage）と、そのセッションを得たときの
+    コンテキスト設定（フィンガープリント）を組にして保存する。新しいコンテキストを同じ
+    フィンガープリントと storage_state で作れば、CloudFlareのチャレンジを解いて得た
+    cf_clearance を別のAppIDでも使い回せる。
+    有効期限は cf_clearance cookie の期限（無ければ保存から ttl 秒）と、
+    最初の保存から max_age 秒のうち早い方。チャレンジが再び出たセッションは invalidate で破棄する。
+    複数のレプリカから同じDBファイルを参照できる。
+    """
+
+    def __init__(self, db_path, max_age=DEFAULT_MAX_AGE, ttl=DEFAULT_TTL):
+        self.db_path = str(db_path)
+        self.max_age = max_age
+        self.ttl = ttl
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS browser_sessions (
+                user_agent TEXT NOT NULL,
+                locale TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                storage_state TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                saved_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (user_agent, locale)
+            )
+        """)
+        self._conn.commit()
+        self.stats = {"hits": 0, "misses": 0, "saved": 0, "invalidated": 0}
+
+    def _count(self, event):
+        self.stats[event] += 1
+        METRICS.inc("scraper_session_events_total", event=event)
+
+    def identities(self, now=None):
+        """有効なセッションを持つ identity の一覧"""
+        now = now or time.time()
+        rows = self._conn.execute(
+            "SELECT user_agent, locale FROM browser_sessions WHERE expires_at > ?", (now,)).fetchall()
+        return [tuple(row) for row in rows]
+
+    def get(self, identity, now=None):
+        """(fingerprint, storage_state) を返す。無いか期限切れなら None"""
+        now = now or time.time()
+        row = self._conn.execute("""
+            SELECT fingerprint, storage_state FROM browser_sessions
+            WHERE user_agent = ? AND locale = ? AND expires_at > ?
+        """, (*identity, now)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return json.loads(row[0]), json.loads(row[1])
+
+    def save(self, identity, fingerprint, storage_state, now=None):
+        now = now or time.time()
+        row = self._conn.execute(
+            "SELECT created_at FROM browser_sessions WHERE user_agent = ? AND locale = ? AND expires_at > ?",
+            (*identity, now)).fetchone()
+        created_at = row[0] if row else now
+        expires_at = min(clearance_expiry(storage_state) or now + self.ttl, created_at + self.max_age)
+        with self._conn:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO browser_sessions
+                    (user_agent, locale, fingerprint, storage_state, created_at, saved_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (*identity, json.dumps(fingerprint), json.dumps(storage_state), created_at, now, expires_at))
+        self._count("saved")
+
+    def invalidate(self, identity):
+        with self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM browser_sessions WHERE user_agent = ? AND locale = ?", identity).rowcount
+        if deleted:
+            self._count("invalidated")
+            logging.info(f"セッションを破棄しました: {identity[1]} / {identity[0][:40]}...")
+
+    def purge_expired(self, now=None):
+        with self._conn:
+            return self._conn.execute(
+                "DELETE FROM browser_sessions WHERE expires_at <= ?", (now or time.time(),)).rowcount
+
+    def close(self):
+        self._conn.close()
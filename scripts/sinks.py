@@ -0,0 +1,250 @@
+# scripts/sinks.py
+import asyncio
+import logging
+import sqlite3
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from metrics import METRICS
+from records import RecordBatch
+
+
+class StreamingSink:
+    """レコードをマイクロバッチにまとめて書き込み先へ逐次フラッシュする
+
+    batch_size 件たまるか、flush_interval 秒経過するごとに ``write_batch(batch)`` を
+    スレッドで実行する。batch は列指向の RecordBatch。write_batch が False を返すか例外を
+    送出した場合、バッチはバッファに戻され次回のフラッシュで再送される。失敗後は
+    retry_backoff 秒（失敗が続くごとに倍、最大 max_retry_backoff 秒）経過するか、
+    失敗後に新たに batch_size 件たまるまで add() からはフラッシュしない。on_flush は
+    書き込み成功後に ``on_flush(batch)`` として呼ばれる。
+    """
+
+    def __init__(self, write_batch, batch_size=50, flush_interval=30.0, on_flush=None,
+                 retry_backoff=5.0, max_retry_backoff=300.0):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.flushed_records = 0
+        self.failed_flushes = 0
+        self._buffer = RecordBatch()
+        self._lock = asyncio.Lock()
+        self._timer = None
+        self._backoff = retry_backoff
+        self._retry_at = None
+        self._added_since_failure = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        if self.flush_interval and self._timer is None:
+            self._timer = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        await self.flush()
+        if self._buffer:
+            logging.error(f"シンクに未書き込みのレコードが {len(self._buffer)} 件残っています")
+
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    async def add(self, record):
+        self._buffer.append(record)
+        if self._retry_at is not None:
+            # 書き込み先の障害中は、レコードごとに全件を再送しないよう待つ
+            self._added_since_failure += 1
+            if time.monotonic() < self._retry_at and self._added_since_failure < self.batch_size:
+                return
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return True
+            batch, self._buffer = self._buffer, RecordBatch()
+            started = time.perf_counter()
+            try:
+                with METRICS.span("sink_write"):
+                    success = await asyncio.to_thread(self.write_batch, batch)
+            except Exception as e:
+                logging.error(f"マイクロバッチの書き込み中にエラー: {e}", exc_info=True)
+                success = False
+            if not success:
+                self.failed_flushes += 1
+                batch.extend(self._buffer)
+                self._buffer = batch
+                self._retry_at = time.monotonic() + self._backoff
+                self._added_since_failure = 0
+                logging.warning(f"マイクロバッチ {len(batch)} 件の書き込みに失敗しました。{self._backoff:.0f}秒後以降のフラッシュで再送します")
+                self._backoff = min(self._backoff * 2, self.max_retry_backoff)
+                return False
+            self._retry_at = None
+            self._backoff = self.retry_backoff
+            self.flushed_records += len(batch)
+            logging.info(f"マイクロバッチ {len(batch)} 件を書き込みました ({time.perf_counter() - started:.2f}秒, 累計 {self.flushed_records}件)")
+            if self.on_flush:
+                self.on_flush(batch)
+            return True
+
+
+class SQLiteMetricsStore:
+    """BigQueryの steam_app_metrics を模したローカルの書き込み先（テスト・開発用）
+
+    bulk_merge_data.sql と同じく (app_id, scrape_date) をキーにUPSERTする。
+    BigQuery側と同様に、バッチに含まれるAppIDの分だけ最新スナップショット
+    （steam_app_metrics_latest_by_app）と前回比（steam_app_metrics_daily_delta）も更新する。
+    """
+
+    def __init__(self, db_path, delta_lookback_days=45):
+        self.db_path = str(db_path)
+        self.delta_lookback_days = delta_lookback_days
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS steam_app_metrics (
+                app_id INTEGER NOT NULL,
+                title_name TEXT,
+                current_followers INTEGER,
+                positive_reviews INTEGER,
+                negative_reviews INTEGER,
+                owner_estimation INTEGER,
+                scraped_at TEXT,
+                scrape_date TEXT NOT NULL,
+                PRIMARY KEY (app_id, scrape_date)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS steam_app_metrics_latest_by_app (
+                app_id INTEGER PRIMARY KEY,
+                title_name TEXT,
+                current_followers INTEGER,
+                positive_reviews INTEGER,
+                negative_reviews INTEGER,
+                owner_estimation INTEGER,
+                scraped_at TEXT,
+                scrape_date TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS steam_app_metrics_daily_delta (
+                app_id INTEGER NOT NULL,
+                scrape_date TEXT NOT NULL,
+                previous_scrape_date TEXT,
+                days_since_previous INTEGER,
+                current_followers INTEGER,
+                followers_change INTEGER,
+                positive_reviews_change INTEGER,
+                negative_reviews_change INTEGER,
+                owner_estimation_change INTEGER,
+                PRIMARY KEY (app_id, scrape_date)
+            )
+        """)
+        self._conn.commit()
+
+    def write_batch(self, batch):
+        rows = list(batch.rows())
+        with self._conn:
+            self._conn.executemany("""
+                INSERT INTO steam_app_metrics (app_id, title_name, current_followers, positive_reviews,
+                                               negative_reviews, owner_estimation, scraped_at, scrape_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (app_id, scrape_date) DO UPDATE SET
+                    title_name = excluded.title_name,
+                    current_followers = excluded.current_followers,
+                    positive_reviews = excluded.positive_reviews,
+                    negative_reviews = excluded.negative_reviews,
+                    owner_estimation = excluded.owner_estimation,
+                    scraped_at = excluded.scraped_at
+            """, rows)
+            if rows:
+                self._merge_latest(rows)
+                self._merge_daily_delta(rows)
+        logging.info(f"ローカルストアに {len(batch)} 件のレコードをUPSERTしました: {self.db_path}")
+        return True
+
+    def _merge_latest(self, rows):
+        """merge_latest_snapshot.sql 相当: 既存より新しい取得結果だけで置き換える"""
+        self._conn.executemany("""
+            INSERT INTO steam_app_metrics_latest_by_app (app_id, title_name, current_followers, positive_reviews,
+                                                         negative_reviews, owner_estimation, scraped_at, scrape_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (app_id) DO UPDATE SET
+                title_name = excluded.title_name,
+                current_followers = excluded.current_followers,
+                positive_reviews = excluded.positive_reviews,
+                negative_reviews = excluded.negative_reviews,
+                owner_estimation = excluded.owner_estimation,
+                scraped_at = excluded.scraped_at,
+                scrape_date = excluded.scrape_date
+            WHERE excluded.scrape_date > steam_app_metrics_latest_by_app.scrape_date
+               OR (excluded.scrape_date = steam_app_metrics_latest_by_app.scrape_date
+                   AND excluded.scraped_at >= steam_app_metrics_latest_by_app.scraped_at)
+        """, rows)
+
+    def _merge_daily_delta(self, rows):
+        """merge_daily_delta.sql 相当: バッチのAppIDについて、バッチ内の最も古い取得日以降の前回比を再計算する"""
+        first_dates = {}
+        for row in rows:
+            app_id, scrape_date = row[0], row[-1]
+            if app_id not in first_dates or scrape_date < first_dates[app_id]:
+                first_dates[app_id] = scrape_date
+        history_start = (date.fromisoformat(min(first_dates.values()))
+                         - timedelta(days=self.delta_lookback_days)).isoformat()
+        self._conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS batch_apps (app_id INTEGER PRIMARY KEY, first_date TEXT NOT NULL)")
+        self._conn.execute("DELETE FROM batch_apps")
+        self._conn.executemany("INSERT INTO batch_apps VALUES (?, ?)", first_dates.items())
+        self._conn.execute("""
+            INSERT INTO steam_app_metrics_daily_delta (app_id, scrape_date, previous_scrape_date, days_since_previous,
+                                                       current_followers, followers_change, positive_reviews_change,
+                                                       negative_reviews_change, owner_estimation_change)
+            SELECT app_id, scrape_date, previous_scrape_date,
+                   CAST(julianday(scrape_date) - julianday(previous_scrape_date) AS INTEGER),
+                   current_followers, followers_change, positive_reviews_change,
+                   negative_reviews_change, owner_estimation_change
+            FROM (
+                SELECT m.app_id, m.scrape_date, b.first_date,
+                       LAG(m.scrape_date) OVER w AS previous_scrape_date,
+                       m.current_followers,
+                       m.current_followers - LAG(m.current_followers) OVER w AS followers_change,
+                       m.positive_reviews - LAG(m.positive_reviews) OVER w AS positive_reviews_change,
+                       m.negative_reviews - LAG(m.negative_reviews) OVER w AS negative_reviews_change,
+                       m.owner_estimation - LAG(m.owner_estimation) OVER w AS owner_estimation_change
+                FROM steam_app_metrics AS m
+                JOIN batch_apps AS b ON b.app_id = m.app_id
+                WHERE m.scrape_date >= ?
+                WINDOW w AS (PARTITION BY m.app_id ORDER BY m.scrape_date)
+            )
+            WHERE scrape_date >= first_date
+            ON CONFLICT (app_id, scrape_date) DO UPDATE SET
+                previous_scrape_date = excluded.previous_scrape_date,
+                days_since_previous = excluded.days_since_previous,
+                current_followers = excluded.current_followers,
+                followers_change = excluded.followers_change,
+                positive_reviews_change = excluded.positive_reviews_change,
+                negative_reviews_change = excluded.negative_reviews_change,
+                owner_estimation_change = excluded.owner_estimation_change
+        """, (history_start,))
+
+    def close(self):
+        self._conn.close()
@@ -1,6 +1,9 @@
 -- 分析用クエリ集
+-- ダッシュボードは steam_app_metrics 全体ではなく、取り込み時に差分更新される集計済みテーブルを読む
+--   steam_app_metrics_latest_by_app: AppIDごとの最新値（再取得間隔により当日未取得のAppIDも含む）
+--   steam_app_metrics_daily_delta: AppIDごとの前回取得時からの変化量
 
--- 1. 日別のトップゲーム（フォロワー数順）
+-- 1. トップゲーム（最新のフォロワー数順）
 SELECT 
     title_name,
     current_followers,
@@ -8,9 +11,8 @@ SELECT
     negative_reviews,
     owner_estimation,
     scrape_date
-FROM `capable-blend-244100.steam_data.steam_app_metrics` 
-WHERE scrape_date = CURRENT_DATE('UTC')
-    AND current_followers IS NOT NULL
+FROM `capable-blend-244100.steam_data.steam_app_metrics_latest_by_app` 
+WHERE current_followers IS NOT NULL
 ORDER BY current_followers DESC;
 
 -- 2. レビュー満足度の高いゲーム
@@ -20,9 +22,8 @@ SELECT
     negative_reviews,
     ROUND(positive_reviews / (positive_reviews + negative_reviews) * 100, 2) as satisfaction_rate,
     (positive_reviews + negative_reviews) as total_reviews
-FROM `capable-blend-244100.steam_data.steam_app_metrics` 
-WHERE scrape_date = CURRENT_DATE('UTC')
-    AND positive_reviews IS NOT NULL 
+FROM `capable-blend-244100.steam_data.steam_app_metrics_latest_by_app` 
+WHERE positive_reviews IS NOT NULL 
     AND negative_reviews IS NOT NULL
     AND (positive_reviews + negative_reviews) > 1000
 ORDER BY satisfaction_rate DESC;
@@ -33,22 +34,23 @@ SELECT
     current_followers,
     owner_estimation,
     ROUND(SAFE_DIVIDE(owner_estimation, current_followers), 2) as owner_follower_ratio
-FROM `capable-blend-244100.steam_data.steam_app_metrics` 
-WHERE scrape_date = CURRENT_DATE('UTC')
-    AND current_followers IS NOT NULL 
+FROM `capable-blend-244100.steam_data.steam_app_metrics_latest_by_app` 
+WHERE current_followers IS NOT NULL 
     AND owner_estimation IS NOT NULL
     AND current_followers > 0
 ORDER BY owner_follower_ratio DESC;
 
 -- 4. 時系列での変化（過去7日間）
 SELECT 
-    app_id,
-    title_name,
-    scrape_date,
-    current_followers,
-    LAG(current_followers) OVER (PARTITION BY app_id ORDER BY scrape_date) as previous_followers,
-    current_followers - LAG(current_followers) OVER (PARTITION BY app_id ORDER BY scrape_date) as followers_change
-FROM `capable-blend-244100.steam_data.steam_app_metrics` 
-WHERE scrape_date >= DATE_SUB(CURRENT_DATE('UTC'), INTERVAL 7 DAY)
-    AND current_followers IS NOT NULL
-ORDER BY app_id, scrape_date DESC;
\ No newline at end of file
+    d.app_id,
+    l.title_name,
+    d.scrape_date,
+    d.current_followers,
+    d.current_followers - d.followers_change as previous_followers,
+    d.followers_change,
+    d.days_since_previous
+FROM `capable-blend-244100.steam_data.steam_app_metrics_daily_delta` d
+JOIN `capable-blend-244100.steam_data.steam_app_metrics_latest_by_app` l USING (app_id)
+WHERE d.scrape_date >= DATE_SUB(CURRENT_DATE('UTC'), INTERVAL 7 DAY)
+    AND d.current_followers IS NOT NULL
+ORDER BY d.app_id, d.scrape_date DESC;
\ No newline at end of file
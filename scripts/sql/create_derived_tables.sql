@@ -0,0 +1,33 @@
+-- ダッシュボード用の集計済みテーブル
+-- 初回作成時のみ steam_app_metrics 全体から作成し、以降は save_to_bigquery のMERGEで
+-- バッチに含まれるAppIDの行だけを更新する（merge_latest_snapshot.sql / merge_daily_delta.sql）
+
+-- AppIDごとの最新スナップショット（1 AppID 1行）
+CREATE TABLE IF NOT EXISTS `{project_id}.{dataset_id}.{latest_table_id}`
+CLUSTER BY app_id
+OPTIONS(description="AppIDごとの最新スナップショット（save_to_bigquery が差分更新）")
+AS
+SELECT app_id, title_name, current_followers, positive_reviews, negative_reviews, owner_estimation,
+       scraped_at, scrape_date
+FROM `{project_id}.{dataset_id}.{table_id}`
+WHERE TRUE
+QUALIFY ROW_NUMBER() OVER (PARTITION BY app_id ORDER BY scrape_date DESC, scraped_at DESC) = 1;
+
+-- AppIDごとの前回取得時からの変化量（1 AppID・1日 1行）
+CREATE TABLE IF NOT EXISTS `{project_id}.{dataset_id}.{delta_table_id}`
+PARTITION BY scrape_date
+CLUSTER BY app_id
+OPTIONS(description="AppIDごとの前回取得時からの変化量（save_to_bigquery が差分更新）")
+AS
+SELECT
+  app_id,
+  scrape_date,
+  LAG(scrape_date) OVER w AS previous_scrape_date,
+  DATE_DIFF(scrape_date, LAG(scrape_date) OVER w, DAY) AS days_since_previous,
+  current_followers,
+  current_followers - LAG(current_followers) OVER w AS followers_change,
+  positive_reviews - LAG(positive_reviews) OVER w AS positive_reviews_change,
+  negative_reviews - LAG(negative_reviews) OVER w AS negative_reviews_change,
+  owner_estimation - LAG(owner_estimation) OVER w AS owner_estimation_change
+FROM `{project_id}.{dataset_id}.{table_id}`
+WINDOW w AS (PARTITION BY app_id ORDER BY scrape_date);
@@ -1,5 +1,6 @@
 -- 最新データのみを表示するビューを作成
 -- 同一日・同一AppIDで重複がある場合は最新の scraped_at を使用
+-- AppIDごとの最新値だけが必要な場合は steam_app_metrics_latest_by_app（create_derived_tables.sql）を使う
 
 CREATE OR REPLACE VIEW `capable-blend-244100.steam_data.steam_app_metrics_latest` AS
 SELECT 
@@ -0,0 +1,49 @@
+-- 前回比テーブルの差分更新
+-- 一時テーブル（今回のバッチ）のAppIDについて、バッチ内で最も古い取得日以降の変化量を再計算する。
+-- 前回の取得日を探すため、メインテーブルは {history_start} 以降のパーティションのみを読む
+
+MERGE `{project_id}.{dataset_id}.{delta_table_id}` AS target
+USING (
+  WITH batch AS (
+    SELECT app_id, MIN(scrape_date) AS first_date
+    FROM `{temp_table_id}`
+    GROUP BY app_id
+  ),
+  deltas AS (
+    SELECT
+      m.app_id,
+      m.scrape_date,
+      b.first_date,
+      LAG(m.scrape_date) OVER w AS previous_scrape_date,
+      DATE_DIFF(m.scrape_date, LAG(m.scrape_date) OVER w, DAY) AS days_since_previous,
+      m.current_followers,
+      m.current_followers - LAG(m.current_followers) OVER w AS followers_change,
+      m.positive_reviews - LAG(m.positive_reviews) OVER w AS positive_reviews_change,
+      m.negative_reviews - LAG(m.negative_reviews) OVER w AS negative_reviews_change,
+      m.owner_estimation - LAG(m.owner_estimation) OVER w AS owner_estimation_change
+    FROM `{project_id}.{dataset_id}.{table_id}` AS m
+    JOIN batch AS b ON b.app_id = m.app_id
+    WHERE m.scrape_date >= DATE('{history_start}')
+    WINDOW w AS (PARTITION BY m.app_id ORDER BY m.scrape_date)
+  )
+  SELECT * EXCEPT (first_date)
+  FROM deltas
+  WHERE scrape_date >= first_date
+) AS source
+ON target.app_id = source.app_id
+   AND target.scrape_date = source.scrape_date
+WHEN MATCHED THEN
+  UPDATE SET
+    previous_scrape_date = source.previous_scrape_date,
+    days_since_previous = source.days_since_previous,
+    current_followers = source.current_followers,
+    followers_change = source.followers_change,
+    positive_reviews_change = source.positive_reviews_change,
+    negative_reviews_change = source.negative_reviews_change,
+    owner_estimation_change = source.owner_estimation_change
+WHEN NOT MATCHED THEN
+  INSERT (app_id, scrape_date, previous_scrape_date, days_since_previous, current_followers, followers_change,
+          positive_reviews_change, negative_reviews_change, owner_estimation_change)
+  VALUES (source.app_id, source.scrape_date, source.previous_scrape_date, source.days_since_previous,
+          source.current_followers, source.followers_change, source.positive_reviews_change,
+          source.negative_reviews_change, source.owner_estimation_change)
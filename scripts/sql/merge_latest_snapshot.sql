@@ -0,0 +1,24 @@
+-- 最新スナップショットテーブルの差分更新
+-- 一時テーブル（今回のバッチ）のAppIDのみを対象に、既存より新しい取得結果で置き換える
+
+MERGE `{project_id}.{dataset_id}.{latest_table_id}` AS target
+USING (
+  SELECT *
+  FROM `{temp_table_id}`
+  WHERE TRUE
+  QUALIFY ROW_NUMBER() OVER (PARTITION BY app_id ORDER BY scrape_date DESC, scraped_at DESC) = 1
+) AS source
+ON target.app_id = source.app_id
+WHEN MATCHED AND (source.scrape_date > target.scrape_date
+                  OR (source.scrape_date = target.scrape_date AND source.scraped_at >= target.scraped_at)) THEN
+  UPDATE SET
+    title_name = source.title_name,
+    current_followers = source.current_followers,
+    positive_reviews = source.positive_reviews,
+    negative_reviews = source.negative_reviews,
+    owner_estimation = source.owner_estimation,
+    scraped_at = source.scraped_at,
+    scrape_date = source.scrape_date
+WHEN NOT MATCHED THEN
+  INSERT (app_id, title_name, current_followers, positive_reviews, negative_reviews, owner_estimation, scraped_at, scrape_date)
+  VALUES (source.app_id, source.title_name, source.current_followers, source.positive_reviews, source.negative_reviews, source.owner_estimation, source.scraped_at, source.scrape_date)
@@ -0,0 +1,8 @@
+-- 直近の取得履歴（再取得間隔の判定用）
+-- 変動率の計算に使う指標のみを日付順で取得
+
+SELECT app_id, scrape_date, current_followers, positive_reviews, negative_reviews, owner_estimation
+FROM `{project_id}.{dataset_id}.{table_id}`
+WHERE scrape_date >= DATE_SUB(DATE('{scrape_date}'), INTERVAL {history_days} DAY)
+  AND scrape_date < DATE('{scrape_date}')
+ORDER BY app_id, scrape_date
@@ -0,0 +1,6 @@
+-- 指定日に保存済みのAppID一覧
+-- チェックポイントが失われた場合の補完に使用
+
+SELECT DISTINCT app_id
+FROM `{project_id}.{dataset_id}.{table_id}`
+WHERE scrape_date = '{scrape_date}'
@@ -0,0 +1,247 @@
+# scripts/work_distribution.py
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_LEASE_BATCH_SIZE = 20
+DEFAULT_POLL_INTERVAL = 15.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+STATUS_PENDING = "pending"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def jump_consistent_hash(key, num_buckets):
+    """Jump Consistent Hash (Lamping & Veach)。バケット数が増えても移動するキーは 1/N に留まる"""
+    if num_buckets < 1:
+        raise ValueError("num_buckets must be >= 1")
+    bucket, j = -1, 0
+    while j < num_buckets:
+        bucket = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def parse_shard(spec):
+    """'i/N' 形式のシャード指定を (i, N) に変換"""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"シャード指定は i/N 形式で指定してください: {spec!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"シャード番号が範囲外です: {spec!r}")
+    return index, count
+
+
+def shard_appids(appid_list, index, count):
+    """jump consistent hash で自シャードに割り当てられたAppIDのみを返す"""
+    return [appid for appid in appid_list if jump_consistent_hash(appid, count) == index]
+
+
+class SQLiteLeaseStore:
+    """リース方式のワークキューのローカル実装（SQLite）
+
+    複数のレプリカが同じDBファイル（共有ボリューム）を参照して、その日のAppIDを
+    重複なく分担する。リースの期限が切れた項目（クラッシュしたワーカーの担当分）は
+    他のワーカーが取得し直す。取得に失敗した項目は retry で未着手に戻し、
+    リース回数が max_attempts に達したものは failed としてその日は諦める。
+    別の実装（Redis等）に差し替える場合は
+    enqueue / acquire / renew / complete / retry / release / counts を同じ意味で実装する。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        # トランザクションは BEGIN IMMEDIATE で明示的に制御する
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS work_items (
+                scrape_date TEXT NOT NULL,
+                app_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (scrape_date, app_id)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS work_items_status ON work_items (scrape_date, status, lease_expires)")
+
+    def _transaction(self, statements):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = statements()
+            self._conn.execute("COMMIT")
+            return result
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def enqueue(self, scrape_date, appids):
+        """未登録のAppIDのみを追加する（全レプリカが同じ一覧を投入しても重複しない）"""
+        def statements():
+            return self._conn.executemany(
+                "INSERT OR IGNORE INTO work_items (scrape_date, app_id, status) VALUES (?, ?, ?)",
+                [(scrape_date, appid, STATUS_PENDING) for appid in appids]).rowcount
+        return self._transaction(statements)
+
+    def acquire(self, scrape_date, owner, limit, lease_seconds, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """未着手または期限切れの項目を最大 limit 件リースして、そのAppIDを返す
+
+        リトライ中の項目は未着手の項目の後に回す。max_attempts 回リースしても
+        完了しないまま期限切れになった項目（ワーカーを落とし続けるAppID等）は failed にする。
+        """
+        def statements():
+            now = time.time()
+            self._conn.execute("""
+                UPDATE work_items SET status = ?, owner = NULL, lease_expires = NULL
+                WHERE scrape_date = ? AND status = ? AND lease_expires < ? AND attempts >= ?
+            """, (STATUS_FAILED, scrape_date, STATUS_LEASED, now, max_attempts))
+            rows = self._conn.execute("""
+                SELECT app_id FROM work_items
+                WHERE scrape_date = ?
+                  AND (status = ? OR (status = ? AND lease_expires < ?))
+                ORDER BY attempts, app_id LIMIT ?
+            """, (scrape_date, STATUS_PENDING, STATUS_LEASED, now, limit)).fetchall()
+            appids = [app_id for (app_id,) in rows]
+            self._conn.executemany("""
+                UPDATE work_items SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE scrape_date = ? AND app_id = ?
+            """, [(STATUS_LEASED, owner, now + lease_seconds, scrape_date, appid) for appid in appids])
+            return appids
+        return self._transaction(statements)
+
+    def renew(self, scrape_date, owner, lease_seconds):
+        def statements():
+            return self._conn.execute("""
+                UPDATE work_items SET lease_expires = ?
+                WHERE scrape_date = ? AND owner = ? AND status = ?
+            """, (time.time() + lease_seconds, scrape_date, owner, STATUS_LEASED)).rowcount
+        return self._transaction(statements)
+
+    def complete(self, scrape_date, owner, appids):
+        def statements():
+            self._conn.executemany("""
+                UPDATE work_items SET status = ?, lease_expires = NULL
+                WHERE scrape_date = ? AND app_id = ? AND owner = ?
+            """, [(STATUS_DONE, scrape_date, appid, owner) for appid in appids])
+        self._transaction(statements)
+
+    def retry(self, scrape_date, owner, appids, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """取得に失敗した項目を未着手に戻す。リース回数が max_attempts に達した項目は failed にして、その件数を返す"""
+        def statements():
+            given_up = self._conn.executemany("""
+                UPDATE work_items SET status = ?, owner = NULL, lease_expires = NULL
+                WHERE scrape_date = ? AND app_id = ? AND owner = ? AND status = ? AND attempts >= ?
+            """, [(STATUS_FAILED, scrape_date, appid, owner, STATUS_LEASED, max_attempts)
+                  for appid in appids]).rowcount
+            self._conn.executemany("""
+                UPDATE work_items SET status = ?, owner = NULL, lease_expires = NULL
+                WHERE scrape_date = ? AND app_id = ? AND owner = ? AND status = ?
+            """, [(STATUS_PENDING, scrape_date, appid, owner, STATUS_LEASED) for appid in appids])
+            return given_up
+        return self._transaction(statements)
+
+    def release(self, scrape_date, owner):
+        """自分がリース中の項目を未着手に戻す（正常終了・中断時）"""
+        def statements():
+            return self._conn.execute("""
+                UPDATE work_items SET status = ?, owner = NULL, lease_expires = NULL
+                WHERE scrape_date = ? AND owner = ? AND status = ?
+            """, (STATUS_PENDING, scrape_date, owner, STATUS_LEASED)).rowcount
+        return self._transaction(statements)
+
+    def counts(self, scrape_date):
+        rows = self._conn.execute(
+            "SELECT status, COUNT(*) FROM work_items WHERE scrape_date = ? GROUP BY status", (scrape_date,))
+        return dict(rows.fetchall())
+
+    def close(self):
+        self._conn.close()
+
+
+class LeasedWorkQueue:
+    """リースストアからAppIDをバッチ単位で取得し、処理中はリースを延長し続ける
+
+    ``async with queue:`` の間はバックグラウンドでリースを延長する。
+    next_batch() は、他のワーカーが処理中の項目しか残っていない場合はリースの期限切れ
+    （ワーカーのクラッシュ）に備えて待機し、全て完了したら空のリストを返す。
+    """
+
+    def __init__(self, store, scrape_date, owner=None, batch_size=DEFAULT_LEASE_BATCH_SIZE,
+                 lease_seconds=DEFAULT_LEASE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.store = store
+        self.scrape_date = scrape_date
+        self.owner = owner or default_worker_id()
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.completed = 0
+        self.failed = 0
+        self._heartbeat = None
+
+    async def __aenter__(self):
+        self._heartbeat = asyncio.create_task(self._renew_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._heartbeat.cancel()
+        await asyncio.gather(self._heartbeat, return_exceptions=True)
+        self._heartbeat = None
+        released = self.store.release(self.scrape_date, self.owner)
+        if released:
+            logging.info(f"ワーカー {self.owner}: 未完了の {released} 件のリースを解放しました")
+
+    async def _renew_periodically(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                self.store.renew(self.scrape_date, self.owner, self.lease_seconds)
+            except Exception as e:
+                logging.warning(f"リースの延長に失敗しました: {e}")
+
+    def enqueue(self, appids):
+        added = self.store.enqueue(self.scrape_date, appids)
+        logging.info(f"ワークキュー: {self.scrape_date} に {added} 件のAppIDを追加しました (現在: {self.store.counts(self.scrape_date)})")
+
+    async def next_batch(self):
+        while True:
+            appids = self.store.acquire(self.scrape_date, self.owner, self.batch_size, self.lease_seconds,
+                                        self.max_attempts)
+            if appids:
+                logging.info(f"ワーカー {self.owner}: {len(appids)} 件のAppIDをリースしました")
+                return appids
+            counts = self.store.counts(self.scrape_date)
+            if not counts.get(STATUS_LEASED):
+                logging.info(f"ワークキュー: {self.scrape_date} の全AppIDが処理済みです ({counts})")
+                return []
+            logging.info(f"他のワーカーが処理中の {counts[STATUS_LEASED]} 件の完了またはリース切れを待ちます")
+            await asyncio.sleep(self.poll_interval)
+
+    def complete(self, appids, failed=()):
+        """appids を完了にし、failed（結果が得られなかったAppID）は再試行のため未着手に戻す"""
+        self.store.complete(self.scrape_date, self.owner, appids)
+        self.completed += len(appids)
+        if failed:
+            given_up = self.store.retry(self.scrape_date, self.owner, failed, self.max_attempts)
+            self.failed += given_up
+            logging.info(f"ワーカー {self.owner}: 失敗した {len(failed)} 件を再試行に戻しました"
+                         f" (うち {given_up} 件は {self.max_attempts} 回失敗したため本日は諦めます)")
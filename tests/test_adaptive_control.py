@@ -0,0 +1,62 @@
+# tests/test_adaptive_control.py
+from adaptive_control import (OUTCOME_CHALLENGE, OUTCOME_OK, OUTCOME_THROTTLED,
+                              AdaptiveRateController)
+from scheduler import ScrapeScheduler
+
+
+async def worker(appid, progress_text):
+    pass
+
+
+def attached(**kwargs):
+    scheduler = ScrapeScheduler(worker, max_concurrency=4, requests_per_second=1.0)
+    controller = AdaptiveRateController(**kwargs)
+    controller.attach(scheduler)
+    return controller, scheduler
+
+
+def test_increase_is_bounded_by_configured_limits():
+    controller, scheduler = attached(increase_step=0.1, increase_after=2)
+    for _ in range(100):
+        controller.record("ua", OUTCOME_OK, latency=1.0, tier="browser")
+    assert controller.rate == 2.0 and controller.concurrency == 4
+    assert scheduler.global_bucket.rate == 2.0 and scheduler.concurrency_limit == 4
+
+
+def test_decrease_is_bounded_by_minimums():
+    controller, scheduler = attached(min_rate=0.1, decrease_cooldown=0)
+    for _ in range(20):
+        controller.record("ua", OUTCOME_THROTTLED, tier="browser")
+    assert controller.rate == 0.1 and controller.concurrency == 1
+    assert scheduler.global_bucket.rate == 0.1 and scheduler.concurrency_limit == 1
+
+
+def test_decreases_within_cooldown_count_once():
+    controller, _ = attached(decrease_cooldown=60)
+    controller.record("ua", OUTCOME_THROTTLED, tier="browser")
+    controller.record("ua", OUTCOME_THROTTLED, tier="browser")
+    assert controller.rate == 0.5 and controller.concurrency == 2
+
+
+def test_slow_success_decreases():
+    controller, _ = attached(latency_target=5.0)
+    controller.record("ua", OUTCOME_OK, latency=6.0, tier="browser")
+    assert controller.rate == 0.5
+
+
+def test_escalation_tier_challenges_are_ignored():
+    controller, _ = attached(decrease_cooldown=0)
+    for _ in range(5):
+        controller.record("ua", OUTCOME_CHALLENGE, tier="http")
+    assert controller.rate == 1.0 and controller.concurrency == 4
+    assert not controller.is_quarantined("ua", tier="http")
+
+
+def test_repeated_challenges_quarantine_identity_per_tier():
+    controller, _ = attached(max_consecutive_challenges=3)
+    for _ in range(3):
+        controller.record("a", OUTCOME_CHALLENGE, tier="browser")
+    assert controller.is_quarantined("a", tier="browser")
+    assert not controller.is_quarantined("a", tier="http")
+    assert all(controller.choose_identity(["a", "b"], tier="browser") == "b" for _ in range(20))
+    assert controller.choose_identity(["a"], tier="browser") == "a"
@@ -0,0 +1,127 @@
+# tests/test_applist_cache.py
+import asyncio
+import json
+import time
+
+import aiohttp
+import pytest
+
+from applist_cache import AppIdList, AppListCache, iter_applist_entries, load_valid_appids
+
+APPS = [
+    {"appid": 10, "name": "Counter-Strike"},
+    {"appid": 20, "name": "名前に ] と , と \"apps\" を含む"},
+    {"appid": 30, "name": "  "},
+    {"appid": "40", "name": "文字列のAppID"},
+    {"appid": 50, "name": "Ünïcödé ✓"},
+]
+DOCUMENT = json.dumps({"applist": {"apps": APPS}}, ensure_ascii=False, indent=1)
+
+
+def write(tmp_path, text):
+    path = tmp_path / "applist.json"
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64 * 1024])
+def test_entries_match_json_load_for_any_chunk_size(tmp_path, chunk_size):
+    path = write(tmp_path, DOCUMENT)
+    assert list(iter_applist_entries(path, chunk_size=chunk_size)) == APPS
+
+
+@pytest.mark.parametrize("text", ["", "   \n", '{"applist": {"apps": []}}', '{"applist": {}}'])
+def test_empty_input_yields_nothing(tmp_path, text):
+    assert list(iter_applist_entries(write(tmp_path, text), chunk_size=1)) == []
+
+
+def test_truncated_input_raises(tmp_path):
+    path = write(tmp_path, DOCUMENT[:-30])
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_applist_entries(path, chunk_size=1))
+
+
+def test_load_valid_appids_filters_and_stops_at_max_apps(tmp_path):
+    path = write(tmp_path, DOCUMENT)
+    assert load_valid_appids(path).tolist() == [10, 20, 50]
+    assert load_valid_appids(path, max_apps=2).tolist() == [10, 20]
+
+
+def test_appid_list_membership_and_slicing():
+    appids = AppIdList([30, 10, 20])
+    assert 20 in appids and 25 not in appids
+    appids.append(25)
+    assert 25 in appids
+    assert appids[1:].tolist() == [10, 20, 25]
+    assert list(appids) == [30, 10, 20, 25]
+
+
+class Content:
+    def __init__(self, body):
+        self.body = body
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self.body), 3):
+            yield self.body[start:start + 3]
+
+
+class Response:
+    def __init__(self, status, body=b"", headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.content = Content(body)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(None, (), status=self.status)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class Session:
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def get(self, url, headers):
+        self.requests.append(headers)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+def refresh(cache, session):
+    return asyncio.run(cache.refresh(session))
+
+
+def test_refresh_downloads_and_skips_network_within_ttl(tmp_path):
+    cache = AppListCache(tmp_path / "applist")
+    session = Session(Response(200, DOCUMENT.encode('utf-8'), {"ETag": '"v1"'}))
+    path = refresh(cache, session)
+    assert list(iter_applist_entries(path)) == APPS
+    assert refresh(cache, session) == path
+    assert len(session.requests) == 1
+    assert not list(cache.cache_dir.glob(".applist-*"))
+
+
+def test_expired_cache_is_revalidated(tmp_path):
+    cache = AppListCache(tmp_path / "applist", ttl_seconds=0)
+    refresh(cache, Session(Response(200, DOCUMENT.encode('utf-8'),
+                                    {"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2026 00:00:00 GMT"})))
+    session = Session(Response(304))
+    before = time.time()
+    assert list(iter_applist_entries(refresh(cache, session))) == APPS
+    assert session.requests == [{"If-None-Match": '"v1"', "If-Modified-Since": "Wed, 01 Jan 2026 00:00:00 GMT"}]
+    assert cache._load_meta()["fetched_at"] >= before
+
+
+def test_stale_cache_is_used_when_fetch_fails(tmp_path):
+    cache = AppListCache(tmp_path / "applist", ttl_seconds=0)
+    refresh(cache, Session(Response(200, DOCUMENT.encode('utf-8'))))
+    assert refresh(cache, Session(aiohttp.ClientError("down"))) == cache.data_path
+    with pytest.raises(aiohttp.ClientError):
+        refresh(AppListCache(tmp_path / "empty"), Session(Response(503)))
@@ -0,0 +1,65 @@
+# tests/test_brightdata_client.py
+import asyncio
+
+from brightdata_client import BrightDataClient
+
+
+class Response:
+    def __init__(self, status, body="", headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def text(self):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class Session:
+    """URLごとに用意した応答を順に返すダミーのセッション"""
+
+    def __init__(self, responses):
+        self.responses = responses
+
+    def post(self, api_url, json):
+        return Response(*self.responses[json["url"]].pop(0))
+
+
+def make_client(responses, **kwargs):
+    client = BrightDataClient("token", cost_per_request=0.5, **kwargs)
+    session = Session(responses)
+    client._get_session = lambda: session
+    return client
+
+
+def test_cost_is_counted_for_every_completed_request():
+    client = make_client({"a": [(503, "", {"Retry-After": "0"}), (404, "missing")]})
+    assert asyncio.run(client.fetch("a")) is None
+    assert client.total_cost == 1.0
+    assert client.stats()["failures"] == 1 and client.retries == 1
+
+
+def test_backoff_does_not_hold_concurrency_slot():
+    client = make_client({
+        "slow": [(503, "", {"Retry-After": "0.2"}), (200, "slow")],
+        "fast": [(200, "fast")],
+    }, max_concurrency=1)
+    finished = []
+
+    async def fetch(url):
+        finished.append(await client.fetch(url))
+
+    async def run():
+        first = asyncio.create_task(fetch("slow"))
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(fetch("fast"), timeout=0.1)
+        await first
+
+    asyncio.run(run())
+    assert finished == ["fast", "slow"]
+    assert client.total_cost == 1.5 and client.successes == 2
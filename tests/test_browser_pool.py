@@ -0,0 +1,116 @@
+# tests/test_browser_pool.py
+import asyncio
+
+import browser_pool
+from browser_pool import BrowserPool
+
+
+class Page:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+class Context:
+    async def new_page(self):
+        return Page()
+
+    async def add_init_script(self, script):
+        pass
+
+    async def close(self):
+        pass
+
+
+class Browser:
+    def __init__(self):
+        self.connected = True
+
+    def on(self, event, callback):
+        pass
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        return Context()
+
+    async def close(self):
+        self.connected = False
+
+
+class Chromium:
+    async def launch(self, **options):
+        return Browser()
+
+
+class Playwright:
+    chromium = Chromium()
+
+    async def stop(self):
+        pass
+
+
+def started_pool(monkeypatch, **kwargs):
+    monkeypatch.setattr(browser_pool, "stealth_init_script", lambda: "")
+    pool = BrowserPool(**kwargs)
+
+    async def start():
+        # 実ブラウザの代わりにダミーのドライバで start() と同じ状態を作る
+        pool._playwright = Playwright()
+        for index in range(pool.size):
+            pooled_browser = browser_pool._PooledBrowser(index)
+            pool._browsers.append(pooled_browser)
+            await pool._launch(pooled_browser)
+            slot = browser_pool._ContextSlot(pooled_browser)
+            pool._slots.append(slot)
+            pool._idle.put_nowait(slot)
+        pool.started = True
+
+    return pool, start
+
+
+def test_slot_is_returned_after_use(monkeypatch):
+    pool, start = started_pool(monkeypatch, size=1)
+
+    async def run():
+        await start()
+        async with pool.page():
+            assert pool._idle.qsize() == 0
+        assert pool._idle.qsize() == 1
+
+    asyncio.run(run())
+
+
+def test_slot_borrowed_before_teardown_is_not_requeued(monkeypatch):
+    pool, start = started_pool(monkeypatch, size=1)
+
+    async def run():
+        await start()
+        async with pool.page():
+            await pool._teardown()
+            await start()
+        # 停止前に借りたスロットは捨てられ、新しいキューには起動し直した分だけが残る
+        assert pool._idle.qsize() == 1
+        assert pool._idle.get_nowait() is pool._slots[0]
+
+    asyncio.run(run())
+
+
+def test_crashed_browser_is_restarted_on_checkout(monkeypatch):
+    pool, start = started_pool(monkeypatch, size=1)
+
+    async def run():
+        await start()
+        pooled_browser = pool._browsers[0]
+        pooled_browser.crashed = True
+        async with pool.page():
+            assert pooled_browser.generation == 2
+            assert pooled_browser.is_healthy()
+
+    asyncio.run(run())
@@ -0,0 +1,64 @@
+# tests/test_checkpoint.py
+import json
+
+import pytest
+
+from checkpoint import RunCheckpoint
+from records import AppRecord, RecordBatch
+
+DATE = "2026-01-10"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "checkpoint.sqlite3"
+
+
+def record(app_id, followers=100):
+    return AppRecord(app_id, scraped_at=1_767_999_600_000_000, title_name=f"Game {app_id}", current_followers=followers)
+
+
+def test_resume_skips_completed_appids_after_reopen(db_path):
+    checkpoint = RunCheckpoint(db_path, scrape_date=DATE)
+    checkpoint.record_completed(record(10))
+    checkpoint.mark_completed_externally([30])
+    checkpoint.close()
+
+    resumed = RunCheckpoint(db_path, scrape_date=DATE)
+    assert resumed.completed_appids() == {10, 30}
+    assert resumed.filter_pending([10, 20, 30, 40]) == [20, 40]
+    # 別の日の実行には影響しない
+    assert RunCheckpoint(db_path, scrape_date="2026-01-11").filter_pending([10, 20]) == [10, 20]
+
+
+def test_unflushed_records_are_replayed_until_flushed(db_path):
+    checkpoint = RunCheckpoint(db_path, scrape_date=DATE)
+    checkpoint.record_completed(record(10))
+    checkpoint.record_completed(record(20))
+    checkpoint.mark_completed_externally([30])
+    assert checkpoint.unflushed_records() == [record(10), record(20)]
+
+    checkpoint.mark_flushed(RecordBatch([record(10)]))
+    assert checkpoint.unflushed_records() == [record(20)]
+    # 再取得した結果は未保存に戻る
+    checkpoint.record_completed(record(10, followers=150))
+    assert sorted(checkpoint.unflushed_records(), key=lambda r: r.app_id) == [record(10, followers=150), record(20)]
+
+
+def test_legacy_dict_records_are_loaded(db_path):
+    checkpoint = RunCheckpoint(db_path, scrape_date=DATE)
+    legacy = record(10).to_dict()
+    checkpoint._conn.execute(
+        "INSERT INTO completed_apps (scrape_date, app_id, record, flushed, completed_at) VALUES (?, ?, ?, 0, 0)",
+        (DATE, 10, json.dumps(legacy, ensure_ascii=False)))
+    assert checkpoint.unflushed_records() == [record(10)]
+
+
+def test_prune_keeps_recent_days(db_path):
+    for scrape_date in ("2026-01-01", "2026-01-03", DATE):
+        checkpoint = RunCheckpoint(db_path, scrape_date=scrape_date)
+        checkpoint.record_completed(record(10))
+    checkpoint.prune(keep_days=7)
+    assert RunCheckpoint(db_path, scrape_date="2026-01-01").completed_appids() == set()
+    assert RunCheckpoint(db_path, scrape_date="2026-01-03").completed_appids() == {10}
+    assert checkpoint.completed_appids() == {10}
@@ -0,0 +1,65 @@
+# tests/test_dom_extraction.py
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from dom_extraction import extract_fields_in_page
+from html_parsers import build_record, parse_html_content
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "scripts" / "bench" / "fixtures"
+CASES = {
+    # .string が一致する見出しが無く、テキスト一致の最初の見出しの兄弟に ul が無い
+    "store_data_candidates": (
+        "<div><h3><b>Store</b> data</h3><p>none</p></div>"
+        "<h3><i>Store</i> Data</h3><ul><li>42</li></ul>"
+    ),
+    # .string が一致する見出しの兄弟に ul が無ければ、後続の候補は見ない
+    "direct_string_without_list": (
+        "<div><h3>Store data</h3><p>none</p></div>"
+        "<h3><i>Store</i> Data</h3><ul><li>42</li></ul>"
+    ),
+}
+CASES.update((path.name, path.read_text(encoding='utf-8')) for path in sorted(FIXTURES_DIR.glob("*_charts.html")))
+
+
+def comparable(record):
+    return {key: value for key, value in record.to_dict().items() if key != "取得日時"}
+
+
+@pytest.fixture(scope="module")
+def extracted():
+    """Chromium で各ケースを読み込み、ページ内抽出の結果を返す（起動できない環境ではスキップ）"""
+    pytest.importorskip("playwright")
+    from playwright.async_api import async_playwright
+
+    async def run():
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch()
+            try:
+                page = await browser.new_page()
+                results = {}
+                for name, html_content in CASES.items():
+                    await page.set_content(html_content)
+                    results[name] = await extract_fields_in_page(page)
+                return results
+            finally:
+                await browser.close()
+
+    try:
+        return asyncio.run(run())
+    except Exception as e:
+        pytest.skip(f"Chromium を起動できません: {e}")
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_in_page_extraction_matches_bs4(extracted, case):
+    page = extracted[case]
+    assert not page.challenge
+    expected = parse_html_content(CASES[case], 1, backend="bs4")
+    assert comparable(build_record(1, page.fields)) == comparable(expected)
+
+
+def test_store_data_candidates_are_looped(extracted):
+    assert build_record(1, extracted["store_data_candidates"].fields).current_followers == 42
+    assert build_record(1, extracted["direct_string_without_list"].fields).current_followers is None
@@ -0,0 +1,70 @@
+# tests/test_html_parsers.py
+import json
+from pathlib import Path
+
+import pytest
+
+from html_parsers import PARSER_BACKENDS, extract_data_from_brightdata_html, parse_html_content
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "scripts" / "bench" / "fixtures"
+FIXTURES = sorted(FIXTURES_DIR.glob("*_charts.html"))
+# シリーズ開始前の scraper_core.parse_html_content（bs4）の出力（取得日時を除く）
+BASELINE = json.loads((Path(__file__).resolve().parent / "fixtures" / "baseline_parse_html_content.json")
+                      .read_text(encoding='utf-8'))
+# HTML5 の木構築規則で閉じタグを補うバックエンドが html.parser と異なる結果になるケース
+HTML5_DIVERGENCES = {"unclosed_owners_td", "ul_inside_p", "unclosed_li"}
+OPTIONAL_BACKENDS = {"lxml": "lxml", "selectolax": "selectolax"}
+
+# bench_parsers.py の MALFORMED_CASES のうち、全バックエンドで bs4 と一致するもの
+EMPTY_DOCUMENTS = ["", "  \n\t ", "<!-- empty -->", "hello"]
+
+
+def comparable(record):
+    return {key: value for key, value in record.to_dict().items() if key != "取得日時"}
+
+
+@pytest.fixture(params=sorted(PARSER_BACKENDS))
+def backend(request):
+    if request.param in OPTIONAL_BACKENDS:
+        pytest.importorskip(OPTIONAL_BACKENDS[request.param])
+    return request.param
+
+
+@pytest.mark.parametrize("fixture", FIXTURES, ids=lambda path: path.name)
+def test_backend_matches_bs4_on_fixtures(backend, fixture):
+    html_content = fixture.read_text(encoding='utf-8')
+    expected = parse_html_content(html_content, 730, backend="bs4")
+    assert expected.current_followers is not None
+    assert comparable(parse_html_content(html_content, 730, backend=backend)) == comparable(expected)
+
+
+@pytest.mark.parametrize("html_content", EMPTY_DOCUMENTS)
+def test_backend_matches_bs4_on_empty_documents(backend, html_content):
+    record = parse_html_content(html_content, 1, backend=backend)
+    assert comparable(record) == comparable(parse_html_content(html_content, 1, backend="bs4"))
+    assert record.title_name == "N/A" and record.current_followers is None
+
+
+@pytest.mark.parametrize("fixture", FIXTURES, ids=lambda path: path.name)
+def test_backend_matches_baseline_on_fixtures(backend, fixture):
+    record = parse_html_content(fixture.read_text(encoding='utf-8'), 730, backend=backend)
+    assert comparable(record) == BASELINE["pages"][fixture.name]
+
+
+@pytest.mark.parametrize("case", sorted(BASELINE["cases"]))
+def test_backend_matches_baseline_on_edge_cases(backend, case):
+    if backend in ("lxml", "selectolax") and case in HTML5_DIVERGENCES:
+        pytest.skip("HTML5 の木構築規則による既知の差異")
+    html_content, expected = BASELINE["cases"][case]["html"], BASELINE["cases"][case]["expected"]
+    assert comparable(parse_html_content(html_content, 1, backend=backend)) == expected
+
+
+def test_missing_html_is_reported_as_error():
+    record = extract_data_from_brightdata_html("", 1)
+    assert not record.ok
+    assert record.error == "HTMLコンテンツなし"
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        parse_html_content("<html></html>", 1, backend="nope")
@@ -0,0 +1,89 @@
+# tests/test_memory_watchdog.py
+import os
+import subprocess
+import sys
+
+import pytest
+
+from memory_watchdog import PRESSURE_HARD, PRESSURE_NORMAL, PRESSURE_SOFT, MemoryWatchdog, sample_process_tree
+from scheduler import ScrapeScheduler
+
+
+class Pool:
+    started = True
+
+    def __init__(self):
+        self.calls = []
+
+    def request_restart(self):
+        self.calls.append("restart")
+
+    def retire_all_contexts(self):
+        self.calls.append("retire")
+
+
+async def worker(appid, progress_text):
+    pass
+
+
+def sample(rss_mb):
+    return {"processes": 1, "browser_processes": 0, "rss_kb": rss_mb * 1024, "python_rss_kb": rss_mb * 1024,
+            "browser_rss_kb": 0}
+
+
+@pytest.fixture
+def watchdog():
+    watchdog = MemoryWatchdog(soft_limit_mb=100, hard_limit_mb=200, browser_pool=Pool(), recycle_cooldown=60)
+    watchdog.attach(ScrapeScheduler(worker, max_concurrency=8))
+    return watchdog
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="/proc が必要")
+def test_sample_includes_child_processes():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(10)"])
+    try:
+        tree = sample_process_tree()
+    finally:
+        child.kill()
+        child.wait()
+    assert tree["processes"] >= 2
+    assert tree["rss_kb"] > tree["python_rss_kb"] > 0
+    assert tree["browser_processes"] == 0
+
+
+def test_soft_and_hard_limits_recycle_and_limit_concurrency(watchdog):
+    scheduler = watchdog._scheduler
+    watchdog.check(sample(120))
+    assert watchdog.pressure == PRESSURE_SOFT
+    assert scheduler.effective_concurrency() == 4
+    watchdog.check(sample(250))
+    assert watchdog.pressure == PRESSURE_HARD
+    assert scheduler.effective_concurrency() == 1
+    assert watchdog.browser_pool.calls == ["retire", "restart"]
+
+
+def test_pressure_is_released_below_recovery_ratio(watchdog):
+    scheduler = watchdog._scheduler
+    watchdog.check(sample(250))
+    # soft 未満でも recovery_ratio（9割）を下回るまでは soft のまま
+    watchdog.check(sample(95))
+    assert watchdog.pressure == PRESSURE_SOFT
+    assert scheduler.effective_concurrency() == 4
+    watchdog.check(sample(80))
+    assert watchdog.pressure == PRESSURE_NORMAL
+    assert scheduler.effective_concurrency() == 8
+
+
+def test_recycle_respects_cooldown(watchdog):
+    for _ in range(3):
+        watchdog.check(sample(120))
+    watchdog.check(sample(250))
+    watchdog.check(sample(250))
+    assert watchdog.browser_pool.calls == ["retire", "restart"]
+
+
+def test_stopped_pool_is_not_recycled(watchdog):
+    watchdog.browser_pool.started = False
+    watchdog.check(sample(250))
+    assert watchdog.pressure == PRESSURE_HARD
+    assert watchdog.browser_pool.calls == []
@@ -0,0 +1,62 @@
+# tests/test_metrics.py
+import asyncio
+import json
+
+import pytest
+
+from metrics import MetricsRegistry, current_appid
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("scraper_successes_total", tier="http")
+    registry.inc("scraper_successes_total", 2, tier="browser")
+    registry.set_gauge("scraper_concurrency_limit", 3)
+    registry.observe("scraper_stage_duration_seconds", 0.05, stage="parse")
+    registry.observe("scraper_stage_duration_seconds", 0.5, stage="parse")
+    registry.inc("custom_total", path='a"b\\c\nd')
+    assert registry.render() == "\n".join([
+        "# HELP custom_total custom_total",
+        "# TYPE custom_total counter",
+        'custom_total{path="a\\"b\\\\c\\nd"} 1',
+        "# HELP scraper_concurrency_limit 適応制御による同時実行数の上限",
+        "# TYPE scraper_concurrency_limit gauge",
+        "scraper_concurrency_limit 3",
+        "# HELP scraper_stage_duration_seconds 処理ステージごとの所要時間",
+        "# TYPE scraper_stage_duration_seconds histogram",
+        'scraper_stage_duration_seconds_bucket{stage="parse",le="0.1"} 1',
+        'scraper_stage_duration_seconds_bucket{stage="parse",le="1.0"} 2',
+        'scraper_stage_duration_seconds_bucket{stage="parse",le="+Inf"} 2',
+        'scraper_stage_duration_seconds_sum{stage="parse"} 0.55',
+        'scraper_stage_duration_seconds_count{stage="parse"} 2',
+        "# HELP scraper_successes_total ティアごとの取得成功数",
+        "# TYPE scraper_successes_total counter",
+        'scraper_successes_total{tier="browser"} 2',
+        'scraper_successes_total{tier="http"} 1',
+    ]) + "\n"
+
+
+def test_empty_registry_renders_newline():
+    assert MetricsRegistry().render() == "\n"
+
+
+def test_span_records_duration_errors_and_trace(tmp_path):
+    trace_path = tmp_path / "trace.jsonl"
+    registry = MetricsRegistry(buckets=(60.0,), trace_path=trace_path)
+    token = current_appid.set(730)
+    try:
+        with registry.span("navigation", tier="browser"):
+            pass
+        with pytest.raises(TimeoutError):
+            with registry.span("navigation", tier="browser"):
+                raise TimeoutError
+    finally:
+        current_appid.reset(token)
+        asyncio.run(registry.close())
+    text = registry.render()
+    assert 'scraper_stage_duration_seconds_count{stage="navigation",tier="browser"} 2' in text
+    assert 'scraper_errors_total{stage="navigation",type="TimeoutError"} 1' in text
+
+    events = [json.loads(line) for line in trace_path.read_text(encoding='utf-8').splitlines()]
+    assert [(event["appid"], event["stage"], event["tier"], event["error"]) for event in events] == [
+        (730, "navigation", "browser", None), (730, "navigation", "browser", "TimeoutError")]
@@ -0,0 +1,91 @@
+# tests/test_page_store.py
+import pytest
+
+pytest.importorskip("zstandard")
+
+from page_store import PageStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PageStore(tmp_path / "pages")
+    yield store
+    store.close()
+
+
+def object_files(store):
+    return sorted(path.name for path in store.objects_dir.rglob("*.html.zst"))
+
+
+def test_identical_pages_share_one_object(store):
+    first = store.put(730, "<html>same</html>", tier="http", fetched_at="2026-10-16T01:00:00+00:00")
+    second = store.put(440, "<html>same</html>", tier="browser", fetched_at="2026-10-16T02:00:00+00:00")
+    other = store.put(730, "<html>changed</html>", fetched_at="2026-10-17T01:00:00+00:00")
+
+    assert first == second != other
+    assert store.deduplicated == 1
+    assert len(object_files(store)) == 2
+    assert store.get(440, "2026-10-16") == "<html>same</html>"
+    assert [row[:3] for row in store.pages()] == [
+        (440, "2026-10-16", first), (730, "2026-10-16", first), (730, "2026-10-17", other)]
+    assert [row[0] for row in store.pages("2026-10-17")] == [730]
+
+
+def test_evict_by_age_and_size(store):
+    store.put(1, "<html>old</html>", fetched_at="2000-01-01T00:00:00+00:00")
+    for day in range(1, 4):
+        store.put(2, f"<html>{'x' * 5000}{day}</html>", fetched_at=f"2099-01-0{day}T00:00:00+00:00")
+
+    store.evict(max_bytes=10 ** 9, max_age_days=30)
+    assert [row[0] for row in store.pages()] == [2, 2, 2]
+    assert len(object_files(store)) == 3
+
+    # 合計サイズが上限以下になるまで古い日付から削除する
+    per_object = store.total_bytes() // 3
+    store.evict(max_bytes=per_object * 2, max_age_days=36500)
+    assert [row[1] for row in store.pages()] == ["2099-01-02", "2099-01-03"]
+    assert len(object_files(store)) == 2
+
+
+def test_replaced_page_leaves_orphan_that_evict_deletes(store):
+    old = store.put(730, "<html>v1</html>", fetched_at="2026-10-16T01:00:00+00:00")
+    new = store.put(730, "<html>v2</html>", fetched_at="2026-10-16T09:00:00+00:00")
+
+    store.evict(max_bytes=10 ** 9, max_age_days=36500)
+    assert not store.object_path(old).exists()
+    assert store.object_path(new).exists()
+    assert store.get(730, "2026-10-16") == "<html>v2</html>"
+
+
+def test_put_of_orphaned_content_keeps_the_object(store):
+    # 参照がなくなった本文（他のレプリカの evict の削除対象）と同じ内容を保存し直す
+    digest = store.put(730, "<html>page</html>", fetched_at="2026-10-16T01:00:00+00:00")
+    store.put(730, "<html>other</html>", fetched_at="2026-10-16T02:00:00+00:00")
+    assert store.put(440, "<html>page</html>", fetched_at="2026-10-16T03:00:00+00:00") == digest
+
+    store.evict(max_bytes=10 ** 9, max_age_days=36500)
+    assert store.object_path(digest).exists()
+    assert store.get(440, "2026-10-16") == "<html>page</html>"
+
+
+def test_put_after_orphan_deletion_rewrites_the_object(tmp_path):
+    writer, evictor = PageStore(tmp_path / "pages"), PageStore(tmp_path / "pages")
+    digest = writer.put(730, "<html>page</html>", fetched_at="2026-10-16T01:00:00+00:00")
+    writer.put(730, "<html>other</html>", fetched_at="2026-10-16T02:00:00+00:00")
+    evictor.evict(max_bytes=10 ** 9, max_age_days=36500)
+    assert not writer.object_path(digest).exists()
+
+    writer.put(440, "<html>page</html>", fetched_at="2026-10-16T03:00:00+00:00")
+    assert writer.deduplicated == 0
+    assert evictor.get(440, "2026-10-16") == "<html>page</html>"
+    writer.close()
+    evictor.close()
+
+
+def test_pages_without_written_object_are_not_listed(store):
+    digest = store.put(730, "<html>page</html>", fetched_at="2026-10-16T01:00:00+00:00")
+    # 参照を追加した後、本文を書き込む前に停止した状態
+    with store._transaction() as conn:
+        conn.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+
+    assert store.pages() == []
@@ -0,0 +1,52 @@
+# tests/test_records.py
+import pickle
+
+from records import AppRecord, RecordBatch, iso_to_us, us_to_date, us_to_iso
+
+SCRAPED_AT = iso_to_us("2026-01-10T23:59:59.500000+00:00")
+
+
+def record(app_id, **kwargs):
+    return AppRecord(app_id, scraped_at=SCRAPED_AT, title_name=f"Game {app_id}", current_followers=100, **kwargs)
+
+
+def test_time_conversions_round_trip():
+    assert us_to_iso(SCRAPED_AT) == "2026-01-10T23:59:59.500000+00:00"
+    assert us_to_date(SCRAPED_AT) == "2026-01-10"
+    assert us_to_date(SCRAPED_AT + 500_000) == "2026-01-11"
+    # タイムゾーンなし・Z 付きはUTCとみなす
+    assert iso_to_us("2026-01-10T23:59:59.5") == iso_to_us("2026-01-10T23:59:59.5Z") == SCRAPED_AT
+
+
+def test_legacy_dict_access_and_round_trip():
+    app = record(730, positive_reviews=10, negative_reviews=2, owner_estimation=5000)
+    assert app["AppID"] == 730 and app.get("現在のfollower数") == 100
+    assert app.get("取得日時") == "2026-01-10T23:59:59.500000+00:00"
+    assert app.get("エラー") is None and app.get("unknown", "default") == "default"
+    assert AppRecord.from_dict(app.to_dict()) == app
+
+
+def test_failed_record():
+    failed = AppRecord.failed(730, "timeout")
+    assert not failed.ok and record(730).ok
+    assert failed.to_dict() == {"AppID": 730, "エラー": "timeout"}
+    assert AppRecord.from_dict(failed.to_dict()).error == "timeout"
+
+
+def test_pickle_round_trip():
+    app = record(730, positive_reviews=10)
+    assert pickle.loads(pickle.dumps(app)) == app
+
+
+def test_batch_columns_rows_and_iteration():
+    first, second = record(10), record(20, owner_estimation=3000)
+    batch = RecordBatch([first])
+    assert not RecordBatch() and batch
+    batch.extend(RecordBatch([second]))
+    assert len(batch) == 2
+    assert list(batch.app_id) == [10, 20]
+    assert list(batch) == [first, second]
+    assert list(batch.rows()) == [
+        (10, "Game 10", 100, None, None, None, "2026-01-10T23:59:59.500000+00:00", "2026-01-10"),
+        (20, "Game 20", 100, None, None, 3000, "2026-01-10T23:59:59.500000+00:00", "2026-01-10"),
+    ]
@@ -0,0 +1,56 @@
+# tests/test_refresh_planner.py
+from datetime import date
+
+import pytest
+
+from records import AppRecord, RecordBatch, iso_to_us
+from refresh_planner import RefreshPlanner, SnapshotHistory, daily_volatility
+
+
+def snapshots(*followers, start_day=1, step=1):
+    return [(f"2026-01-{start_day + index * step:02d}", value, 10, 1, 1000) for index, value in enumerate(followers)]
+
+
+def test_daily_volatility_is_relative_change_per_day():
+    assert daily_volatility(snapshots(100, 110, step=2)) == pytest.approx(0.05)
+    assert daily_volatility(snapshots(100, 100, 100)) == 0.0
+    # 欠損値と同じ日付のスナップショットは無視する
+    assert daily_volatility([("2026-01-01", None, 10, 1, 1000), ("2026-01-02", 5, 10, 1, 1000)]) == 0.0
+    assert daily_volatility([("2026-01-01", 100, 10, 1, 1000), ("2026-01-01", 200, 10, 1, 1000)]) == 0.0
+
+
+@pytest.mark.parametrize("history, expected", [
+    (snapshots(100), 1),
+    (snapshots(100, 100, 100), 30),
+    (snapshots(3000, 3010), 3),
+    (snapshots(1000, 1001), 7),
+    (snapshots(100, 200), 1),
+])
+def test_interval_for_volatility(history, expected):
+    assert RefreshPlanner().interval_for(history) == expected
+
+
+def test_is_due_staggers_appids_with_same_interval():
+    planner = RefreshPlanner()
+    history = snapshots(100, 100, 100)
+    # 30日間隔は AppID に応じて最大6日短くなる
+    assert not planner.is_due(7, history, date(2026, 1, 31))
+    assert planner.is_due(7, history, date(2026, 2, 2))
+    assert planner.is_due(13, history, date(2026, 1, 27))
+    assert not planner.is_due(13, history, date(2026, 1, 26))
+
+
+def test_plan_keeps_input_order_and_always_includes_new_appids():
+    planner = RefreshPlanner()
+    history = {1: snapshots(100, 200), 2: snapshots(100, 100, 100), 3: snapshots(100)}
+    assert planner.plan([4, 3, 2, 1], history, today="2026-01-05") == [4, 3, 1]
+
+
+def test_snapshot_history_keeps_latest_snapshots(tmp_path):
+    history = SnapshotHistory(tmp_path / "history.sqlite3", keep_snapshots=2)
+    for day, followers in ((1, 100), (2, 110), (3, 120)):
+        scraped_at = iso_to_us(f"2026-01-0{day}T12:00:00")
+        history.add_records(RecordBatch([AppRecord(10, scraped_at=scraped_at, current_followers=followers,
+                                                   positive_reviews=5)]))
+    assert history.load() == {10: [("2026-01-02", 110, 5, None, None), ("2026-01-03", 120, 5, None, None)]}
+    history.close()
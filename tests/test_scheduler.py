@@ -0,0 +1,87 @@
+# tests/test_scheduler.py
+import asyncio
+import time
+
+import pytest
+
+from scheduler import ScrapeScheduler, TokenBucket
+
+
+def run_scheduler(appids, **kwargs):
+    """ジョブの開始順と最大同時実行数を記録しながらスケジューラを実行する"""
+    priorities = kwargs.pop("priorities", None)
+    configure = kwargs.pop("configure", None)
+    order = []
+    active = 0
+    peak = 0
+
+    async def worker(appid, progress_text):
+        nonlocal active, peak
+        order.append(appid)
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    kwargs.setdefault("requests_per_second", None)
+    kwargs.setdefault("jitter", None)
+    scheduler = ScrapeScheduler(worker, **kwargs)
+    if configure:
+        configure(scheduler)
+    asyncio.run(scheduler.run(appids, priorities))
+    return order, peak
+
+
+def test_token_bucket_allows_burst_then_paces():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=2)
+        started = time.monotonic()
+        await bucket.acquire()
+        await bucket.acquire()
+        burst = time.monotonic() - started
+        await bucket.acquire()
+        await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(run())
+    assert burst < 0.02
+    assert total >= 0.09
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_jobs_run_in_priority_order():
+    order, _ = run_scheduler([1, 2, 3, 4], max_concurrency=1, priorities={3: 5, 4: 1})
+    assert order == [3, 4, 1, 2]
+
+
+def test_priority_function_is_accepted():
+    order, _ = run_scheduler([1, 2, 3], max_concurrency=1, priorities=lambda appid: appid)
+    assert order == [3, 2, 1]
+
+
+def test_concurrency_is_capped():
+    order, peak = run_scheduler(list(range(12)), max_concurrency=3)
+    assert sorted(order) == list(range(12))
+    assert peak == 3
+
+
+def test_pressure_limit_lowers_concurrency():
+    _, peak = run_scheduler(list(range(8)), max_concurrency=4,
+                            configure=lambda scheduler: scheduler.set_pressure_limit(1))
+    assert peak == 1
+
+
+def test_domain_concurrency_is_capped():
+    _, peak = run_scheduler(list(range(8)), max_concurrency=4, domain_concurrency={"steamdb.info": 2})
+    assert peak == 2
+
+
+def test_jitter_does_not_hold_domain_slot():
+    started = time.monotonic()
+    run_scheduler([1, 2], max_concurrency=2, domain_concurrency={"steamdb.info": 1}, jitter=(0.2, 0.2))
+    # ジッターを並行して待つので、2件目はドメインの枠が空くのを 0.2 秒余分に待たない
+    assert time.monotonic() - started < 0.35
@@ -0,0 +1,110 @@
+# tests/test_session_store.py
+import pytest
+
+from fetch_pipeline import ExtractedPage
+from scraper_core import SteamDBScraper
+from session_store import SessionStore, clearance_expiry
+
+NOW = 1_800_000_000.0
+
+
+def storage_state(expires=None):
+    cookies = [{"name": "__cf_bm", "value": "x", "expires": NOW + 10_000}]
+    if expires is not None:
+        cookies.append({"name": "cf_clearance", "value": "y", "expires": expires})
+    return {"cookies": cookies, "origins": []}
+
+
+class Context:
+    """WeakKeyDictionary のキーにできるコンテキストの代わり"""
+
+
+@pytest.fixture
+def store():
+    store = SessionStore(":memory:", max_age=3600, ttl=600)
+    yield store
+    store.close()
+
+
+def test_save_and_get(store):
+    identity = ("UA/1.0", "ja-JP")
+    fingerprint = {"user_agent": "UA/1.0", "locale": "ja-JP", "viewport": {"width": 1920, "height": 1080}}
+    store.save(identity, fingerprint, storage_state(expires=NOW + 1800), now=NOW)
+
+    assert store.get(identity, now=NOW + 1) == (fingerprint, storage_state(expires=NOW + 1800))
+    assert store.get(("UA/2.0", "ja-JP"), now=NOW + 1) is None
+    assert store.stats == {"hits": 1, "misses": 1, "saved": 1, "invalidated": 0}
+
+
+def test_expiry_uses_clearance_ttl_and_max_age(store):
+    assert clearance_expiry(storage_state()) is None
+    assert clearance_expiry(storage_state(expires=NOW + 1800)) == NOW + 1800
+
+    # cf_clearance の期限
+    store.save(("a", "ja"), {}, storage_state(expires=NOW + 1800), now=NOW)
+    assert store.get(("a", "ja"), now=NOW + 1799) is not None
+    assert store.get(("a", "ja"), now=NOW + 1800) is None
+    # cf_clearance が無ければ保存から ttl 秒
+    store.save(("b", "ja"), {}, storage_state(), now=NOW)
+    assert store.get(("b", "ja"), now=NOW + 599) is not None
+    assert store.get(("b", "ja"), now=NOW + 600) is None
+    # 保存し直しても最初の保存から max_age 秒を超えない
+    store.save(("c", "ja"), {}, storage_state(expires=NOW + 10_000), now=NOW)
+    store.save(("c", "ja"), {}, storage_state(expires=NOW + 10_000), now=NOW + 3000)
+    assert store.get(("c", "ja"), now=NOW + 3599) is not None
+    assert store.get(("c", "ja"), now=NOW + 3600) is None
+
+    assert store.purge_expired(now=NOW + 3600) == 3
+
+
+def test_invalidate(store):
+    store.save(("a", "ja"), {}, storage_state(expires=NOW + 1800), now=NOW)
+    store.invalidate(("a", "ja"))
+    store.invalidate(("a", "ja"))
+
+    assert store.get(("a", "ja"), now=NOW) is None
+    assert store.identities(now=NOW) == []
+    assert store.stats["invalidated"] == 1
+
+
+def test_identities_lists_only_valid_sessions(store):
+    store.save(("a", "ja"), {}, storage_state(expires=NOW + 100), now=NOW)
+    store.save(("b", "en"), {}, storage_state(expires=NOW + 1000), now=NOW)
+
+    assert sorted(store.identities(now=NOW + 50)) == [("a", "ja"), ("b", "en")]
+    assert store.identities(now=NOW + 500) == [("b", "en")]
+
+
+def test_context_options_prefer_stored_session():
+    store = SessionStore(":memory:")
+    scraper = SteamDBScraper(brightdata_api_token="token", session_store=store, challenge_wait_ms=5000)
+    identity = scraper.identities[3]
+    fingerprint = {"user_agent": identity[0], "locale": identity[1], "timezone_id": "Asia/Tokyo"}
+    state = storage_state(expires=10 ** 12)
+    store.save(identity, fingerprint, state)
+
+    assert scraper.build_context_options() == {**fingerprint, "storage_state": state}
+
+    # 保存済みの identity が隔離されていれば、新しいフィンガープリントで作る
+    for _ in range(scraper.rate_controller.max_consecutive_challenges):
+        scraper.rate_controller.record(identity, "challenge", tier="browser")
+    options = scraper.build_context_options()
+    assert "storage_state" not in options
+    assert (options["user_agent"], options["locale"]) != identity
+    store.close()
+
+
+def test_challenge_wait_only_for_contexts_without_session():
+    store = SessionStore(":memory:")
+    scraper = SteamDBScraper(brightdata_api_token="token", session_store=store, challenge_wait_ms=5000)
+    fresh, restored = Context(), Context()
+    scraper._context_sessions[fresh] = {"restored": False, "saved_at": float("-inf")}
+    scraper._context_sessions[restored] = {"restored": True, "saved_at": 0.0}
+    challenge = ExtractedPage({}, challenge=True)
+
+    assert scraper._should_wait_for_challenge(fresh, challenge)
+    assert not scraper._should_wait_for_challenge(restored, challenge)
+    assert not scraper._should_wait_for_challenge(fresh, ExtractedPage({"followers": "1"}))
+    scraper.challenge_wait_ms = 0
+    assert not scraper._should_wait_for_challenge(fresh, challenge)
+    store.close()
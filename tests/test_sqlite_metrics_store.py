@@ -0,0 +1,92 @@
+# tests/test_sqlite_metrics_store.py
+import pytest
+
+from records import AppRecord, RecordBatch, iso_to_us
+from sinks import SQLiteMetricsStore
+
+
+def record(app_id, scraped_at, followers, positive=100, negative=10, owners=50_000):
+    return AppRecord(app_id, scraped_at=iso_to_us(scraped_at), title_name=f"Game {app_id}",
+                     current_followers=followers, positive_reviews=positive, negative_reviews=negative,
+                     owner_estimation=owners)
+
+
+def latest_rows(store):
+    return store._conn.execute("""
+        SELECT app_id, current_followers, scraped_at, scrape_date
+        FROM steam_app_metrics_latest_by_app ORDER BY app_id
+    """).fetchall()
+
+
+def delta_rows(store, app_id):
+    return store._conn.execute("""
+        SELECT scrape_date, previous_scrape_date, days_since_previous, current_followers, followers_change,
+               positive_reviews_change, negative_reviews_change, owner_estimation_change
+        FROM steam_app_metrics_daily_delta WHERE app_id = ? ORDER BY scrape_date
+    """, (app_id,)).fetchall()
+
+
+@pytest.fixture
+def store():
+    store = SQLiteMetricsStore(":memory:")
+    yield store
+    store.close()
+
+
+def test_incremental_latest_and_delta(store):
+    store.write_batch(RecordBatch([record(10, "2026-10-01T01:00:00", 100), record(20, "2026-10-01T01:00:00", 50)]))
+    store.write_batch(RecordBatch([record(10, "2026-10-05T01:00:00", 130, positive=120)]))
+    # 過去日の再投入（リプレイ）: 10/03 の前回比と、その次の 10/05 の前回比が再計算される
+    store.write_batch(RecordBatch([record(10, "2026-10-03T01:00:00", 110, owners=60_000)]))
+    # 同じ日の再取得: 最新値と前回比を上書きする
+    store.write_batch(RecordBatch([record(10, "2026-10-05T09:00:00", 135, positive=125),
+                                   record(20, "2026-10-05T09:00:00", 65)]))
+
+    assert latest_rows(store) == [
+        (10, 135, "2026-10-05T09:00:00+00:00", "2026-10-05"),
+        (20, 65, "2026-10-05T09:00:00+00:00", "2026-10-05"),
+    ]
+    assert delta_rows(store, 10) == [
+        ("2026-10-01", None, None, 100, None, None, None, None),
+        ("2026-10-03", "2026-10-01", 2, 110, 10, 0, 0, 10_000),
+        ("2026-10-05", "2026-10-03", 2, 135, 25, 25, 0, -10_000),
+    ]
+    assert delta_rows(store, 20) == [
+        ("2026-10-01", None, None, 50, None, None, None, None),
+        ("2026-10-05", "2026-10-01", 4, 65, 15, 0, 0, 0),
+    ]
+
+
+def test_older_scrape_does_not_replace_latest(store):
+    store.write_batch(RecordBatch([record(10, "2026-10-05T01:00:00", 130)]))
+    store.write_batch(RecordBatch([record(10, "2026-10-02T01:00:00", 100)]))
+
+    assert latest_rows(store) == [(10, 130, "2026-10-05T01:00:00+00:00", "2026-10-05")]
+    assert [row[:5] for row in delta_rows(store, 10)] == [
+        ("2026-10-02", None, None, 100, None),
+        ("2026-10-05", "2026-10-02", 3, 130, 30),
+    ]
+
+
+def test_only_batch_appids_are_touched(store):
+    store.write_batch(RecordBatch([record(10, "2026-10-01T01:00:00", 100), record(20, "2026-10-01T01:00:00", 50)]))
+    # バッチに含まれないAppIDの行が再計算されていないことを確認するため、直接書き換えておく
+    with store._conn:
+        store._conn.execute("UPDATE steam_app_metrics_daily_delta SET followers_change = -1 WHERE app_id = 20")
+        store._conn.execute("UPDATE steam_app_metrics_latest_by_app SET current_followers = -1 WHERE app_id = 20")
+
+    store.write_batch(RecordBatch([record(10, "2026-10-02T01:00:00", 120)]))
+
+    assert delta_rows(store, 20)[0][4] == -1
+    assert latest_rows(store)[1][1] == -1
+    assert delta_rows(store, 10)[-1][4] == 20
+
+
+def test_delta_lookback_limits_previous_scrape():
+    store = SQLiteMetricsStore(":memory:", delta_lookback_days=7)
+    store.write_batch(RecordBatch([record(10, "2026-09-01T01:00:00", 100)]))
+    store.write_batch(RecordBatch([record(10, "2026-10-01T01:00:00", 150)]))
+
+    # 前回の取得日がルックバック期間より前なら、前回比は計算しない
+    assert delta_rows(store, 10)[-1][:5] == ("2026-10-01", None, None, 150, None)
+    store.close()
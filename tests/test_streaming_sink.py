@@ -0,0 +1,67 @@
+# tests/test_streaming_sink.py
+import asyncio
+
+from records import AppRecord
+from sinks import SQLiteMetricsStore, StreamingSink
+
+
+def record(app_id):
+    return AppRecord(app_id, title_name=f"Game {app_id}", current_followers=app_id)
+
+
+class FlakyWriter:
+    def __init__(self, store, fail=True):
+        self.store = store
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, batch):
+        self.calls.append(len(batch))
+        if self.fail:
+            return False
+        return self.store.write_batch(batch)
+
+
+def stored_appids(store):
+    return [app_id for (app_id,) in store._conn.execute("SELECT app_id FROM steam_app_metrics ORDER BY app_id")]
+
+
+def test_flushes_in_batches_to_local_store():
+    store = SQLiteMetricsStore(":memory:")
+    flushed = []
+
+    async def run():
+        async with StreamingSink(store.write_batch, batch_size=3, flush_interval=None,
+                                 on_flush=lambda batch: flushed.append(list(batch.app_id))) as sink:
+            for app_id in range(7):
+                await sink.add(record(app_id))
+            assert sink.pending == 1
+
+    asyncio.run(run())
+    assert flushed == [[0, 1, 2], [3, 4, 5], [6]]
+    assert stored_appids(store) == list(range(7))
+    store.close()
+
+
+def test_failed_batch_is_retried_with_backoff():
+    store = SQLiteMetricsStore(":memory:")
+    writer = FlakyWriter(store)
+
+    async def run():
+        sink = StreamingSink(writer, batch_size=3, flush_interval=None, retry_backoff=0.05, max_retry_backoff=0.05)
+        for app_id in range(10):
+            await sink.add(record(app_id))
+        # 障害中はレコードごとではなく、失敗後に batch_size 件たまるごとにだけ再送する
+        assert writer.calls == [3, 6, 9]
+        assert sink.pending == 10
+
+        writer.fail = False
+        await asyncio.sleep(0.06)
+        await sink.add(record(10))
+        assert sink.pending == 0
+        await sink.close()
+
+    asyncio.run(run())
+    assert writer.calls[-1] == 11
+    assert stored_appids(store) == list(range(11))
+    store.close()
@@ -0,0 +1,92 @@
+# tests/test_work_distribution.py
+import pytest
+
+import main
+from work_distribution import (STATUS_DONE, STATUS_FAILED, STATUS_LEASED, STATUS_PENDING,
+                               SQLiteLeaseStore, parse_shard, shard_appids)
+
+DATE = "2026-01-01"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteLeaseStore(tmp_path / "work_queue.sqlite3")
+    yield store
+    store.close()
+
+
+def test_expired_lease_is_taken_over(store):
+    store.enqueue(DATE, [1, 2])
+    assert store.acquire(DATE, "a", limit=10, lease_seconds=-1) == [1, 2]
+    assert store.acquire(DATE, "b", limit=10, lease_seconds=300) == [1, 2]
+    # 期限内のリースは他のワーカーに渡らない
+    assert store.acquire(DATE, "c", limit=10, lease_seconds=300) == []
+
+
+def test_stale_owner_complete_is_noop(store):
+    store.enqueue(DATE, [1])
+    store.acquire(DATE, "a", limit=10, lease_seconds=-1)
+    store.acquire(DATE, "b", limit=10, lease_seconds=300)
+    store.complete(DATE, "a", [1])
+    assert store.counts(DATE) == {STATUS_LEASED: 1}
+    assert store.release(DATE, "a") == 0
+    store.complete(DATE, "b", [1])
+    assert store.counts(DATE) == {STATUS_DONE: 1}
+
+
+def test_retry_returns_item_until_max_attempts(store):
+    store.enqueue(DATE, [1, 2])
+    assert store.acquire(DATE, "a", limit=1, lease_seconds=300, max_attempts=2) == [1]
+    assert store.retry(DATE, "a", [1], max_attempts=2) == 0
+    assert store.counts(DATE) == {STATUS_PENDING: 2}
+    # リトライ中の項目は未着手の項目の後に回る
+    assert store.acquire(DATE, "a", limit=1, lease_seconds=300, max_attempts=2) == [2]
+    assert store.acquire(DATE, "a", limit=1, lease_seconds=300, max_attempts=2) == [1]
+    assert store.retry(DATE, "a", [1], max_attempts=2) == 1
+    assert store.counts(DATE) == {STATUS_LEASED: 1, STATUS_FAILED: 1}
+    # 他のワーカーのリースは retry できない
+    assert store.retry(DATE, "b", [2], max_attempts=2) == 0
+    assert store.counts(DATE) == {STATUS_LEASED: 1, STATUS_FAILED: 1}
+
+
+def test_expired_lease_fails_after_max_attempts(store):
+    store.enqueue(DATE, [1])
+    for _ in range(2):
+        assert store.acquire(DATE, "a", limit=10, lease_seconds=-1, max_attempts=2) == [1]
+    assert store.acquire(DATE, "b", limit=10, lease_seconds=300, max_attempts=2) == []
+    assert store.counts(DATE) == {STATUS_FAILED: 1}
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 8, 13])
+def test_shards_cover_appids_without_overlap(count):
+    appids = list(range(10, 5000, 7))
+    shards = [shard_appids(appids, index, count) for index in range(count)]
+    assert sorted(appid for shard in shards for appid in shard) == appids
+
+
+@pytest.mark.parametrize("spec", ["1", "a/2", "2/2", "-1/2", "0/0"])
+def test_parse_shard_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        parse_shard(spec)
+
+
+def test_parse_args_rejects_shard_and_work_queue_from_environment(monkeypatch, capsys):
+    monkeypatch.setattr(main, "SCRAPER_SHARD", "0/2")
+    monkeypatch.setattr(main, "WORK_QUEUE_PATH", "/tmp/work_queue.sqlite3")
+    with pytest.raises(SystemExit) as excinfo:
+        main.parse_args([])
+    assert excinfo.value.code == 2
+    assert "同時に指定できません" in capsys.readouterr().err
+
+
+def test_parse_args_rejects_environment_default_mixed_with_option(monkeypatch):
+    monkeypatch.setattr(main, "SCRAPER_SHARD", "0/2")
+    with pytest.raises(SystemExit):
+        main.parse_args(["--work-queue"])
+
+
+def test_parse_args_resolves_shard(monkeypatch):
+    monkeypatch.setattr(main, "SCRAPER_SHARD", "1/4")
+    assert main.parse_args([]).shard == (1, 4)
+    with pytest.raises(SystemExit):
+        main.parse_args(["--shard", "4/4"])